@@ -45,18 +45,27 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'corsheaders',
     'rest_framework',
+    # Only kept for DRF's Token table, which user_auth_app's migration 0005
+    # reads and empties, and for ObtainAuthToken's serializer; drop it once
+    # that migration is squashed away on every deployment.
     'rest_framework.authtoken',
     'Join_App',
     'user_auth_app',
 ]
 
 MIDDLEWARE = [
+    'Join_App.middleware.MetricsMiddleware',
+    'Join_App.middleware.TrafficCaptureMiddleware',
+    'Join_App.middleware.SQLInstrumentationMiddleware',
+    'Join_App.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After authentication, so only staff requests start the sampler
+    'Join_App.middleware.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -103,6 +112,16 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-profile-request',
+    'idempotency-key',
+    'if-match',
+]
+
+# Response headers the frontend reads
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'idempotent-replayed',
+    'retry-after',
 ]
 
 REST_FRAMEWORK = {
@@ -110,12 +129,155 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.JSONParser',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user_auth_app.authentication.MeteredTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # 0 keys the per-IP throttles on REMOTE_ADDR and ignores the header,
+    # which clients can set to anything.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+}
+
+# Per-request SQL statistics (Server-Timing header and slow request log)
+SQL_INSTRUMENTATION = {
+    'ENABLED': os.getenv('SQL_INSTRUMENTATION', 'True') == 'True',
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', '500')),
+    'DUPLICATE_QUERY_THRESHOLD': 10,
+    # Thresholds in ms for single endpoints, keyed by URL name
+    'ENDPOINT_THRESHOLDS': {
+        'task-list': 1000,
+        'guest-login': 2000,
+        'registration': 2000,
+        'login': 2000,
+    },
+}
+
+# Sampling profiler for single requests, listed under "Request profiles" in the admin.
+# Staff users can profile a request by sending the X-Profile-Request header.
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING', 'True') == 'True',
+    'HEADER': 'X-Profile-Request',
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', '0')),
+    'INTERVAL_MS': 2,
+    'DIRECTORY': BASE_DIR / 'profiles',
+    'MAX_PROFILES': 200,
+    'MAX_TOTAL_BYTES': 50 * 1024 * 1024,
+}
+
+# Sanitised request traces for `manage.py replay_trace`. Every worker appends to
+# CAPTURE_PATH; user IDs are replaced by pseudonyms, texts by their length.
+CAPTURE = {
+    'ENABLED': os.getenv('CAPTURE', 'False') == 'True',
+    'SAMPLE_RATE': float(os.getenv('CAPTURE_SAMPLE_RATE', '1')),
+    'PATH': os.getenv('CAPTURE_PATH', BASE_DIR / 'traces' / 'capture.jsonl'),
+    'MAX_BYTES': 100 * 1024 * 1024,
+}
+
+# Contact avatars served at /avatars/<hash>.svg with immutable caching; every
+# worker keeps CACHE_SIZE rendered SVGs.
+AVATARS = {
+    'CACHE_SIZE': int(os.getenv('AVATAR_CACHE_SIZE', '1024')),
+    'MAX_AGE': 365 * 24 * 60 * 60,
+}
+
+# Prometheus metrics served at /metrics/ to staff users or with the bearer token.
+# Every worker process writes its values to METRICS_DIR; all workers of a
+# deployment must share it.
+METRICS = {
+    'ENABLED': os.getenv('METRICS', 'True') == 'True',
+    'DIRECTORY': os.getenv('METRICS_DIR', BASE_DIR / 'metrics'),
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': os.getenv('METRICS_TOKEN'),
+}
+
+# Done tasks are moved to the archive tables by `manage.py archive_tasks`
+# this many days after their completion.
+ARCHIVING = {
+    'AFTER_DAYS': int(os.getenv('ARCHIVE_AFTER_DAYS', '30')),
+    'BATCH_SIZE': 500,
+}
+
+# Reminders for open tasks due soon, sent by `manage.py send_reminders`.
+# SINK delivers them; FileSink appends to REMINDERS_FILE instead of printing.
+REMINDERS = {
+    'HORIZON_DAYS': int(os.getenv('REMINDER_HORIZON_DAYS', '1')),
+    'BATCH_SIZE': 500,
+    'SINK': os.getenv('REMINDER_SINK', 'Join_App.reminders.ConsoleSink'),
+    'FILE': os.getenv('REMINDERS_FILE', BASE_DIR / 'reminders.jsonl'),
+}
+
+# Shared cache for throttling buckets and replica stickiness. Without
+# REDIS_URL every worker process keeps its own in-memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Token buckets for the unauthenticated auth endpoints as
+# (capacity, seconds per token), keyed per client IP and per submitted
+# account name. Rejected requests get 429 with Retry-After.
+THROTTLING = {
+    'ENABLED': os.getenv('THROTTLING', 'True') == 'True',
+    'CACHE': 'default',
+    'RATES': {
+        'guest-login': {'ip': (10, 30)},
+        'registration': {'ip': (5, 60), 'credential': (3, 300)},
+        'login': {'ip': (20, 6), 'credential': (5, 60)},
+    },
+}
+
+# Responses of POSTs to /tasks/ and /contacts/ sent with an Idempotency-Key
+# header are stored per user and replayed to retries within TTL_SECONDS.
+# Purge expired records with `manage.py purge_idempotency_keys`.
+IDEMPOTENCY = {
+    'ENABLED': os.getenv('IDEMPOTENCY', 'True') == 'True',
+    'HEADER': 'Idempotency-Key',
+    'TTL_SECONDS': int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 60 * 60))),
+    'WAIT_SECONDS': 10,
+    'POLL_MS': 50,
+    'CLAIM_SECONDS': 60,
+}
+
+# Limits of POST /batch/, which runs several API requests in one round trip.
+BATCH = {
+    'MAX_REQUESTS': 20,
+    'MAX_BYTES': 1024 * 1024,
+    'HEADERS': ['Idempotency-Key', 'If-Match'],
+}
+
+# Concurrent identical task and contact list requests share one computation
+COALESCING = {
+    'ENABLED': os.getenv('COALESCING', 'True') == 'True',
+    'TIMEOUT_SECONDS': 5,
+    'CACHE': 'default',
+}
+
+# Bulk user provisioning (POST /users/provision/, provision_users command)
+PROVISIONING = {
+    'WORKERS': int(os.getenv('PROVISIONING_WORKERS', '0')) or None,
+    'MAX_USERS': 5000,
+    'BATCH_SIZE': 500,
+}
+
+# Streamed task and contact lists (?stream=true)
+STREAMING = {
+    'CHUNK_SIZE': int(os.getenv('STREAMING_CHUNK_SIZE', '200')),
+    'PARAM': 'stream',
+}
+
+# Expiring authentication tokens (user_auth_app/tokens.py); run sweep_tokens
+# periodically to delete the expired ones
+TOKENS = {
+    'TTL_SECONDS': int(os.getenv('TOKEN_TTL_SECONDS', str(14 * 24 * 60 * 60))),
+    'TOUCH_SECONDS': 5 * 60,
+    'SWEEP_BATCH_SIZE': 1000,
+    'MAX_PER_USER': int(os.getenv('TOKEN_MAX_PER_USER', '10')),
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -131,7 +293,56 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts; upgrading a read
+            # transaction fails immediately instead of waiting for the lock
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Read replicas as comma-separated SQLite files, e.g. kept in sync with
+# `manage.py sync_replicas` or a streaming replication tool.
+for index, replica_path in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(','))):
+    DATABASES[f'replica{index + 1}'] = {
+        **DATABASES['default'],
+        'NAME': replica_path,
+        'TEST': {'MIRROR': 'default'},
     }
+
+# Shards for the board data as comma-separated SQLite files. Each user's
+# contacts and tasks live in one shard; auth tables stay on `default`.
+for index, shard_path in enumerate(filter(None, os.getenv('DATABASE_SHARDS', '').split(','))):
+    DATABASES[f'shard{index + 1}'] = {**DATABASES['default'], 'NAME': shard_path}
+
+SHARDING = {
+    'SHARDS': [alias for alias in DATABASES if alias.startswith('shard')],
+    'ID_BLOCK_SIZE': int(os.getenv('SHARD_ID_BLOCK_SIZE', '100')),
+}
+
+DATABASE_ROUTERS = ['Join_App.routers.ShardRouter', 'Join_App.routers.ReadReplicaRouter']
+
+# Reads of the board data go to the replicas; clients that wrote read from
+# the primary for STICKY_SECONDS to see their own changes.
+REPLICATION = {
+    'PRIMARY': 'default',
+    'REPLICAS': [alias for alias in DATABASES if alias.startswith('replica')],
+    'APPS': ['Join_App'],
+    'STICKY_SECONDS': int(os.getenv('REPLICA_STICKY_SECONDS', '5')),
+}
+
+# PRAGMAs applied to every SQLite connection and the retry policy for write
+# transactions hitting lock errors (see Join_App/database.py).
+SQLITE = {
+    'ENABLED': os.getenv('SQLITE_TUNING', 'True') == 'True',
+    'JOURNAL_MODE': 'WAL',
+    'BUSY_TIMEOUT_MS': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'SYNCHRONOUS': 'NORMAL',
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    'CACHE_SIZE_KB': 64 * 1024,
+    'LOCK_RETRIES': 5,
+    'LOCK_BACKOFF_MS': 20,
+    'LOCK_BACKOFF_MAX_MS': 500,
 }
 
 
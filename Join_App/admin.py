@@ -1,8 +1,161 @@
 from django.contrib import admin
-from .models import Task, Subtask, Contact
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from .models import Task, Subtask, Contact, RequestProfile
 
-# Register your models here.
+# Rows counted for the pagination of the board changelists
+ADMIN_COUNT_LIMIT = 10000
 
-admin.site.register(Contact)
-admin.site.register(Task)
-admin.site.register(Subtask)
\ No newline at end of file
+
+class CappedCountPaginator(Paginator):
+    """
+    Paginator counting at most ADMIN_COUNT_LIMIT rows.
+
+    An exact COUNT(*) reads every matching row of the board tables; the
+    capped count stops at the limit, so larger results only offer their
+    first pages. Narrow them down with the filters or the search.
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list[:ADMIN_COUNT_LIMIT].count()
+
+
+class BoardModelAdmin(admin.ModelAdmin):
+    """
+    Base admin for the board models, which grow with every user.
+
+    Skips the unfiltered total next to the filtered count and caps the
+    count used for the pagination.
+    """
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class SubtaskInline(admin.TabularInline):
+    """
+    Subtasks edited on the page of their task.
+    """
+    model = Subtask
+    fields = ['name', 'done']
+    extra = 0
+
+
+@admin.register(Task)
+class TaskAdmin(BoardModelAdmin):
+    """
+    Admin for the tasks of all users.
+
+    Users and contacts are picked by ID instead of select boxes listing
+    every row of their tables. The category filter uses its index.
+    """
+    list_display = ['id', 'title', 'user', 'due_date', 'priority', 'category']
+    list_filter = ['category']
+    list_select_related = ['user']
+    search_fields = ['=id', 'title']
+    raw_id_fields = ['user', 'assigned_to']
+    readonly_fields = ['version', 'completed_at']
+    inlines = [SubtaskInline]
+
+
+@admin.register(Contact)
+class ContactAdmin(BoardModelAdmin):
+    """
+    Admin for the contacts of all users.
+    """
+    list_display = ['id', 'name', 'email', 'user']
+    list_select_related = ['user']
+    search_fields = ['=id', 'name', 'email']
+    raw_id_fields = ['user']
+    readonly_fields = ['version']
+
+
+@admin.register(Subtask)
+class SubtaskAdmin(BoardModelAdmin):
+    """
+    Admin for single subtasks; they are usually edited on their task.
+    """
+    list_display = ['id', 'name', 'task', 'done']
+    list_select_related = ['task']
+    search_fields = ['=id', 'name']
+    raw_id_fields = ['task']
+
+# Number of stack lines shown on the change page of a profile
+PROFILE_PREVIEW_LINES = 30
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Admin for the stored request profiles.
+
+    Lists the profiled requests and offers the collapsed-stack files for
+    download, e.g. for flamegraph.pl or speedscope.
+    """
+    list_display = ['created_at', 'method', 'path', 'status_code', 'user',
+                    'duration_ms', 'samples', 'trigger', 'download_link']
+    list_filter = ['trigger', 'method']
+    list_select_related = ['user']
+    search_fields = ['path']
+    date_hierarchy = 'created_at'
+    readonly_fields = [field.name for field in RequestProfile._meta.fields] + ['download_link', 'preview']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        """
+        Adds the download route for profile files.
+
+        Returns:
+            list: URL patterns of this admin.
+        """
+        download = path(
+            '<int:pk>/download/',
+            self.admin_site.admin_view(self.download_view),
+            name='Join_App_requestprofile_download',
+        )
+        return [download] + super().get_urls()
+
+    def download_view(self, request, pk):
+        """
+        Returns the collapsed-stack file of a profile as a download.
+
+        Args:
+            request: The HTTP request.
+            pk: Primary key of the profile.
+
+        Returns:
+            FileResponse: The profile file.
+
+        Raises:
+            Http404: If the profile or its file does not exist.
+        """
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = RequestProfile.objects.filter(pk=pk).first()
+        if profile is None or not profile.file_path.exists():
+            raise Http404
+        return FileResponse(
+            profile.file_path.open('rb'), as_attachment=True,
+            filename=f'profile-{profile.pk}.collapsed', content_type='text/plain',
+        )
+
+    @admin.display(description='File')
+    def download_link(self, obj):
+        url = reverse('admin:Join_App_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">download</a>', url)
+
+    @admin.display(description='Hottest stacks')
+    def preview(self, obj):
+        if not obj.file_path.exists():
+            return '-'
+        with obj.file_path.open() as profile_file:
+            lines = [line for _, line in zip(range(PROFILE_PREVIEW_LINES), profile_file)]
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', ''.join(lines))
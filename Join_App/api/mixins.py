@@ -0,0 +1,322 @@
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from Join_App.api.serializers import BulkDeleteSerializer
+from Join_App.coalescing import bump_board_version, coalesce
+from Join_App.database import run_in_transaction
+from Join_App.models import VersionConflict
+from Join_App.idempotency import (
+    claim_key, idempotency_settings, release_key, request_fingerprint, store_response, wait_for_response,
+)
+from Join_App.sharding import current_shard, is_moving, select_shard, shard_for_user, use_shard
+
+SAFE_METHODS = ('get', 'head', 'options')
+
+
+class ShardMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Your board is being moved, please retry shortly.'
+    default_code = 'shard_moving'
+    # Sent as Retry-After by the exception handler
+    wait = 5
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used for a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still in progress, please retry shortly.'
+    default_code = 'idempotency_key_in_progress'
+    wait = 1
+
+
+class ShardRoutingMixin:
+    """
+    Routes the board data queries of a request to the user's shard.
+
+    The shard is looked up once per request, after authentication. Writes
+    are refused with 503 and Retry-After while the user's rows are moved.
+    They check again inside their transaction, which holds the shard's
+    write lock, so a move starting meanwhile either waits for them or
+    refuses them (see sharding.move_user). Must come after LockRetryMixin
+    in the bases, so the retried transaction runs on the shard and wraps
+    the check.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # Resets the shard selected in initial() when the request is done
+        with use_shard(None):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not request.user.is_authenticated:
+            return
+        alias, moving = shard_for_user(request.user.id)
+        method = request.method.lower()
+        if method in SAFE_METHODS or alias is None:
+            select_shard(alias)
+            return
+        if moving:
+            raise ShardMoving()
+        select_shard(alias)
+        if hasattr(self, method):
+            setattr(self, method, partial(self.checked_write, getattr(self, method), request.user.id))
+
+    def checked_write(self, handler, user_id, *args, **kwargs):
+        if is_moving(user_id):
+            raise ShardMoving()
+        return handler(*args, **kwargs)
+
+
+class LockRetryMixin:
+    """
+    Runs the handlers of writing requests in a transaction retried on lock errors.
+
+    The handler is wrapped after authentication and permission checks, so
+    only the view's own work is repeated. Works for APIViews and ViewSets,
+    as both look up the handler by method name after initial(). Actions
+    listed in transaction_exempt_actions manage their transactions
+    themselves, e.g. to do slow work before taking the write lock.
+    """
+    transaction_exempt_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        method = request.method.lower()
+        if getattr(self, 'action', None) in self.transaction_exempt_actions:
+            return
+        if method not in SAFE_METHODS and hasattr(self, method):
+            handler = partial(run_in_transaction, getattr(self, method), using=self.get_transaction_database())
+            setattr(self, method, handler)
+
+    def get_transaction_database(self):
+        """
+        Returns the database the handler writes to.
+
+        Returns:
+            str: Alias of the database of the view's model
+        """
+        queryset = getattr(self, 'queryset', None)
+        if queryset is None and hasattr(self, 'get_queryset'):
+            queryset = self.get_queryset()
+        if queryset is None:
+            return DEFAULT_DB_ALIAS
+        return router.db_for_write(queryset.model)
+
+
+class IdempotencyMixin:
+    """
+    Replays the stored response to retried POSTs sending an Idempotency-Key.
+
+    The first request with a key claims it before its handler runs and
+    stores its response afterwards; retries get that response without
+    touching the models, marked with an Idempotent-Replayed header.
+    Duplicates arriving while the first request runs wait for it. Failed
+    requests release the key. Must come before LockRetryMixin in the
+    bases, so the claim is committed outside the handler's transaction.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        config = idempotency_settings()
+        key = request.headers.get(config['HEADER'])
+        if not config['ENABLED'] or key is None or request.method != 'POST':
+            return
+        if not 0 < len(key) <= 255:
+            raise ValidationError({config['HEADER']: 'Must be between 1 and 255 characters.'})
+        self.post = partial(self.idempotent, self.post, key)
+
+    def idempotent(self, handler, key, request, *args, **kwargs):
+        """
+        Runs a handler once per idempotency key.
+
+        Args:
+            handler: The view's handler
+            key: Value of the Idempotency-Key header
+            request: The DRF request
+            *args: Positional arguments for the handler
+            **kwargs: Keyword arguments for the handler
+
+        Returns:
+            Response: The handler's response, or the stored one on replays
+
+        Raises:
+            IdempotencyKeyReused: If the key belongs to a different request
+            IdempotencyKeyInProgress: If the first request did not finish in time
+        """
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim_key(request.user, key, fingerprint)
+        if not claimed:
+            if record is not None and record.request_hash != fingerprint:
+                raise IdempotencyKeyReused()
+            record = wait_for_response(record)
+            if record is None:
+                raise IdempotencyKeyInProgress()
+            return Response(record.response_body, status=record.status_code,
+                            headers={'Idempotent-Replayed': 'true'})
+        try:
+            response = handler(request, *args, **kwargs)
+        except BaseException:
+            release_key(record)
+            raise
+        if response.status_code >= 500:
+            release_key(record)
+        else:
+            store_response(record, response)
+        return response
+
+
+class CoalescingMixin:
+    """
+    Shares list reads between concurrent identical requests of a user.
+
+    Successful writes raise the user's board version once their
+    transaction committed, so reads sent after a write never get the
+    result of a computation that started before it.
+    """
+
+    def coalesced(self, request, func):
+        """
+        Computes a read once for all concurrent requests with the same path.
+
+        Args:
+            request: The DRF request
+            func: Callable without arguments returning the response data
+
+        Returns:
+            The response data, possibly shared with other requests
+        """
+        return coalesce(request.user.id, request.get_full_path(), func)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (request.method.lower() not in SAFE_METHODS and response.status_code < 400
+                and request.user.is_authenticated):
+            transaction.on_commit(partial(bump_board_version, request.user.id),
+                                  using=current_shard() or DEFAULT_DB_ALIAS)
+        return response
+
+
+class ConditionalUpdateMixin:
+    """
+    Exposes the version of a row as ETag and honours If-Match on PUT and PATCH.
+
+    Updates check the version in their UPDATE statement. A version
+    mismatch is answered with 412 and the current representation, so the
+    client can merge without fetching it again. Requests without If-Match
+    overwrite as before.
+    """
+
+    @staticmethod
+    def etag(version):
+        return f'"{version}"'
+
+    def if_match_versions(self, request):
+        """
+        Parses the If-Match header.
+
+        Args:
+            request: The DRF request
+
+        Returns:
+            set: Accepted versions, or None if any version is accepted
+        """
+        header = request.headers.get('If-Match', '').strip()
+        if not header or header == '*':
+            return None
+        versions = set()
+        for tag in header.split(','):
+            tag = tag.strip().removeprefix('W/').strip('"')
+            if tag.isdigit():
+                versions.add(int(tag))
+        return versions
+
+    def precondition_failed(self, instance):
+        response = Response(self.get_serializer(instance).data, status=status.HTTP_412_PRECONDITION_FAILED)
+        response['ETag'] = self.etag(instance.version)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = self.etag(response.data['version'])
+        return response
+
+    def update(self, request, *args, **kwargs):
+        """
+        Updates a row unless it changed since the version sent as If-Match.
+
+        Args:
+            request: The DRF request
+            *args: Positional arguments of the route
+            **kwargs: Keyword arguments of the route, and partial
+
+        Returns:
+            Response: The updated representation with its ETag, or 412 with
+            the current one
+        """
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        versions = self.if_match_versions(request)
+        if versions is not None and instance.version not in versions:
+            return self.precondition_failed(instance)
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.save()
+        except VersionConflict:
+            # Changed between loading and writing; nothing was written yet
+            return self.precondition_failed(self.get_object())
+        if getattr(instance, '_prefetched_objects_cache', None):
+            instance._prefetched_objects_cache = {}
+        response = Response(serializer.data)
+        response['ETag'] = self.etag(instance.version)
+        return response
+
+
+class BulkDeleteMixin:
+    """
+    Adds a bulk-delete action deleting a list of the user's rows at once.
+
+    Ownership of all IDs is checked in one query; the rows and their
+    dependents are then deleted by bulk_deleter with set-based statements,
+    in the request's transaction. Views set bulk_deleter to a function of
+    Join_App.deletion.
+    """
+    bulk_deleter = None
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """
+        Deletes several rows of the authenticated user.
+
+        Body:
+            ids: IDs of the rows to delete (at most BULK_DELETE_MAX_IDS).
+
+        Args:
+            request: The HTTP request.
+
+        Returns:
+            Response: Deleted rows per table, or 404 with the IDs that do
+            not exist or belong to another user, in which case nothing is
+            deleted.
+        """
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+        queryset = self.get_queryset()
+        owned = set(queryset.filter(id__in=ids).values_list('id', flat=True))
+        if owned != ids:
+            return Response({'error': 'Not found', 'missing': sorted(ids - owned)},
+                            status=status.HTTP_404_NOT_FOUND)
+        deleted = type(self).bulk_deleter(sorted(ids), using=router.db_for_write(queryset.model))
+        return Response({'status': 'success', 'deleted': deleted})
@@ -0,0 +1,30 @@
+import hmac
+
+from rest_framework.permissions import BasePermission
+from Join_App.metrics import metrics_settings
+
+class CanReadMetrics(BasePermission):
+    """
+    Allows access to staff users and to scrapers sending the metrics token.
+    
+    The token is configured as METRICS['TOKEN'] and sent as
+    "Authorization: Bearer <token>".
+    """
+    def has_permission(self, request, view):
+        """
+        Checks whether the request may read the metrics.
+        
+        Args:
+            request: The HTTP request.
+            view: The view being accessed.
+            
+        Returns:
+            bool: True for staff users or a matching bearer token.
+        """
+        if request.user and request.user.is_staff:
+            return True
+        token = metrics_settings()['TOKEN']
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not token or not header.startswith('Bearer '):
+            return False
+        return hmac.compare_digest(header[len('Bearer '):].encode(), token.encode())
@@ -1,6 +1,10 @@
 from rest_framework import serializers
-from Join_App.models import Task, Contact, Subtask
+from Join_App.batching import METHODS, batch_settings
+from Join_App.deletion import BULK_DELETE_MAX_IDS
+from Join_App.provisioning import provisioning_settings
+from Join_App.models import Task, Contact, Subtask, ArchivedTask, ArchivedSubtask
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
 
 import logging
 logger = logging.getLogger(__name__)
@@ -10,21 +14,22 @@ class ContactSerializer(serializers.ModelSerializer):
     Serializer for the Contact model.
     
     Processes contact data for API requests and responses.
-    Converts the ID to 'contactID' and adds initials.
+    Converts the ID to 'contactID' and adds the stored initials and
+    the hash addressing the contact's avatar image.
     Ensures that only authenticated users can create contacts
     and users can only update their own contacts.
     """
     class Meta:
         model = Contact
-        fields = ['id', 'name', 'email', 'phone', 'color', 'user']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'email', 'phone', 'color', 'user', 'version']
+        read_only_fields = ['id', 'version']
         extra_kwargs = {'user': {'required': False}}
     
     def to_representation(self, instance):
         """
         Modifies the output representation of the contact.
         
-        Converts 'id' to 'contactID', adds initials, and
+        Converts 'id' to 'contactID', adds initials and avatar hash, and
         removes the 'user' field from the response.
         
         Args:
@@ -35,7 +40,8 @@ class ContactSerializer(serializers.ModelSerializer):
         """
         data = super().to_representation(instance)
         data['contactID'] = data.pop('id')
-        data['initials'] = instance.get_initials()
+        data['initials'] = instance.initials
+        data['avatarHash'] = instance.avatar_hash
         
         # Remove the user field from the response
         if 'user' in data:
@@ -87,14 +93,19 @@ class ContactSerializer(serializers.ModelSerializer):
             
         Raises:
             ValidationError: If the user is not the owner of the contact
+            VersionConflict: If the contact was changed since it was loaded
         """
         user = self.context['request'].user if 'request' in self.context else None
-        if instance.user != user:
+        # Compare IDs: loading instance.user would read auth_user from the shard
+        if instance.user_id != getattr(user, 'id', None):
             raise serializers.ValidationError({"error": "You can only update your own contacts"})
         if 'user' in validated_data:
             validated_data.pop('user')
-            
-        return super().update(instance, validated_data)
+        
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save_version(list(validated_data))
+        return instance
 
 class SubtaskSerializer(serializers.ModelSerializer):
     """
@@ -134,7 +145,8 @@ class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = ['taskID', 'title', 'description', 'assignedTo', 'dueDate', 
-                'priority', 'category', 'subtasks', 'currentProgress']
+                'priority', 'category', 'subtasks', 'currentProgress', 'version']
+        read_only_fields = ['version']
 
     def to_representation(self, instance):
         """
@@ -209,6 +221,9 @@ class TaskSerializer(serializers.ModelSerializer):
             
         Returns:
             Task: Updated Task object with updated contacts and subtasks
+            
+        Raises:
+            VersionConflict: If the task was changed since it was loaded
         """
         # Basic field updates
         instance.title = validated_data.get('title', instance.title)
@@ -217,7 +232,7 @@ class TaskSerializer(serializers.ModelSerializer):
         instance.priority = validated_data.get('priority', instance.priority)
         instance.category = validated_data.get('category', instance.category)
         instance.current_progress = validated_data.get('current_progress', instance.current_progress)
-        instance.save()
+        instance.save_version(['title', 'description', 'due_date', 'priority', 'category', 'current_progress'])
         
         # Update assigned contacts if provided
         if 'assignedTo' in validated_data:
@@ -253,6 +268,42 @@ class TaskSerializer(serializers.ModelSerializer):
         
         return instance
         
+class ArchivedSubtaskSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ArchivedSubtask model, shaped like SubtaskSerializer.
+    """
+    subTaskName = serializers.CharField(source='name')
+
+    class Meta:
+        model = ArchivedSubtask
+        fields = ['subTaskName', 'done']
+
+class ArchivedTaskSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for the ArchivedTask model.
+
+    Shaped like TaskSerializer, with 'archiveID' identifying the archive
+    entry and 'taskID' the task it was archived from. Expects assigned_to
+    and subtasks to be prefetched.
+    """
+    archiveID = serializers.IntegerField(source='id', read_only=True)
+    taskID = serializers.IntegerField(source='original_id', read_only=True)
+    assignedTo = serializers.SerializerMethodField()
+    subtasks = ArchivedSubtaskSerializer(many=True, read_only=True)
+    dueDate = serializers.DateField(source='due_date', read_only=True)
+    currentProgress = serializers.IntegerField(source='current_progress', read_only=True)
+    completedAt = serializers.DateTimeField(source='completed_at', read_only=True)
+    archivedAt = serializers.DateTimeField(source='archived_at', read_only=True)
+
+    class Meta:
+        model = ArchivedTask
+        fields = ['archiveID', 'taskID', 'title', 'description', 'assignedTo', 'dueDate',
+                  'priority', 'category', 'subtasks', 'currentProgress', 'completedAt', 'archivedAt']
+        read_only_fields = fields
+
+    def get_assignedTo(self, instance):
+        return [{'contactID': contact.id} for contact in instance.assigned_to.all()]
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Serializer for Django's User model.
@@ -281,8 +332,109 @@ class UserSerializer(serializers.ModelSerializer):
             User: Newly created User object with securely stored password
         """
         user = User.objects.create_user(
-            username=validated_data['name'],
+            username=validated_data['username'],
             email=validated_data.get('email', ''),
             password=validated_data.get('password', '')
         )
-        return user
\ No newline at end of file
+        return user
+
+class ProvisionUserSerializer(serializers.Serializer):
+    """
+    Serializer for one user of a bulk provisioning.
+    
+    Validates without queries; taken names and emails are checked for all
+    rows at once by the provisioning.
+    """
+    name = serializers.CharField(source='username', max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(write_only=True, trim_whitespace=False)
+
+class ProvisioningSerializer(serializers.Serializer):
+    """
+    Serializer for a bulk provisioning request.
+    
+    The rows are only checked to be objects here, so every row gets its
+    own errors from ProvisionUserSerializer.
+    """
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_users(self, value):
+        """
+        Enforces the maximum number of users per request.
+
+        Args:
+            value: The rows
+
+        Returns:
+            list: The rows
+
+        Raises:
+            ValidationError: If there are too many rows
+        """
+        limit = provisioning_settings()['MAX_USERS']
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} users can be provisioned at once.")
+        return value
+
+class BatchEntrySerializer(serializers.Serializer):
+    """
+    Serializer for one sub-request of a batch.
+
+    Sub-requests may only set the headers listed in BATCH['HEADERS'];
+    all others are taken from the batch request.
+    """
+    method = serializers.ChoiceField(choices=METHODS)
+    path = serializers.RegexField(r'^/', max_length=2000)
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(max_length=255), required=False)
+
+    def validate_headers(self, value):
+        """
+        Rejects headers sub-requests may not set.
+
+        Args:
+            value: Headers of the sub-request
+
+        Returns:
+            dict: The validated headers
+
+        Raises:
+            ValidationError: If a header is not allowed
+        """
+        allowed = {name.lower() for name in batch_settings()['HEADERS']}
+        for name in value:
+            if name.lower() not in allowed:
+                raise serializers.ValidationError(f"Header '{name}' cannot be set per sub-request.")
+        return value
+
+class BatchSerializer(serializers.Serializer):
+    """
+    Serializer for a batch of sub-requests run in one round trip.
+    """
+    requests = BatchEntrySerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        """
+        Enforces the maximum number of sub-requests.
+
+        Args:
+            value: Validated sub-requests
+
+        Returns:
+            list: The sub-requests
+
+        Raises:
+            ValidationError: If the batch is too large
+        """
+        limit = batch_settings()['MAX_REQUESTS']
+        if len(value) > limit:
+            raise serializers.ValidationError(f"A batch may contain at most {limit} requests.")
+        return value
+
+class BulkDeleteSerializer(serializers.Serializer):
+    """
+    Serializer for the IDs of a bulk delete.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False,
+                                max_length=BULK_DELETE_MAX_IDS)
@@ -0,0 +1,91 @@
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+STREAMING_DEFAULTS = {
+    # Rows fetched, prefetched and serialized per step; bounds the memory
+    # of a streamed list whatever its length
+    'CHUNK_SIZE': 200,
+    # Query parameter opting into a streamed list
+    'PARAM': 'stream',
+}
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def streaming_settings():
+    """
+    Returns the streaming settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**STREAMING_DEFAULTS, **getattr(settings, 'STREAMING', {})}
+
+
+def wants_streaming(request):
+    """
+    Tells whether a list request asked for a streamed response.
+
+    Args:
+        request: The DRF request
+
+    Returns:
+        bool: True if the stream parameter is set to a true value
+    """
+    return request.query_params.get(streaming_settings()['PARAM'], '').lower() in TRUE_VALUES
+
+
+def stream_json_array(queryset, serializer, chunk_size=None):
+    """
+    Yields the serialized rows of a queryset as a JSON array, chunk by chunk.
+
+    The rows are fetched with iterator(), which runs the queryset's
+    prefetches per chunk, and rendered like JSONRenderer renders a list,
+    so only one chunk is held in memory at a time.
+
+    Args:
+        queryset: Rows to serialize, bound to the database to read from
+        serializer: Serializer instance whose to_representation is used per row
+        chunk_size: Rows per chunk (default: CHUNK_SIZE)
+
+    Yields:
+        bytes: Pieces of the JSON array
+    """
+    chunk_size = chunk_size or streaming_settings()['CHUNK_SIZE']
+    renderer = JSONRenderer()
+    rows = queryset.iterator(chunk_size=chunk_size)
+    opening = b'['
+    while chunk := list(islice(rows, chunk_size)):
+        content = b','.join(renderer.render(serializer.to_representation(row)) for row in chunk)
+        # Prefetched rows point back to their parent; dropping the caches
+        # breaks the cycles, so a chunk is freed now and not at the next
+        # garbage collection
+        for row in chunk:
+            row.__dict__.pop('_prefetched_objects_cache', None)
+        yield opening + content
+        opening = b','
+    yield b'[]' if opening == b'[' else b']'
+
+
+def streaming_list_response(queryset, serializer, chunk_size=None):
+    """
+    Builds a streamed JSON array response of a queryset.
+
+    The queryset is bound to the database the view would read from now,
+    as the rows are only fetched after the view and the middleware
+    returned, once the routing context of the request has ended. Its
+    queries are therefore not part of the request's SQL statistics.
+
+    Args:
+        queryset: Rows to serialize
+        serializer: Serializer instance whose to_representation is used per row
+        chunk_size: Rows per chunk (default: CHUNK_SIZE)
+
+    Returns:
+        StreamingHttpResponse: The streamed response
+    """
+    return StreamingHttpResponse(stream_json_array(queryset.using(queryset.db), serializer, chunk_size),
+                                 content_type='application/json')
@@ -0,0 +1,165 @@
+import hashlib
+import math
+import time
+from abc import ABCMeta, abstractmethod
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from Join_App.metrics import count_auth_event
+
+THROTTLING_DEFAULTS = {
+    'ENABLED': True,
+    # Cache holding the buckets; must be shared by all workers and support
+    # atomic add/incr (Redis, Memcached or, per process, LocMem)
+    'CACHE': 'default',
+    # Buckets per view scope and key kind as (capacity, seconds per token):
+    # a client may send `capacity` requests at once, then one per interval
+    'RATES': {
+        'guest-login': {'ip': (10, 30)},
+        'registration': {'ip': (5, 60), 'credential': (3, 300)},
+        'login': {'ip': (20, 6), 'credential': (5, 60)},
+    },
+}
+
+
+def throttling_settings():
+    """
+    Returns the throttling settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**THROTTLING_DEFAULTS, **getattr(settings, 'THROTTLING', {})}
+
+
+def take_token(cache, key, capacity, interval):
+    """
+    Takes one token from a bucket stored in the cache.
+
+    The bucket is stored as the time in ms at which it is full again, so a
+    request costs one atomic incr. Denied requests give their token back.
+    Refills beyond the capacity are dropped by resetting the time; racing
+    workers may lose one token there, in favour of the client.
+
+    Args:
+        cache: Cache backend holding the bucket
+        key: Cache key of the bucket
+        capacity: Maximum number of tokens
+        interval: Seconds to refill one token
+
+    Returns:
+        float: 0 if a token was taken, otherwise seconds until the next one
+    """
+    now = int(time.time() * 1000)
+    step = int(interval * 1000)
+    burst = capacity * step
+    # The key may expire once the bucket is full again
+    timeout = math.ceil(burst / 1000) + 1
+    if cache.add(key, now + step, timeout):
+        return 0
+    try:
+        full_at = cache.incr(key, step)
+    except ValueError:
+        # Expired since add(), i.e. the bucket is full
+        cache.set(key, now + step, timeout)
+        return 0
+    if full_at - step < now:
+        cache.set(key, now + step, timeout)
+        return 0
+    if full_at - now > burst:
+        cache.decr(key, step)
+        return (full_at - burst - now) / 1000
+    cache.touch(key, timeout)
+    return 0
+
+
+class TokenBucketThrottle(BaseThrottle, metaclass=ABCMeta):
+    """
+    Token-bucket throttle for unauthenticated endpoints.
+
+    The bucket is chosen by the view's throttle_scope and the throttle's
+    kind, and looked up in THROTTLING['RATES']; scopes without a rate are
+    not throttled. Runs before the handler, so rejected requests cost a few
+    cache operations but no queries or password hashing. DRF turns the wait
+    into a Retry-After header. Subclasses set kind and implement
+    get_ident_key().
+    """
+    kind = None
+
+    @abstractmethod
+    def get_ident_key(self, request, view):
+        """
+        Returns the part of the cache key identifying the client.
+
+        Args:
+            request: The HTTP request
+            view: The view being accessed
+
+        Returns:
+            str: Identifier, or None to skip the throttle
+        """
+
+    def allow_request(self, request, view):
+        """
+        Takes a token from the client's bucket.
+
+        Args:
+            request: The HTTP request
+            view: The view being accessed
+
+        Returns:
+            bool: True if the request may proceed
+        """
+        self.delay = 0
+        config = throttling_settings()
+        scope = getattr(view, 'throttle_scope', None)
+        rate = config['RATES'].get(scope, {}).get(self.kind)
+        if not config['ENABLED'] or rate is None:
+            return True
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+        capacity, interval = rate
+        self.delay = take_token(caches[config['CACHE']], f'throttle:{scope}:{self.kind}:{ident}',
+                                capacity, interval)
+        if self.delay:
+            count_auth_event(f'{scope}_throttled')
+            return False
+        return True
+
+    def wait(self):
+        return self.delay
+
+
+class IPThrottle(TokenBucketThrottle):
+    """
+    Limits requests per client IP.
+
+    The IP is REMOTE_ADDR unless REST_FRAMEWORK['NUM_PROXIES'] names the
+    trusted proxies appending to X-Forwarded-For; then it is the address
+    the outermost trusted proxy saw. Without NUM_PROXIES, DRF would key on
+    the whole header, which clients choose freely.
+    """
+    kind = 'ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class CredentialThrottle(TokenBucketThrottle):
+    """
+    Limits requests per submitted account name, whatever the client IP.
+
+    The field is named by the view's throttle_credential_field. Values are
+    normalised and hashed, so cache keys carry no personal data.
+    """
+    kind = 'credential'
+
+    def get_ident_key(self, request, view):
+        data = request.data
+        value = data.get(getattr(view, 'throttle_credential_field', 'username')) if hasattr(data, 'get') else None
+        if not isinstance(value, str) or not value.strip():
+            return None
+        return hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
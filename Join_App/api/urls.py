@@ -1,14 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ContactViewSet, TaskViewSet, UserViewSet, hello_world
+from .views import (
+    ArchiveViewSet, ContactViewSet, TaskViewSet, UserViewSet, avatar, batch, hello_world, metrics, search,
+)
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
 router.register(r'contacts', ContactViewSet, basename='contact')
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'users', UserViewSet, basename='user')  
+router.register(r'archive', ArchiveViewSet, basename='archive')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('hello/', hello_world, name='hello_world'),
+    path('search/', search, name='search'),
+    path('metrics/', metrics, name='metrics'),
+    path('batch/', batch, name='batch'),
+    path('avatars/<slug:avatar_hash>.svg', avatar, name='avatar'),
 ]
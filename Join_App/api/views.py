@@ -1,13 +1,97 @@
-from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, action
+from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import api_view, action, authentication_classes, permission_classes
 from rest_framework.response import Response
-from django.http import JsonResponse
+from rest_framework.pagination import LimitOffsetPagination
+from django.http import HttpResponse, JsonResponse
+from datetime import date, timedelta
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+from django.db.models.functions import Lower, Substr
 from django.contrib.auth.models import User
-from Join_App.models import Task, Contact, Subtask
-from .serializers import ContactSerializer, TaskSerializer, UserSerializer
-from rest_framework.permissions import IsAuthenticated
+from Join_App.archiving import restore_task
+from Join_App.avatars import avatar_settings, get_avatar
+from Join_App.batching import batch_settings, run_batch
+from Join_App.deletion import delete_contacts, delete_tasks
+from Join_App.models import Task, Contact, Subtask, ArchivedTask
+from Join_App.metrics import get_registry, render_prometheus
+from Join_App.provisioning import provision_users
+from Join_App.search import search as search_board
+from Join_App.sharding import use_user_shard
+from Join_App.summary import get_summary
+from .streaming import streaming_list_response, wants_streaming
+from .mixins import (
+    BulkDeleteMixin, CoalescingMixin, ConditionalUpdateMixin, IdempotencyMixin, LockRetryMixin,
+    ShardRoutingMixin,
+)
+from .permissions import CanReadMetrics
+from .serializers import (
+    ArchivedTaskSerializer, BatchSerializer, ContactSerializer, ProvisioningSerializer, TaskSerializer,
+    UserSerializer,
+)
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 
-class ContactViewSet(viewsets.ModelViewSet):
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+CALENDAR_DEFAULT_DAYS = 7
+# Longest calendar window, so a request stays bounded however many tasks a user has
+CALENDAR_MAX_DAYS = 93
+
+# Upper bound for the range scan behind a case-insensitive prefix match
+PREFIX_RANGE_END = '\U0010ffff'
+# Prefixes matched per field in autocomplete; each non-ASCII letter doubles them
+MAX_CASE_VARIANTS = 8
+
+def prefix_match(field, prefix):
+    """
+    Builds a filter for rows whose lowercased field starts with a prefix.
+
+    Expressed as a range on the lowercased value instead of LIKE, so the
+    (user, lower(field)) indexes can be used for the lookup.
+
+    Args:
+        field: Name of an annotation holding the lowercased field
+        prefix: Prefix to match, lowercased by the caller
+
+    Returns:
+        Q: Filter matching the prefix
+    """
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_RANGE_END})
+
+def lower_variants(text):
+    """
+    Returns what SQLite's LOWER() makes of the case variants of a text.
+
+    LOWER() only folds ASCII letters, so a stored "Ö" stays "Ö" and a
+    prefix typed as "ö" has to be matched in both cases. Beyond
+    MAX_CASE_VARIANTS, further non-ASCII letters are kept as typed.
+
+    Args:
+        text: Text as typed
+
+    Returns:
+        list: Distinct variants, the lowercased text first
+    """
+    variants = ['']
+    for char in text:
+        forms = [char.lower()]
+        if not char.isascii() and len(char.upper()) == 1 and char.upper() != forms[0]:
+            forms.append(char.upper())
+        if len(variants) * len(forms) > MAX_CASE_VARIANTS:
+            forms = [char]
+        variants = [variant + form for variant in variants for form in forms]
+    return list(dict.fromkeys(variants))
+
+class ContactGroupPagination(LimitOffsetPagination):
+    """
+    Pagination for loading the contacts of one alphabetical group lazily.
+    """
+    default_limit = 50
+    max_limit = 200
+
+class ContactViewSet(IdempotencyMixin, LockRetryMixin, ShardRoutingMixin, ConditionalUpdateMixin,
+                     BulkDeleteMixin, CoalescingMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Contact objects.
     
@@ -17,6 +101,7 @@ class ContactViewSet(viewsets.ModelViewSet):
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated]
     queryset = Contact.objects.all()
+    bulk_deleter = staticmethod(delete_contacts)
 
     def get_queryset(self):
         """
@@ -59,16 +144,116 @@ class ContactViewSet(viewsets.ModelViewSet):
         """
         Lists all contacts belonging to the authenticated user.
         
+        Concurrent identical requests share one computation of the list.
+        With ?stream=true the list is fetched, serialized and sent in
+        chunks, so large accounts do not hold the whole list in memory.
+        
         Args:
             request: The HTTP request.
             
         Returns:
-            Response: Serialized contacts data.
+            Response: Serialized contacts data, or a StreamingHttpResponse
+            with the same JSON array.
         """
         contacts = self.get_queryset()
+        if wants_streaming(request):
+            return streaming_list_response(contacts, self.get_serializer())
+        return Response(self.coalesced(request, lambda: self.get_serializer(contacts, many=True).data))
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Lists contacts whose name or email starts with the given text.
+        
+        Query parameters:
+            q: Prefix to match, case-insensitive also for non-ASCII letters.
+            limit: Maximum number of results (default 10, at most 50).
+        
+        Args:
+            request: The HTTP request.
+            
+        Returns:
+            Response: Serialized matching contacts ordered by name,
+            or an error if the limit is invalid.
+        """
+        prefix = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+        
+        if not prefix:
+            return Response([])
+        matches = Q()
+        for variant in lower_variants(prefix):
+            matches |= prefix_match('name_lower', variant) | prefix_match('email_lower', variant)
+        contacts = (
+            self.get_queryset()
+            .annotate(name_lower=Lower('name'), email_lower=Lower('email'))
+            .filter(matches)
+            .order_by('name_lower', 'id')[:limit]
+        )
         serializer = self.get_serializer(contacts, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def groups(self, request):
+        """
+        Lists the alphabetical groups of the user's contacts with their sizes.
+        
+        Contacts are grouped by the first letter of their stored initials
+        (see Contact.get_group_initial), the same key the group detail
+        route filters on, so counts and listings agree. The counting runs
+        on the (user, initials) index; the contacts of a group can then be
+        loaded on demand via the group detail route.
+        
+        Args:
+            request: The HTTP request.
+            
+        Returns:
+            Response: List of groups with 'initial' and 'count', sorted by initial.
+        """
+        rows = (
+            self.get_queryset()
+            .annotate(key=Substr('initials', 1, 1))
+            .values('key')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        counts = {row['key'] or '#': row['count'] for row in rows}
+        groups = [{'initial': initial, 'count': counts[initial]} for initial in sorted(counts)]
+        return Response(groups)
+    
+    @action(detail=False, methods=['get'], url_path=r'groups/(?P<initial>[^/.]+)')
+    def group(self, request, initial=None):
+        """
+        Lists the contacts of one alphabetical group, paginated.
+        
+        Query parameters:
+            limit: Page size (default 50, at most 200).
+            offset: Number of contacts to skip.
+        
+        Args:
+            request: The HTTP request.
+            initial: The group letter as returned by the groups route.
+            
+        Returns:
+            Response: Paginated serialized contacts of the group ordered by name.
+        """
+        initial = initial[:1].upper()
+        contacts = self.get_queryset().annotate(name_lower=Lower('name'))
+        if initial == '#':
+            contacts = contacts.filter(initials='')
+        else:
+            contacts = contacts.filter(prefix_match('initials', initial))
+        contacts = contacts.order_by('name_lower', 'id')
+        
+        paginator = ContactGroupPagination()
+        page = paginator.paginate_queryset(contacts, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
     def create(self, request):
         """
         Creates a new contact for the authenticated user.
@@ -91,7 +276,8 @@ class ContactViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(IdempotencyMixin, LockRetryMixin, ShardRoutingMixin, ConditionalUpdateMixin,
+                  BulkDeleteMixin, CoalescingMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Task objects.
     
@@ -100,6 +286,7 @@ class TaskViewSet(viewsets.ModelViewSet):
     """
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    bulk_deleter = staticmethod(delete_tasks)
     
     def get_queryset(self):
         """
@@ -142,15 +329,111 @@ class TaskViewSet(viewsets.ModelViewSet):
         """
         Lists all tasks belonging to the authenticated user.
         
+        Concurrent identical requests share one computation of the list.
+        With ?stream=true the list is fetched, serialized and sent in
+        chunks, so large accounts do not hold the whole list in memory.
+        
         Args:
             request: The HTTP request.
             
         Returns:
-            Response: Serialized tasks data.
+            Response: Serialized tasks data, or a StreamingHttpResponse
+            with the same JSON array.
         """
         tasks = self.get_queryset()
+        if wants_streaming(request):
+            tasks = tasks.prefetch_related('subtasks', Prefetch('assigned_to', Contact.objects.only('id')))
+            return streaming_list_response(tasks, self.get_serializer())
+        return Response(self.coalesced(request, lambda: self.get_serializer(tasks, many=True).data))
+    
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Lists the tasks due in a date range with their workload per day.
+        
+        The per-day counts are computed with one GROUP BY due_date over
+        the (user, due_date) index; days without tasks are included with
+        zero counts.
+        
+        Query parameters:
+            from: First day as YYYY-MM-DD (default today).
+            to: Last day, inclusive (default 6 days after from, at most
+                92 days after from).
+        
+        Args:
+            request: The HTTP request.
+            
+        Returns:
+            Response: The range, one entry per day with total, overdue
+            (not done and past due), urgent (not done) and counts per
+            priority and category, and the serialized tasks ordered by
+            due date; or an error if the range is invalid.
+        """
+        try:
+            start = date.fromisoformat(request.query_params.get('from') or timezone.localdate().isoformat())
+            end = request.query_params.get('to')
+            end = date.fromisoformat(end) if end else start + timedelta(days=CALENDAR_DEFAULT_DAYS - 1)
+        except ValueError:
+            return Response({"error": "from and to must be dates as YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= (end - start).days < CALENDAR_MAX_DAYS:
+            return Response({"error": f"to must be within {CALENDAR_MAX_DAYS} days on or after from"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        tasks = self.get_queryset().filter(due_date__range=(start, end))
+        open_tasks = ~Q(category='done')
+        counts = {
+            'total': Count('id'),
+            'overdue': Count('id', filter=open_tasks & Q(due_date__lt=timezone.localdate())),
+            'urgent': Count('id', filter=open_tasks & Q(priority='urgent')),
+            **{f'priority_{key}': Count('id', filter=Q(priority=key)) for key, _ in Task.PRIORITY_CHOICES},
+            **{f'category_{key}': Count('id', filter=Q(category=key)) for key, _ in Task.CATEGORY_CHOICES},
+        }
+        rows = {row['due_date']: row for row in tasks.values('due_date').annotate(**counts).order_by('due_date')}
+        days = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            row = rows.get(day, {})
+            days.append({
+                'date': day,
+                'total': row.get('total', 0),
+                'overdue': row.get('overdue', 0),
+                'urgent': row.get('urgent', 0),
+                'priority': {key: row.get(f'priority_{key}', 0) for key, _ in Task.PRIORITY_CHOICES},
+                'category': {key: row.get(f'category_{key}', 0) for key, _ in Task.CATEGORY_CHOICES},
+            })
+        
+        tasks = tasks.order_by('due_date', 'id').prefetch_related(
+            'subtasks', Prefetch('assigned_to', queryset=Contact.objects.only('id')),
+        )
         serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+        return Response({'from': start, 'to': end, 'days': days, 'tasks': serializer.data})
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Returns the figures of the summary page.
+        
+        Read from the user's UserBoardSummary row, which task writes keep
+        current, instead of aggregating the tasks on every request.
+        
+        Args:
+            request: The HTTP request.
+            
+        Returns:
+            Response: Tasks per category and in total, open urgent and
+            overdue tasks, the next due date of an open task and the day
+            the figures refer to.
+        """
+        summary = get_summary(request.user.id)
+        category = {key: getattr(summary, key) for key, _ in Task.CATEGORY_CHOICES}
+        return Response({
+            'category': category,
+            'total': sum(category.values()),
+            'urgent': summary.urgent,
+            'overdue': summary.overdue,
+            'nextDeadline': summary.next_deadline,
+            'asOf': summary.as_of,
+        })
     
 def create(self, request):
     """
@@ -180,7 +463,52 @@ def create(self, request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class UserViewSet(viewsets.ModelViewSet):
+class ArchivePagination(LimitOffsetPagination):
+    """
+    Pagination for the archive, which grows without bound.
+    """
+    default_limit = 50
+    max_limit = 200
+
+class ArchiveViewSet(LockRetryMixin, ShardRoutingMixin, CoalescingMixin, mixins.ListModelMixin,
+                     mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet for browsing and restoring archived tasks.
+
+    Lists the archived tasks of the authenticated user, most recently
+    completed first, and restores single tasks onto the board.
+    """
+    serializer_class = ArchivedTaskSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ArchivePagination
+
+    def get_queryset(self):
+        """
+        Returns the archived tasks of the authenticated user.
+
+        Returns:
+            QuerySet: ArchivedTask objects with subtasks and contact IDs prefetched.
+        """
+        return (ArchivedTask.objects.filter(user=self.request.user)
+                .order_by('-completed_at', '-id')
+                .prefetch_related('subtasks', Prefetch('assigned_to', queryset=Contact.objects.only('id'))))
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """
+        Moves an archived task back onto the board.
+
+        Args:
+            request: The HTTP request.
+            pk: ID of the archive entry.
+
+        Returns:
+            Response: Success message with the taskID of the restored task.
+        """
+        task = restore_task(self.get_object())
+        return Response({"status": "success", "taskID": task.id})
+
+class UserViewSet(LockRetryMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing User objects.
     
@@ -189,6 +517,8 @@ class UserViewSet(viewsets.ModelViewSet):
     while staff users can access all users.
     """
     serializer_class = UserSerializer
+    # Hashes the passwords before its own short write transaction
+    transaction_exempt_actions = ('provision',)
     
     def get_queryset(self):
         """
@@ -255,6 +585,32 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response({"status": "success"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def provision(self, request):
+        """
+        Creates many users with their profiles and tokens at once.
+        
+        Passwords are hashed in parallel over several processes and the
+        rows are inserted in bulk. Staff only.
+        
+        Body:
+            users: Rows with name, email and password (at most MAX_USERS).
+        
+        Args:
+            request: The HTTP request.
+            
+        Returns:
+            Response: The created users and the errors of the skipped rows
+            by their index; 201 if any user was created, otherwise 400.
+        """
+        serializer = ProvisioningSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        users, errors = provision_users(serializer.validated_data['users'])
+        return Response({
+            "created": [{"userID": user.id, "name": user.username} for user in users],
+            "errors": errors,
+        }, status=status.HTTP_201_CREATED if users else status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 def hello_world(request):
@@ -267,4 +623,116 @@ def hello_world(request):
     Returns:
         Response: A JSON response with a "Hello World!" message.
     """
-    return Response({"message": "Hello World!"})
\ No newline at end of file
+    return Response({"message": "Hello World!"})
+
+@api_view(['GET'])
+def search(request):
+    """
+    Full-text search over the tasks, subtasks and contacts of the authenticated user.
+
+    Query parameters:
+        q: Search text; every word is matched as a prefix.
+        limit: Maximum number of results (default 20, at most 100).
+
+    Args:
+        request: The HTTP request.
+
+    Returns:
+        Response: Ranked list of matching objects, best match first,
+        or an error if the limit is invalid.
+    """
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    if not query:
+        return Response([])
+    with use_user_shard(request.user.id):
+        return Response(search_board(request.user, query, limit))
+
+@api_view(['POST'])
+def batch(request):
+    """
+    Runs several API requests of the authenticated user in one round trip.
+
+    Body:
+        requests: List of sub-requests, each with method, path, an optional
+            JSON body and optional headers (see BATCH['HEADERS']).
+        atomic: Run all sub-requests in one transaction and roll it back
+            at the first failed one (default false).
+
+    Args:
+        request: The HTTP request.
+
+    Returns:
+        Response: Status and body of every sub-request that ran, in order,
+        and whether their writes were committed, or an error if the batch
+        is invalid or too large.
+    """
+    max_bytes = batch_settings()['MAX_BYTES']
+    if int(request.META.get('CONTENT_LENGTH') or 0) > max_bytes:
+        return Response({"error": f"Batch body exceeds {max_bytes} bytes"},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    responses, committed = run_batch(request, serializer.validated_data['requests'],
+                                     serializer.validated_data['atomic'])
+    return Response({'responses': responses, 'committed': committed})
+
+@api_view(['GET'])
+@permission_classes([CanReadMetrics])
+def metrics(request):
+    """
+    Exports the metrics of all worker processes in the Prometheus text format.
+    
+    Accessible to staff users and to scrapers sending the configured
+    bearer token.
+    
+    Args:
+        request: The HTTP request.
+        
+    Returns:
+        HttpResponse: The metrics in the Prometheus exposition format.
+    """
+    counters, histograms = get_registry().collect()
+    return HttpResponse(
+        render_prometheus(counters, histograms),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def avatar(request, avatar_hash):
+    """
+    Serves the SVG avatar of a contact by the hash listed with the contact.
+    
+    The hash is derived from initials and colour, so the response never
+    changes and may be cached by browsers and shared HTTP caches for good.
+    Public, as image tags send no token; it reveals only initials and
+    colour.
+    
+    Args:
+        request: The HTTP request.
+        avatar_hash: The contact's avatarHash.
+        
+    Returns:
+        HttpResponse: The SVG image, 304 if the client has it, or 404.
+    """
+    etag = f'"{avatar_hash}"'
+    cache_control = f"public, max-age={avatar_settings()['MAX_AGE']}, immutable"
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        svg = get_avatar(avatar_hash)
+        if svg is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(svg, content_type='image/svg+xml')
+        # Opened directly, the SVG may neither run scripts nor load anything
+        response['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
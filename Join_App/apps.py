@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class JoinAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Join_App'
+
+    def ready(self):
+        import Join_App.signals
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from Join_App.database import run_in_transaction
+from Join_App.models import ArchivedSubtask, ArchivedTask, Subtask, Task
+from Join_App.summary import record_removals
+
+ARCHIVING_DEFAULTS = {
+    # Done tasks are archived this many days after their completion
+    'AFTER_DAYS': 30,
+    # Tasks moved per transaction, keeping the write lock short
+    'BATCH_SIZE': 500,
+}
+
+TaskAssignment = Task.assigned_to.through
+ArchivedAssignment = ArchivedTask.assigned_to.through
+
+# Fields copied between tasks and archived tasks
+TASK_FIELDS = ['user_id', 'title', 'description', 'due_date', 'priority', 'category',
+               'current_progress', 'completed_at', 'version']
+
+
+def archiving_settings():
+    """
+    Returns the archiving settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**ARCHIVING_DEFAULTS, **getattr(settings, 'ARCHIVING', {})}
+
+
+def archive_batch(task_ids, completed_before=None, using=DEFAULT_DB_ALIAS):
+    """
+    Moves tasks with their subtasks and assignments into the archive tables.
+
+    Must run in a transaction, which also updates the users' summaries.
+    Tasks that are no longer done, or were completed after
+    completed_before, are skipped.
+
+    Args:
+        task_ids: IDs of the tasks to archive
+        completed_before: Only archive tasks completed before this time
+        using: Database alias
+
+    Returns:
+        int: Number of archived tasks
+    """
+    tasks = Task.objects.using(using).filter(id__in=task_ids, category='done')
+    if completed_before is not None:
+        tasks = tasks.filter(completed_at__lt=completed_before)
+    tasks = list(tasks)
+    if not tasks:
+        return 0
+
+    archived = [ArchivedTask(original_id=task.id, **{field: getattr(task, field) for field in TASK_FIELDS})
+                for task in tasks]
+    ArchivedTask.objects.using(using).bulk_create(archived)
+    archive_ids = {task.original_id: task.id for task in archived}
+    ids = list(archive_ids)
+    ArchivedSubtask.objects.using(using).bulk_create(
+        ArchivedSubtask(task_id=archive_ids[task_id], name=name, done=done)
+        for task_id, name, done in Subtask.objects.using(using).filter(task_id__in=ids)
+        .order_by('id').values_list('task_id', 'name', 'done')
+    )
+    ArchivedAssignment.objects.using(using).bulk_create(
+        ArchivedAssignment(archivedtask_id=archive_ids[task_id], contact_id=contact_id)
+        for task_id, contact_id in TaskAssignment.objects.using(using).filter(task_id__in=ids)
+        .values_list('task_id', 'contact_id')
+    )
+    Task.objects.using(using).filter(id__in=ids).delete()
+    record_removals([(task.user_id, *task.summary_state()) for task in tasks], using)
+    return len(tasks)
+
+
+def archive_tasks(completed_before=None, batch_size=None, using=DEFAULT_DB_ALIAS):
+    """
+    Archives all done tasks completed before a point in time.
+
+    Every batch runs in its own transaction, retried on lock errors, so
+    the board stays writable while a large backlog is archived.
+
+    Args:
+        completed_before: Cutoff (default: AFTER_DAYS days ago)
+        batch_size: Tasks per transaction (default: BATCH_SIZE)
+        using: Database alias
+
+    Returns:
+        int: Number of archived tasks
+    """
+    config = archiving_settings()
+    if completed_before is None:
+        completed_before = timezone.now() - timedelta(days=config['AFTER_DAYS'])
+    batch_size = batch_size or config['BATCH_SIZE']
+    candidates = (Task.objects.using(using)
+                  .filter(category='done', completed_at__lt=completed_before)
+                  .order_by('completed_at').values_list('id', flat=True))
+    total = 0
+    while True:
+        ids = list(candidates[:batch_size])
+        if not ids:
+            return total
+        archived = run_in_transaction(archive_batch, ids, completed_before, using, using=using)
+        if not archived:
+            return total
+        total += archived
+
+
+def restore_task(archived):
+    """
+    Moves an archived task back onto the board.
+
+    The task gets its original ID back unless another task took it. Its
+    completion time is reset, so it is not archived again right away, and
+    its version is incremented, so ETags from before archiving are stale.
+    Must run in a transaction.
+
+    Args:
+        archived: The ArchivedTask
+
+    Returns:
+        Task: The restored task
+    """
+    using = archived._state.db
+    fields = {field: getattr(archived, field) for field in TASK_FIELDS}
+    fields['completed_at'] = timezone.now() if archived.category == 'done' else None
+    fields['version'] += 1
+    task = Task(**fields)
+    if not Task.objects.using(using).filter(id=archived.original_id).exists():
+        task.id = archived.original_id
+    task.save(using=using, force_insert=True)
+    Subtask.objects.using(using).bulk_create(
+        Subtask(task=task, name=name, done=done)
+        for name, done in archived.subtasks.order_by('id').values_list('name', 'done')
+    )
+    TaskAssignment.objects.using(using).bulk_create(
+        TaskAssignment(task_id=task.id, contact_id=contact_id)
+        for contact_id in archived.assigned_to.values_list('id', flat=True)
+    )
+    archived.delete()
+    return task
@@ -0,0 +1,148 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from html import escape
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+AVATAR_DEFAULTS = {
+    # Rendered SVGs kept per worker process
+    'CACHE_SIZE': 1024,
+    # Seconds HTTP caches may keep an avatar; its URL changes with its content
+    'MAX_AGE': 365 * 24 * 60 * 60,
+}
+
+# Part of every avatar hash. Bump it whenever SVG_TEMPLATE changes, so every
+# avatar gets a new URL instead of browsers keeping the old drawing until
+# MAX_AGE expires, and add a migration storing the new hashes (see 0022).
+TEMPLATE_VERSION = 1
+
+# Bubble as drawn by the frontend
+SVG_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="42" height="42" viewBox="0 0 42 42">'
+    '<circle cx="21" cy="21" r="20" fill="{color}" stroke="#ffffff" stroke-width="2"/>'
+    '<text x="21" y="21" dy=".35em" text-anchor="middle" font-family="Inter, Helvetica, Arial, sans-serif"'
+    ' font-size="14" fill="#ffffff">{initials}</text></svg>'
+)
+
+
+def avatar_settings():
+    """
+    Returns the avatar settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**AVATAR_DEFAULTS, **getattr(settings, 'AVATARS', {})}
+
+
+def avatar_hash(initials, color):
+    """
+    Returns the content hash addressing the avatar of initials and colour.
+
+    Contacts with the same initials and colour share one avatar. The hash
+    covers TEMPLATE_VERSION, so it changes with the drawing.
+
+    Args:
+        initials: Initials shown in the bubble
+        color: Hex colour of the bubble
+
+    Returns:
+        str: 16 hex digits
+    """
+    return hashlib.sha256(f'{TEMPLATE_VERSION}\n{initials}\n{color}'.encode()).hexdigest()[:16]
+
+
+def render_avatar(initials, color):
+    """
+    Renders an avatar as SVG.
+
+    Args:
+        initials: Initials shown in the bubble
+        color: Hex colour of the bubble
+
+    Returns:
+        bytes: The SVG document
+    """
+    return SVG_TEMPLATE.format(initials=escape(initials), color=escape(color)).encode()
+
+
+class LRUCache:
+    """
+    Thread-safe mapping dropping the least recently used entry when full.
+
+    Args:
+        size: Maximum number of entries
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_avatars = LRUCache(avatar_settings()['CACHE_SIZE'])
+
+
+def find_avatar(digest):
+    """
+    Looks up initials and colour of an avatar hash in the contact tables.
+
+    Args:
+        digest: Avatar hash
+
+    Returns:
+        tuple: (initials, color), or None if no contact has the avatar
+    """
+    from Join_App.models import Contact
+    from Join_App.sharding import sharding_settings
+
+    for alias in sharding_settings()['SHARDS'] or [DEFAULT_DB_ALIAS]:
+        found = Contact.objects.using(alias).filter(avatar_hash=digest).values_list('initials', 'color').first()
+        if found:
+            return found
+    return None
+
+
+def get_avatar(digest):
+    """
+    Returns the SVG of an avatar hash, rendered at most once per process.
+
+    Unknown hashes are not cached, as a contact may get the avatar later.
+
+    Args:
+        digest: Avatar hash
+
+    Returns:
+        bytes: The SVG document, or None for an unknown hash
+    """
+    svg = _avatars.get(digest)
+    if svg is None:
+        found = find_avatar(digest)
+        if found is None:
+            return None
+        svg = render_avatar(*found)
+        _avatars.put(digest, svg)
+    return svg
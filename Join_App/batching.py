@@ -0,0 +1,161 @@
+import json
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import Resolver404, resolve
+
+from Join_App.database import run_in_transaction
+from Join_App.sharding import shard_for_user
+
+BATCH_DEFAULTS = {
+    # Sub-requests per batch
+    'MAX_REQUESTS': 20,
+    # Size of the batch request body
+    'MAX_BYTES': 1024 * 1024,
+    # Headers a sub-request may set itself; all others are taken from the batch request
+    'HEADERS': ['Idempotency-Key', 'If-Match'],
+}
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class _Rollback(Exception):
+    """
+    Raised to roll back an atomic batch after a failed sub-request.
+    """
+
+
+def batch_settings():
+    """
+    Returns the batch settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**BATCH_DEFAULTS, **getattr(settings, 'BATCH', {})}
+
+
+def _header_key(name):
+    return 'HTTP_' + name.upper().replace('-', '_')
+
+
+def build_subrequest(request, method, path, body=None, headers=None):
+    """
+    Builds the request of one sub-request from the batch request.
+
+    The sub-request carries the headers of the batch request, except the
+    ones sub-requests set themselves, and is authenticated as the batch
+    request's user without running the authentication again.
+
+    Args:
+        request: The DRF request of the batch
+        method: HTTP method
+        path: Path with an optional query string
+        body: Optional JSON-serializable body
+        headers: Optional headers allowed by HEADERS
+
+    Returns:
+        WSGIRequest: The sub-request
+    """
+    parts = urlsplit(path)
+    data = b'' if body is None else json.dumps(body).encode()
+    environ = dict(request.META)
+    for name in batch_settings()['HEADERS']:
+        environ.pop(_header_key(name), None)
+    for name, value in (headers or {}).items():
+        environ[_header_key(name)] = value
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(data)),
+        'wsgi.input': BytesIO(data),
+    })
+    subrequest = WSGIRequest(environ)
+    # Picked up by DRF's Request instead of the authentication classes
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def _response_body(response):
+    if hasattr(response, 'data'):
+        return response.data
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    if content and response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(content)
+    return content.decode() or None
+
+
+def run_subrequest(request, entry):
+    """
+    Runs one sub-request through the view of its route.
+
+    Only the routes of the Join API router can be called; the middleware
+    already ran for the batch request and is not repeated.
+
+    Args:
+        request: The DRF request of the batch
+        entry: Validated sub-request with method, path, body and headers
+
+    Returns:
+        dict: Status code and body of the response
+    """
+    from Join_App.api.urls import router
+
+    path = urlsplit(entry['path']).path
+    try:
+        match = resolve(path)
+    except Resolver404:
+        match = None
+    viewsets = {viewset for _, viewset, _ in router.registry}
+    if match is None or getattr(match.func, 'cls', None) not in viewsets:
+        return {'status': 404, 'body': {'detail': 'Not found.'}}
+
+    subrequest = build_subrequest(request, entry['method'], entry['path'], entry.get('body'), entry.get('headers'))
+    subrequest.resolver_match = match
+    response = match.func(subrequest, *match.args, **match.kwargs)
+    return {'status': response.status_code, 'body': _response_body(response)}
+
+
+def run_batch(request, entries, atomic=False):
+    """
+    Runs sub-requests in order.
+
+    Without atomic, every sub-request commits on its own and a failure
+    does not stop the batch. With atomic, the board data writes of all
+    sub-requests share one transaction on the user's database, retried on
+    lock errors; the first response with a 4xx/5xx status rolls it back and
+    ends the batch.
+
+    Args:
+        request: The DRF request of the batch
+        entries: Validated sub-requests
+        atomic: Whether to run all sub-requests in one transaction
+
+    Returns:
+        tuple: (responses, committed) with the responses of the sub-requests
+        that ran
+    """
+    if not atomic:
+        return [run_subrequest(request, entry) for entry in entries], True
+
+    responses = []
+
+    def run_all():
+        responses.clear()
+        for entry in entries:
+            responses.append(run_subrequest(request, entry))
+            if responses[-1]['status'] >= 400:
+                raise _Rollback()
+
+    alias, _ = shard_for_user(request.user.id)
+    try:
+        run_in_transaction(run_all, using=alias or DEFAULT_DB_ALIAS)
+    except _Rollback:
+        return responses, False
+    return responses, True
@@ -0,0 +1,673 @@
+import json
+import multiprocessing
+import platform
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections
+from django.core.cache import caches
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+
+from Join_App.api import urls as join_app_urls
+from Join_App.api.throttling import throttling_settings
+from Join_App.database import is_lock_error, run_in_transaction
+from Join_App.metrics import MetricsRegistry
+from Join_App.middleware import QueryStats
+from Join_App.archiving import archive_batch
+from Join_App.models import ArchivedTask, Task, Contact, Subtask
+from Join_App.summary import rebuild_summary
+from user_auth_app.tokens import issue_token
+from user_auth_app.api import urls as user_auth_urls
+from user_auth_app.models import UserProfile
+
+# Routes whose handlers hash a password; they are run fewer times
+HASHING_ITERATIONS = 3
+# Archived tasks created for the archive listing
+ARCHIVE_PAGE = 50
+# Rows deleted per bulk delete request
+BULK_DELETE_SIZE = 50
+# Users created per bulk provisioning request
+PROVISION_SIZE = 4
+
+
+def percentile(values, fraction):
+    """
+    Returns the nearest-rank percentile of a list of numbers.
+
+    Args:
+        values: Measured values
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The percentile, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(latencies_ms):
+    """
+    Condenses a list of latencies into the reported statistics.
+
+    Args:
+        latencies_ms: Request latencies in milliseconds
+
+    Returns:
+        dict: Sample count, mean and p50/p90/p99 in milliseconds
+    """
+    return {
+        'samples': len(latencies_ms),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+        'p50_ms': round(percentile(latencies_ms, 0.50), 3),
+        'p90_ms': round(percentile(latencies_ms, 0.90), 3),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 3),
+    }
+
+
+def url_names(patterns, seen=None):
+    """
+    Collects the names of all URL patterns below a list of patterns.
+
+    Args:
+        patterns: URL patterns, possibly containing nested resolvers
+        seen: Set to add the names to
+
+    Returns:
+        set: Names of all named URL patterns
+    """
+    seen = set() if seen is None else seen
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            url_names(pattern.url_patterns, seen)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            seen.add(pattern.name)
+    return seen
+
+
+class BenchmarkContext:
+    """
+    State shared by the scenarios of one benchmark run.
+
+    Holds an authenticated client for a seeded user and creates the
+    objects that write scenarios consume, outside of the timed section.
+    """
+
+    def __init__(self, user, token):
+        self.user = user
+        # Server errors are reported as status codes instead of aborting the run
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {token}', raise_request_exception=False)
+        self.anonymous = Client(raise_request_exception=False)
+        self.staff = Client(raise_request_exception=False)
+        self.staff.force_login(User.objects.create_user('bench_staff', is_staff=True))
+        self.task = Task.objects.filter(user=user).first()
+        self.contact = Contact.objects.filter(user=user).first()
+        self.profile = UserProfile.objects.get(user=user)
+        # A filled archive page for the archive listing
+        for _ in range(ARCHIVE_PAGE):
+            self.archived = self.new_archived_task()
+
+    @property
+    def logout_client(self):
+        # Logging out deletes the token, so every request gets a fresh one
+        return Client(HTTP_AUTHORIZATION=f'Token {issue_token(self.user).key}', raise_request_exception=False)
+
+    def new_archived_task(self):
+        task = Task.objects.create(user=self.user, title='Archived task', due_date='2030-01-01', category='done')
+        task.assigned_to.set(Contact.objects.filter(user=self.user)[:2])
+        Subtask.objects.create(task=task, name='Archived step', done=True)
+        archive_batch([task.id])
+        return ArchivedTask.objects.get(original_id=task.id)
+
+    def new_task(self):
+        return Task.objects.create(user=self.user, title='Benchmark task', due_date='2030-01-01')
+
+    def new_contact(self):
+        return Contact.objects.create(user=self.user, name='Benchmark Contact', email='bench@example.com')
+
+    def avatar_hash(self):
+        # The write scenarios rename the contact, which changes its avatar
+        self.contact.refresh_from_db(fields=['avatar_hash'])
+        return self.contact.avatar_hash
+
+    def bulk_delete_tasks(self, count=BULK_DELETE_SIZE):
+        tasks = Task.objects.bulk_create(
+            Task(user=self.user, title='Benchmark task', due_date='2030-01-01') for _ in range(count)
+        )
+        Subtask.objects.bulk_create(Subtask(task=task, name='Benchmark step') for task in tasks)
+        Task.assigned_to.through.objects.bulk_create(
+            Task.assigned_to.through(task_id=task.id, contact_id=self.contact.id) for task in tasks
+        )
+        # bulk_create skips the summary updates of Task.save()
+        rebuild_summary(self.user.id)
+        return {'ids': [task.id for task in tasks]}
+
+    def bulk_delete_contacts(self, count=BULK_DELETE_SIZE):
+        contacts = [Contact(user=self.user, name='Benchmark Contact', email='bench@example.com')
+                    for _ in range(count)]
+        for contact in contacts:
+            contact.update_avatar()
+        contacts = Contact.objects.bulk_create(contacts)
+        Task.assigned_to.through.objects.bulk_create(
+            Task.assigned_to.through(task_id=self.task.id, contact_id=contact.id) for contact in contacts
+        )
+        return {'ids': [contact.id for contact in contacts]}
+
+    def task_payload(self):
+        contacts = list(Contact.objects.filter(user=self.user).values_list('id', flat=True)[:2])
+        return {
+            'title': 'Benchmark task',
+            'description': 'Created by the benchmark runner',
+            'assignedTo': [{'contactID': contact_id} for contact_id in contacts],
+            'dueDate': '2030-01-01',
+            'priority': 'urgent',
+            'category': 'todo',
+            'subtasks': [{'subTaskName': 'First step', 'done': False},
+                         {'subTaskName': 'Second step', 'done': True}],
+        }
+
+    def batch_payload(self):
+        # A typical flow: create a task, then move and update others
+        task_path = reverse('task-detail', args=[self.task.pk])
+        return {'requests': [
+            {'method': 'POST', 'path': reverse('task-list'), 'body': self.task_payload()},
+            {'method': 'PATCH', 'path': task_path, 'body': {'category': 'inprogress'}},
+            {'method': 'PATCH', 'path': task_path, 'body': {'currentProgress': 50}},
+            {'method': 'PATCH', 'path': reverse('contact-detail', args=[self.contact.pk]),
+             'body': {'phone': '+49 987 654'}},
+            {'method': 'GET', 'path': task_path},
+        ]}
+
+    def provision_payload(self, count=PROVISION_SIZE):
+        prefix = self.unique_name('bench')
+        return {'users': [{'name': f'{prefix}_{index}', 'email': f'{prefix}_{index}@example.com',
+                           'password': 'bench-password'} for index in range(count)]}
+
+    @staticmethod
+    def contact_payload():
+        return {'name': 'Benchmark Contact', 'email': 'bench@example.com', 'phone': '+49 123 456'}
+
+    @staticmethod
+    def unique_name(prefix):
+        return f'{prefix}_{uuid.uuid4().hex[:12]}'
+
+
+class Scenario:
+    """
+    One benchmarked request: a route, a method and how to build the request.
+
+    Args:
+        route: URL name of the route
+        method: HTTP method
+        path: Callable taking the context and returning the request path
+        body: Optional callable taking the context and returning the JSON body
+        client: Client attribute of the context to use: 'client' for the
+            seeded user, 'logout_client' for the seeded user with a fresh
+            token, 'anonymous' or 'staff'
+        iterations: Upper bound for the iterations of this scenario
+        variant: Optional label telling apart scenarios of the same route
+            and method, e.g. with different query parameters
+    """
+
+    def __init__(self, route, method, path, body=None, client='client', iterations=None, variant=None):
+        self.route = route
+        self.method = method
+        self.path = path
+        self.body = body
+        self.client = client
+        self.iterations = iterations
+        self.variant = variant
+
+    @property
+    def key(self):
+        key = f'{self.method} {self.route}'
+        return f'{key} ({self.variant})' if self.variant else key
+
+    def build(self, ctx):
+        """
+        Prepares one request; runs outside of the timed section.
+
+        Args:
+            ctx: The benchmark context
+
+        Returns:
+            tuple: Client, path and keyword arguments for Client.generic
+        """
+        kwargs = {}
+        if self.body is not None:
+            kwargs = {'data': json.dumps(self.body(ctx)), 'content_type': 'application/json'}
+        return getattr(ctx, self.client), self.path(ctx), kwargs
+
+
+def _detail(route, factory):
+    return lambda ctx: reverse(route, args=[factory(ctx).pk])
+
+
+SCENARIOS = [
+    Scenario('api-root', 'GET', lambda ctx: reverse('api-root')),
+    Scenario('hello_world', 'GET', lambda ctx: reverse('hello_world')),
+    Scenario('search', 'GET', lambda ctx: reverse('search') + '?q=review'),
+    Scenario('metrics', 'GET', lambda ctx: reverse('metrics'), client='staff'),
+    Scenario('contact-list', 'GET', lambda ctx: reverse('contact-list')),
+    Scenario('contact-list', 'GET', lambda ctx: reverse('contact-list') + '?stream=true', variant='stream'),
+    Scenario('contact-list', 'POST', lambda ctx: reverse('contact-list'),
+             body=lambda ctx: ctx.contact_payload()),
+    Scenario('contact-detail', 'GET', lambda ctx: reverse('contact-detail', args=[ctx.contact.pk])),
+    Scenario('contact-detail', 'PUT', lambda ctx: reverse('contact-detail', args=[ctx.contact.pk]),
+             body=lambda ctx: ctx.contact_payload()),
+    Scenario('contact-detail', 'PATCH', lambda ctx: reverse('contact-detail', args=[ctx.contact.pk]),
+             body=lambda ctx: {'phone': '+49 987 654'}),
+    Scenario('contact-detail', 'DELETE', _detail('contact-detail', lambda ctx: ctx.new_contact())),
+    Scenario('contact-bulk-delete', 'POST', lambda ctx: reverse('contact-bulk-delete'),
+             body=lambda ctx: ctx.bulk_delete_contacts()),
+    Scenario('contact-autocomplete', 'GET', lambda ctx: reverse('contact-autocomplete') + '?q=a'),
+    Scenario('contact-groups', 'GET', lambda ctx: reverse('contact-groups')),
+    Scenario('contact-group', 'GET', lambda ctx: reverse('contact-group', args=['A'])),
+    Scenario('task-list', 'GET', lambda ctx: reverse('task-list')),
+    Scenario('task-list', 'GET', lambda ctx: reverse('task-list') + '?stream=true', variant='stream'),
+    Scenario('task-list', 'POST', lambda ctx: reverse('task-list'),
+             body=lambda ctx: ctx.task_payload()),
+    # A month around today, where the seeded due dates are densest
+    Scenario('task-calendar', 'GET', lambda ctx: reverse('task-calendar')
+             + f'?from={date.today() - timedelta(days=15)}&to={date.today() + timedelta(days=15)}'),
+    Scenario('task-summary', 'GET', lambda ctx: reverse('task-summary')),
+    Scenario('task-detail', 'GET', lambda ctx: reverse('task-detail', args=[ctx.task.pk])),
+    Scenario('task-detail', 'PUT', lambda ctx: reverse('task-detail', args=[ctx.task.pk]),
+             body=lambda ctx: ctx.task_payload()),
+    Scenario('task-detail', 'PATCH', lambda ctx: reverse('task-detail', args=[ctx.task.pk]),
+             body=lambda ctx: {'category': 'inprogress'}),
+    Scenario('task-detail', 'DELETE', _detail('task-detail', lambda ctx: ctx.new_task())),
+    Scenario('task-bulk-delete', 'POST', lambda ctx: reverse('task-bulk-delete'),
+             body=lambda ctx: ctx.bulk_delete_tasks()),
+    Scenario('archive-list', 'GET', lambda ctx: reverse('archive-list')),
+    Scenario('archive-detail', 'GET', lambda ctx: reverse('archive-detail', args=[ctx.archived.pk])),
+    Scenario('archive-restore', 'POST', _detail('archive-restore', lambda ctx: ctx.new_archived_task())),
+    Scenario('avatar', 'GET', lambda ctx: reverse('avatar', args=[ctx.avatar_hash()]), client='anonymous'),
+    Scenario('batch', 'POST', lambda ctx: reverse('batch'), body=lambda ctx: ctx.batch_payload()),
+    Scenario('user-list', 'GET', lambda ctx: reverse('user-list')),
+    Scenario('user-list', 'POST', lambda ctx: reverse('user-list'),
+             body=lambda ctx: {'name': ctx.unique_name('bench'), 'email': 'bench@example.com',
+                               'password': 'bench-password'},
+             iterations=HASHING_ITERATIONS),
+    Scenario('user-provision', 'POST', lambda ctx: reverse('user-provision'),
+             body=lambda ctx: ctx.provision_payload(), client='staff', iterations=HASHING_ITERATIONS),
+    Scenario('user-detail', 'GET', lambda ctx: reverse('user-detail', args=[ctx.user.pk])),
+    Scenario('user-detail', 'PATCH', lambda ctx: reverse('user-detail', args=[ctx.user.pk]),
+             body=lambda ctx: {'email': ctx.user.email}),
+    Scenario('guest-login', 'POST', lambda ctx: reverse('guest-login'), body=lambda ctx: {},
+             client='anonymous', iterations=HASHING_ITERATIONS),
+    Scenario('logout', 'POST', lambda ctx: reverse('logout'), client='logout_client'),
+    Scenario('userprofile-list', 'GET', lambda ctx: reverse('userprofile-list')),
+    Scenario('userprofile-detail', 'GET',
+             lambda ctx: reverse('userprofile-detail', args=[ctx.profile.pk])),
+    Scenario('registration', 'POST', lambda ctx: reverse('registration'),
+             body=lambda ctx: {'username': (name := ctx.unique_name('bench')),
+                               'email': f'{name}@example.com',
+                               'password': 'bench-password', 'repeated_password': 'bench-password'},
+             client='anonymous', iterations=HASHING_ITERATIONS),
+    Scenario('login', 'POST', lambda ctx: reverse('login'),
+             body=lambda ctx: {'username': ctx.user.username, 'password': 'join-seed-password'},
+             client='anonymous', iterations=HASHING_ITERATIONS),
+]
+
+
+def uncovered_routes(scenarios=SCENARIOS):
+    """
+    Lists the named routes of both API modules no scenario exercises.
+
+    Args:
+        scenarios: Scenarios to check
+
+    Returns:
+        list: Sorted URL names without a scenario
+    """
+    names = url_names(join_app_urls.urlpatterns) | url_names(user_auth_urls.urlpatterns)
+    return sorted(names - {scenario.route for scenario in scenarios})
+
+
+def run_scenario(scenario, ctx, iterations, warmup, alloc_iterations):
+    """
+    Measures one scenario.
+
+    Latencies are measured without query capturing or tracing, which
+    would distort them. Queries and allocations are measured in a
+    separate pass afterwards.
+
+    Args:
+        scenario: The scenario to run
+        ctx: The benchmark context
+        iterations: Number of timed requests
+        warmup: Number of untimed requests before measuring
+        alloc_iterations: Number of requests for the query/allocation pass
+
+    Returns:
+        dict: Latency statistics, status code, queries and allocated KiB per request
+    """
+    if scenario.iterations is not None:
+        iterations = min(iterations, scenario.iterations)
+        warmup = min(warmup, 1)
+        alloc_iterations = 1
+
+    def request(client, path, kwargs):
+        response = client.generic(scenario.method, path, **kwargs)
+        # Streamed bodies are only produced while they are read
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def send():
+        client, path, kwargs = scenario.build(ctx)
+        start = time.perf_counter()
+        response = request(client, path, kwargs)
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    for _ in range(warmup):
+        send()
+    latencies, status = [], None
+    for _ in range(iterations):
+        elapsed, status = send()
+        latencies.append(elapsed)
+
+    queries = allocated = 0
+    for _ in range(alloc_iterations):
+        client, path, kwargs = scenario.build(ctx)
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as captured:
+            request(client, path, kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        queries += len(captured)
+        allocated += peak
+
+    result = summarize(latencies)
+    result.update({
+        'status': status,
+        'queries': round(queries / alloc_iterations, 1),
+        'alloc_peak_kib': round(allocated / alloc_iterations / 1024, 1),
+    })
+    return result
+
+
+def run_benchmark(ctx, iterations=20, warmup=3, alloc_iterations=3,
+                  scenarios=SCENARIOS, only=None):
+    """
+    Runs all scenarios against the current database for one user.
+
+    Throttling is disabled, as the scenarios repeat requests far beyond
+    the limits; measure_throttling() covers the rejected requests.
+
+    Args:
+        ctx: Benchmark context of the seeded user
+        iterations: Timed requests per scenario
+        warmup: Untimed requests per scenario
+        alloc_iterations: Requests per scenario for queries/allocations
+        scenarios: Scenarios to run
+        only: Optional collection of scenario keys or route names to restrict the run to
+
+    Returns:
+        dict: Results keyed by "<METHOD> <route>"
+    """
+    results = {}
+    with override_settings(THROTTLING={**throttling_settings(), 'ENABLED': False}):
+        for scenario in scenarios:
+            if only and scenario.key not in only and scenario.route not in only:
+                continue
+            results[scenario.key] = run_scenario(scenario, ctx, iterations, warmup, alloc_iterations)
+    return results
+
+
+def measure_throttling(ctx, iterations=50, scenarios=SCENARIOS):
+    """
+    Measures requests rejected by the throttles of the auth endpoints.
+
+    Every throttled bucket gets a capacity of one, so the first request
+    passes and the following ones are rejected. They should cost a few
+    cache operations, without queries or password hashing.
+
+    Args:
+        ctx: Benchmark context of the seeded user
+        iterations: Timed rejected requests per route
+        scenarios: Scenarios to pick the throttled routes from
+
+    Returns:
+        dict: Per route the latency of the accepted request, the statistics
+        of the rejected ones, their status code and queries
+    """
+    config = throttling_settings()
+    rates = {scope: {kind: (1, 3600) for kind in kinds} for scope, kinds in config['RATES'].items()}
+    results = {}
+    with override_settings(THROTTLING={**config, 'ENABLED': True, 'RATES': rates}):
+        for scenario in scenarios:
+            if scenario.route not in rates:
+                continue
+            caches[config['CACHE']].clear()
+            client, path, kwargs = scenario.build(ctx)
+            start = time.perf_counter()
+            client.generic(scenario.method, path, **kwargs)
+            accepted_ms = (time.perf_counter() - start) * 1000
+
+            latencies = []
+            for _ in range(iterations):
+                client, path, kwargs = scenario.build(ctx)
+                start = time.perf_counter()
+                response = client.generic(scenario.method, path, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+            with CaptureQueriesContext(connection) as captured:
+                client.generic(scenario.method, path, **kwargs)
+            result = summarize(latencies)
+            result.update({
+                'accepted_ms': round(accepted_ms, 3),
+                'status': response.status_code,
+                'retry_after': response.headers.get('Retry-After'),
+                'queries': len(captured),
+            })
+            results[scenario.key] = result
+    return results
+
+
+def measure_overhead(rounds=20000):
+    """
+    Micro-benchmarks the per-request cost of the instrumentation.
+
+    Args:
+        rounds: Number of measured operations
+
+    Returns:
+        dict: Cost of recording one request's metrics and of wrapping
+        one SQL statement, in microseconds
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        registry = MetricsRegistry(directory, flush_interval=float('inf'))
+        start = time.perf_counter()
+        for i in range(rounds):
+            registry.record_request('task-list', 'GET', 200, 0.01, queries=i % 50, sql_duration=0.002)
+        record_us = (time.perf_counter() - start) / rounds * 1e6
+
+    def run_queries():
+        with connection.cursor() as cursor:
+            start = time.perf_counter()
+            for _ in range(rounds // 10):
+                cursor.execute('SELECT 1')
+            return (time.perf_counter() - start) / (rounds // 10) * 1e6
+
+    plain_us = min(run_queries() for _ in range(3))
+    with connection.execute_wrapper(QueryStats()):
+        wrapped_us = min(run_queries() for _ in range(3))
+    return {
+        'metrics_record_request_us': round(record_us, 2),
+        'sql_wrapper_per_query_us': round(max(wrapped_us - plain_us, 0), 2),
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': connection.Database.sqlite_version if connection.vendor == 'sqlite' else None,
+        'machine': platform.machine(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares benchmark results with a baseline.
+
+    Query counts are deterministic, so any increase is a regression.
+    Latency (p50) and allocation peaks may grow by the given tolerance
+    before they count as regressions.
+
+    Args:
+        results: Route results of the current run
+        baseline: Route results of the baseline run
+        tolerance: Allowed relative growth, e.g. 0.25 for 25%
+
+    Returns:
+        list: Human readable descriptions of the regressions
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f"{key}: queries {previous['queries']} -> {current['queries']}"
+            )
+        for metric in ('p50_ms', 'alloc_peak_kib'):
+            limit = previous[metric] * (1 + tolerance)
+            if current[metric] > limit and current[metric] - previous[metric] > 1:
+                regressions.append(
+                    f"{key}: {metric} {previous[metric]} -> {current[metric]} "
+                    f"(limit {round(limit, 3)})"
+                )
+    return regressions
+
+
+def write_board_rows(alias, user_id, writer, number):
+    """
+    Writes one task with subtasks, the unit of work of the write load.
+
+    Reads the user's task count first, like the serializers do during
+    validation, so deferred transactions have to upgrade their lock.
+    """
+    position = Task.objects.using(alias).filter(user_id=user_id).count()
+    task = Task.objects.using(alias).create(
+        user_id=user_id, title=f'Load {writer}-{number}',
+        description=f'Position {position}', due_date='2030-01-01',
+    )
+    Subtask.objects.using(alias).bulk_create(
+        Subtask(task=task, name=f'Step {step}') for step in range(3)
+    )
+
+
+def writer_process(writer, alias, user_id, writes, start, results):
+    """
+    Performs write transactions and reports their outcome.
+
+    Args:
+        writer: Number of this process
+        alias: Database to write to
+        user_id: Owner of the created tasks
+        writes: Number of transactions to run
+        start: Event released when all processes are ready
+        results: Queue receiving the outcome
+    """
+    start.wait()
+    latencies, errors = [], 0
+    for number in range(writes):
+        begin = time.perf_counter()
+        try:
+            run_in_transaction(write_board_rows, alias, user_id, writer, number, using=alias)
+        except OperationalError as exc:
+            if not is_lock_error(exc):
+                raise
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - begin) * 1000)
+    connections.close_all()
+    results.put(('writer', latencies, errors))
+
+
+def reader_process(alias, user_id, start, stop, results):
+    """
+    Lists the tasks of a user until stopped, like a busy board page.
+
+    Args:
+        alias: Database to read from
+        user_id: Owner of the listed tasks
+        start: Event released when all processes are ready
+        stop: Event set when the writers are done
+        results: Queue receiving the outcome
+    """
+    start.wait()
+    reads, errors = 0, 0
+    while not stop.is_set():
+        try:
+            list(Task.objects.using(alias).filter(user_id=user_id).prefetch_related('subtasks')[:200])
+            reads += 1
+        except OperationalError as exc:
+            if not is_lock_error(exc):
+                raise
+            errors += 1
+    connections.close_all()
+    results.put(('reader', reads, errors))
+
+
+def run_write_load(writers, readers, writes):
+    """
+    Runs writer and reader processes concurrently and reports their outcome.
+
+    The processes are forked, so they inherit the settings and database
+    configuration of the caller, whose connections are closed first.
+
+    Args:
+        writers: (alias, user_id) per writing process
+        readers: (alias, user_id) per reading process
+        writes: Transactions per writer
+
+    Returns:
+        dict: Throughput, error rate and latency of the writes
+    """
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    start, stop, results = context.Event(), context.Event(), context.Queue()
+    processes = [
+        context.Process(target=writer_process, args=(i, alias, user_id, writes, start, results))
+        for i, (alias, user_id) in enumerate(writers)
+    ] + [
+        context.Process(target=reader_process, args=(alias, user_id, start, stop, results))
+        for alias, user_id in readers
+    ]
+    for process in processes:
+        process.start()
+    began = time.perf_counter()
+    start.set()
+    outcomes = [results.get() for _ in writers]
+    elapsed = time.perf_counter() - began
+    stop.set()
+    outcomes += [results.get() for _ in readers]
+    for process in processes:
+        process.join()
+
+    latencies = [value for kind, values, _ in outcomes if kind == 'writer' for value in values]
+    write_errors = sum(errors for kind, _, errors in outcomes if kind == 'writer')
+    return {
+        'writes': len(latencies),
+        'write_errors': write_errors,
+        'error_rate': round(write_errors / (len(writers) * writes), 4),
+        'writes_per_second': round(len(latencies) / elapsed, 1),
+        'reads': sum(reads for kind, reads, _ in outcomes if kind == 'reader'),
+        'read_errors': sum(errors for kind, _, errors in outcomes if kind == 'reader'),
+        'write_latency': summarize(latencies),
+    }
+
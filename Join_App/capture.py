@@ -0,0 +1,252 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_DEFAULTS = {
+    'ENABLED': False,
+    # Fraction of requests recorded
+    'SAMPLE_RATE': 1.0,
+    'PATH': None,
+    # Recording stops once the trace file reaches this size
+    'MAX_BYTES': 100 * 1024 * 1024,
+    # Larger bodies are recorded without their shape
+    'MAX_BODY_BYTES': 64 * 1024,
+    # Fields recorded with their values; other strings are reduced to their
+    # length, IDs to a placeholder
+    'KEEP_FIELDS': ['category', 'priority', 'method', 'atomic', 'stream', 'page'],
+    # URL names never recorded
+    'EXCLUDE_ROUTES': ['metrics'],
+    # Key of the user pseudonyms (default: SECRET_KEY)
+    'PSEUDONYM_KEY': None,
+}
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+BODY_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def capture_settings():
+    """
+    Returns the capture settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    config = {**CAPTURE_DEFAULTS, **getattr(settings, 'CAPTURE', {})}
+    if config['PATH'] is None:
+        config['PATH'] = Path(settings.BASE_DIR) / 'traces' / 'capture.jsonl'
+    return config
+
+
+def pseudonym(user_id, config):
+    """
+    Maps a user ID to a stable pseudonym that does not reveal the ID.
+
+    Args:
+        user_id: Primary key of the user
+        config: Capture settings
+
+    Returns:
+        str: 16 hex digits of an HMAC of the ID
+    """
+    key = (config['PSEUDONYM_KEY'] or settings.SECRET_KEY).encode()
+    return hmac.new(key, str(user_id).encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def _is_id_key(key):
+    key = (key or '').lower()
+    return key in ('pk', 'id', 'ids') or key.endswith('id') or key.endswith('ids')
+
+
+def _path_route(value):
+    try:
+        match = resolve(value.split('?', 1)[0])
+    except Resolver404:
+        return None
+    return match.url_name
+
+
+def sanitize(value, keep, key=None):
+    """
+    Reduces a request value to its shape, dropping personal data.
+
+    Strings become '<str:LENGTH>', dates '<date:+DAYS>' relative to today,
+    e-mail addresses '<email>' and API paths '<path:URL_NAME>'; numbers
+    under ID-like keys become '<id>'. Fields in keep, booleans and other
+    numbers are kept as they are.
+
+    Args:
+        value: Parsed JSON value, query parameter or URL argument
+        keep: Names of the fields to keep
+        key: Name of the field holding the value
+
+    Returns:
+        The sanitised value
+    """
+    if isinstance(value, dict):
+        return {name: sanitize(item, keep, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item, keep, key) for item in value]
+    if key in keep or value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return '<id>' if _is_id_key(key) else value
+    value = str(value)
+    if _is_id_key(key) and value.isdigit():
+        return '<id>'
+    if DATE_PATTERN.match(value):
+        try:
+            return f'<date:{(date.fromisoformat(value) - date.today()).days:+d}>'
+        except ValueError:
+            pass
+    if '@' in value:
+        return '<email>'
+    if value.startswith('/'):
+        route = _path_route(value)
+        if route:
+            return f'<path:{route}>'
+    return f'<str:{len(value)}>'
+
+
+def read_body(request, config):
+    """
+    Reads the JSON body of a request before the view consumes it.
+
+    Args:
+        request: The HTTP request
+        config: Capture settings
+
+    Returns:
+        The parsed body, None without a JSON body, or '<large>' if it
+        exceeds MAX_BODY_BYTES
+    """
+    if request.method not in BODY_METHODS or request.content_type != 'application/json':
+        return None
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return None
+    if length > config['MAX_BODY_BYTES']:
+        return '<large>'
+    try:
+        return json.loads(request.body) if length else None
+    except ValueError:
+        return None
+
+
+def trace_record(request, response, body, started, duration_ms, config):
+    """
+    Builds the trace record of a finished request.
+
+    Args:
+        request: The HTTP request
+        response: The HTTP response
+        body: The body returned by read_body()
+        started: Start of the request as a Unix timestamp
+        duration_ms: Duration of the request in milliseconds
+        config: Capture settings
+
+    Returns:
+        dict: The compact record, or None for requests that are not recorded
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.namespace or not match.url_name or match.url_name in config['EXCLUDE_ROUTES']:
+        return None
+    keep = set(config['KEEP_FIELDS'])
+    record = {'ts': round(started, 3), 'm': request.method, 'r': match.url_name}
+    if match.kwargs:
+        record['k'] = sanitize(match.kwargs, keep)
+    if request.GET:
+        record['q'] = sanitize(request.GET.dict(), keep)
+    if body is not None:
+        record['b'] = body if body == '<large>' else sanitize(body, keep)
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        record['u'] = pseudonym(user.pk, config)
+        if user.is_staff:
+            record['st'] = True
+    record['s'] = response.status_code
+    record['d'] = round(duration_ms, 2)
+    return record
+
+
+class TraceWriter:
+    """
+    Appends trace records to a file shared by all worker processes.
+
+    Every record is one JSON line written with a single write() on a file
+    opened in append mode, so records of concurrent workers do not
+    interleave. Writing stops once the file reaches max_bytes.
+
+    Args:
+        path: Trace file
+        max_bytes: Size at which writing stops
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.full = False
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        with self._lock:
+            if self._fd is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        return self._fd
+
+    def append(self, record):
+        """
+        Appends one record unless the file is full.
+
+        Args:
+            record: JSON-serializable trace record
+        """
+        fd = self._open()
+        if os.fstat(fd).st_size >= self.max_bytes:
+            if not self.full:
+                logger.warning("Trace file %s is full; capture stopped", self.path)
+            self.full = True
+            return
+        os.write(fd, (json.dumps(record, separators=(',', ':')) + '\n').encode())
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def read_trace(path):
+    """
+    Reads the records of a trace file in the order the requests started.
+
+    A line cut off by a crashing worker is skipped.
+
+    Args:
+        path: Trace file
+
+    Returns:
+        list: Trace records
+    """
+    records = []
+    with open(path, encoding='utf-8') as trace:
+        for line in trace:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    records.sort(key=lambda record: record['ts'])
+    return records
@@ -0,0 +1,147 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from Join_App.metrics import get_registry, metrics_settings
+
+COALESCING_DEFAULTS = {
+    'ENABLED': True,
+    # Seconds a duplicate waits for the running computation before doing
+    # its own
+    'TIMEOUT_SECONDS': 5,
+    # Cache holding the board versions; must be shared by all workers, so
+    # a read after a write never joins a computation started before it
+    'CACHE': 'default',
+}
+
+
+def coalescing_settings():
+    """
+    Returns the coalescing settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**COALESCING_DEFAULTS, **getattr(settings, 'COALESCING', {})}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """
+    Runs concurrent calls with the same key once per process.
+
+    The first caller of a key computes the result while later callers
+    wait for it and get the same object, which they must not modify.
+    Waiters whose computation fails or takes longer than the timeout run
+    the function themselves, so coalescing never fails a request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout):
+        """
+        Returns the result of func, shared with concurrent calls of the key.
+
+        Args:
+            key: Hashable identifying identical calls
+            func: Callable without arguments
+            timeout: Seconds to wait for a running call
+
+        Returns:
+            tuple: (result, outcome) with outcome 'leader' if this call
+            computed the result, 'shared' if it got another call's result,
+            or 'timeout'/'failed' if it computed it after waiting in vain
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(timeout):
+                return func(), 'timeout'
+            if call.failed:
+                return func(), 'failed'
+            return call.result, 'shared'
+
+        try:
+            call.result = func()
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, 'leader'
+
+
+_flights = SingleFlight()
+
+
+def _version_key(user_id):
+    return f'board-version:{user_id}'
+
+
+def board_version(user_id):
+    """
+    Returns the version of a user's board data, raised by every write.
+
+    Args:
+        user_id: Primary key of the user
+
+    Returns:
+        int: Current version
+    """
+    return caches[coalescing_settings()['CACHE']].get(_version_key(user_id), 0)
+
+
+def bump_board_version(user_id):
+    """
+    Raises the version of a user's board data after a committed write.
+
+    Args:
+        user_id: Primary key of the user
+    """
+    cache = caches[coalescing_settings()['CACHE']]
+    key = _version_key(user_id)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted since add(); any new value separates later reads
+        cache.set(key, 1, None)
+
+
+def coalesce(user_id, name, func):
+    """
+    Runs a read of a user's board once for all concurrent identical reads.
+
+    Reads join a running computation only if it started at the current
+    board version, so they always see the writes committed before them.
+
+    Args:
+        user_id: Primary key of the user
+        name: Identifies the read, e.g. the full request path
+        func: Callable without arguments computing the result
+
+    Returns:
+        The result of func, possibly shared with other requests
+    """
+    config = coalescing_settings()
+    if not config['ENABLED']:
+        return func()
+    key = (user_id, board_version(user_id), name)
+    result, outcome = _flights.do(key, func, config['TIMEOUT_SECONDS'])
+    if metrics_settings()['ENABLED']:
+        get_registry().inc('join_coalesced_reads_total', outcome=outcome)
+    return result
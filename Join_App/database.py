@@ -0,0 +1,142 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from Join_App.metrics import get_registry, metrics_settings
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DEFAULTS = {
+    'ENABLED': True,
+    # WAL lets readers run concurrently with the single writer
+    'JOURNAL_MODE': 'WAL',
+    # How long a statement waits for a lock before failing
+    'BUSY_TIMEOUT_MS': 5000,
+    # NORMAL is durable against crashes of the application in WAL mode
+    'SYNCHRONOUS': 'NORMAL',
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    # Page cache per connection in KiB
+    'CACHE_SIZE_KB': 64 * 1024,
+    # Attempts of a write transaction after lock errors
+    'LOCK_RETRIES': 5,
+    'LOCK_BACKOFF_MS': 20,
+    'LOCK_BACKOFF_MAX_MS': 500,
+}
+
+LOCK_ERROR_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def sqlite_settings():
+    """
+    Returns the SQLite connection settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**SQLITE_DEFAULTS, **getattr(settings, 'SQLITE', {})}
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Signal handler applying the connection PRAGMAs to new SQLite connections.
+
+    Connected to connection_created. The journal mode is left alone for
+    in-memory databases, which do not support WAL.
+
+    Args:
+        sender: The database wrapper class
+        connection: The new database connection
+        **kwargs: Additional keyword arguments from the signal
+    """
+    if connection.vendor != 'sqlite':
+        return
+    config = sqlite_settings()
+    if not config['ENABLED']:
+        return
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA synchronous = {config['SYNCHRONOUS']}",
+        f"PRAGMA mmap_size = {int(config['MMAP_SIZE'])}",
+        f"PRAGMA cache_size = {-int(config['CACHE_SIZE_KB'])}",
+    ]
+    if not connection.is_in_memory_db():
+        pragmas.insert(0, f"PRAGMA journal_mode = {config['JOURNAL_MODE']}")
+    with connection.cursor() as cursor:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+
+
+def is_lock_error(exc):
+    """
+    Returns whether an exception is a transient SQLite lock error.
+
+    Args:
+        exc: The exception
+
+    Returns:
+        bool: True for lock errors worth retrying
+    """
+    return isinstance(exc, OperationalError) and any(
+        message in str(exc) for message in LOCK_ERROR_MESSAGES
+    )
+
+
+def run_in_transaction(func, *args, using=None, **kwargs):
+    """
+    Runs a function in a transaction, retrying it after lock errors.
+
+    The transaction is rolled back on every failure, so the function runs
+    from a clean state on each attempt. Waits grow exponentially with
+    jitter. Inside an outer transaction the function runs only once, as
+    the outer transaction would have to be retried as a whole.
+
+    Args:
+        func: Function performing the writes
+        *args: Positional arguments for func
+        using: Database alias (default: the default database)
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The return value of func
+
+    Raises:
+        OperationalError: If the lock error persists after all retries
+    """
+    using = using or DEFAULT_DB_ALIAS
+    config = sqlite_settings()
+    if not config['ENABLED'] or connections[using].in_atomic_block:
+        with transaction.atomic(using=using):
+            return func(*args, **kwargs)
+
+    for attempt in range(config['LOCK_RETRIES'] + 1):
+        try:
+            with transaction.atomic(using=using):
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if not is_lock_error(exc) or attempt == config['LOCK_RETRIES']:
+                raise
+            delay_ms = min(config['LOCK_BACKOFF_MS'] * 2 ** attempt, config['LOCK_BACKOFF_MAX_MS'])
+            logger.info("Database locked, retrying in %.0f ms (attempt %d)", delay_ms, attempt + 1)
+            if metrics_settings()['ENABLED']:
+                get_registry().inc('join_db_lock_retries_total')
+            time.sleep(delay_ms * random.uniform(0.5, 1.5) / 1000)
+
+
+def copy_database(source, target):
+    """
+    Copies an SQLite database onto another with the online backup API.
+
+    Readers of the source are not blocked; the target is replaced as a
+    whole, including its schema.
+
+    Args:
+        source: Alias of the database to copy
+        target: Alias of the database to overwrite
+    """
+    source_connection, target_connection = connections[source], connections[target]
+    source_connection.ensure_connection()
+    target_connection.ensure_connection()
+    source_connection.connection.backup(target_connection.connection)
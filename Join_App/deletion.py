@@ -0,0 +1,62 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from Join_App.archiving import ArchivedAssignment, TaskAssignment
+from Join_App.models import Contact, Subtask, Task, TaskReminder
+from Join_App.summary import record_removals
+
+# IDs per bulk delete request, keeping the IN lists within SQLite's limits
+BULK_DELETE_MAX_IDS = 500
+
+
+def _raw_delete(queryset, using, counts):
+    counts[queryset.model._meta.label] = queryset._raw_delete(using)
+
+
+def delete_tasks(ids, using=DEFAULT_DB_ALIAS):
+    """
+    Deletes tasks with their subtasks, contact assignments and sent reminders.
+
+    Runs one DELETE per table instead of Django's collector, which loads
+    every row and deletes the dependents per task. Signals are not sent;
+    the search index follows through its triggers and the users'
+    summaries are adjusted in the same transaction. Callers check that
+    the tasks may be deleted.
+
+    Args:
+        ids: IDs of the tasks
+        using: Database alias
+
+    Returns:
+        dict: Number of deleted rows per model label
+    """
+    counts = {}
+    with transaction.atomic(using=using):
+        states = list(Task.objects.using(using).filter(id__in=ids)
+                      .values_list('user_id', 'category', 'priority', 'due_date'))
+        _raw_delete(Subtask.objects.filter(task_id__in=ids), using, counts)
+        _raw_delete(TaskAssignment.objects.filter(task_id__in=ids), using, counts)
+        _raw_delete(TaskReminder.objects.filter(task_id__in=ids), using, counts)
+        _raw_delete(Task.objects.filter(id__in=ids), using, counts)
+        record_removals(states, using)
+    return counts
+
+
+def delete_contacts(ids, using=DEFAULT_DB_ALIAS):
+    """
+    Deletes contacts with their assignments to active and archived tasks.
+
+    Like delete_tasks, one DELETE per table without signals.
+
+    Args:
+        ids: IDs of the contacts
+        using: Database alias
+
+    Returns:
+        dict: Number of deleted rows per model label
+    """
+    counts = {}
+    with transaction.atomic(using=using):
+        _raw_delete(TaskAssignment.objects.filter(contact_id__in=ids), using, counts)
+        _raw_delete(ArchivedAssignment.objects.filter(contact_id__in=ids), using, counts)
+        _raw_delete(Contact.objects.filter(id__in=ids), using, counts)
+    return counts
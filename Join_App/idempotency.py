@@ -0,0 +1,150 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+from django.utils import timezone
+
+from Join_App.database import run_in_transaction
+from Join_App.models import IdempotencyRecord
+
+IDEMPOTENCY_DEFAULTS = {
+    'ENABLED': True,
+    'HEADER': 'Idempotency-Key',
+    # Seconds a stored response is replayed to retries
+    'TTL_SECONDS': 24 * 60 * 60,
+    # Seconds a duplicate waits for the first request before giving up
+    'WAIT_SECONDS': 10,
+    'POLL_MS': 50,
+    # Seconds after which an unfinished claim counts as abandoned, e.g.
+    # after a worker crash, and may be taken over by a retry
+    'CLAIM_SECONDS': 60,
+}
+
+
+def idempotency_settings():
+    """
+    Returns the idempotency settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**IDEMPOTENCY_DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+def request_fingerprint(request):
+    """
+    Hashes what makes a request distinct: method, path and parsed body.
+
+    Args:
+        request: The DRF request
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def claim_key(user, key, request_hash):
+    """
+    Claims an idempotency key for a request that is about to run.
+
+    Expired records and abandoned claims are taken over. Both the insert
+    and the take-over are committed right away, so concurrent duplicates
+    see the claim.
+
+    Args:
+        user: The authenticated user
+        key: Value of the Idempotency-Key header
+        request_hash: Fingerprint of the request
+
+    Returns:
+        tuple: (record, claimed) with claimed False if another request owns
+        the key; the record then holds its state
+    """
+    config = idempotency_settings()
+    records = IdempotencyRecord.objects.using(DEFAULT_DB_ALIAS)
+    # Retries are the common case for an existing key, so look first
+    record = records.filter(user=user, key=key).first()
+    if record is None:
+        try:
+            return run_in_transaction(records.create, user=user, key=key, request_hash=request_hash,
+                                      using=DEFAULT_DB_ALIAS), True
+        except IntegrityError:
+            # A concurrent duplicate claimed the key first; None if it already released it
+            return records.filter(user=user, key=key).first(), False
+
+    now = timezone.now()
+    expired = record.created_at < now - timedelta(seconds=config['TTL_SECONDS'])
+    abandoned = not record.completed and record.created_at < now - timedelta(seconds=config['CLAIM_SECONDS'])
+    if not (expired or abandoned):
+        return record, False
+    # Only one of several retries wins the take-over
+    taken = records.filter(pk=record.pk, created_at=record.created_at).update(
+        request_hash=request_hash, status_code=None, response_body=None, created_at=now,
+    )
+    if not taken:
+        return records.get(pk=record.pk), False
+    record.request_hash, record.status_code, record.response_body, record.created_at = request_hash, None, None, now
+    return record, True
+
+
+def wait_for_response(record):
+    """
+    Waits until the request owning a key has stored its response.
+
+    Args:
+        record: The claimed IdempotencyRecord, or None
+
+    Returns:
+        IdempotencyRecord: The completed record, or None if it was released
+        or did not complete within WAIT_SECONDS
+    """
+    config = idempotency_settings()
+    deadline = time.monotonic() + config['WAIT_SECONDS']
+    while record is not None and not record.completed:
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(config['POLL_MS'] / 1000)
+        record = IdempotencyRecord.objects.using(DEFAULT_DB_ALIAS).filter(pk=record.pk).first()
+    return record
+
+
+def store_response(record, response):
+    """
+    Stores the response of the request owning a key.
+
+    Args:
+        record: The claimed IdempotencyRecord
+        response: The DRF response returned by the handler
+    """
+    record.status_code = response.status_code
+    record.response_body = response.data
+    run_in_transaction(record.save, using=DEFAULT_DB_ALIAS, update_fields=['status_code', 'response_body'])
+
+
+def release_key(record):
+    """
+    Deletes a claim whose request failed, so a retry runs the request again.
+
+    Args:
+        record: The claimed IdempotencyRecord
+    """
+    run_in_transaction(
+        IdempotencyRecord.objects.using(DEFAULT_DB_ALIAS).filter(pk=record.pk).delete, using=DEFAULT_DB_ALIAS,
+    )
+
+
+def purge_expired():
+    """
+    Deletes records older than the TTL.
+
+    Returns:
+        int: Number of deleted records
+    """
+    cutoff = timezone.now() - timedelta(seconds=idempotency_settings()['TTL_SECONDS'])
+    deleted, _ = IdempotencyRecord.objects.using(DEFAULT_DB_ALIAS).filter(created_at__lt=cutoff).delete()
+    return deleted
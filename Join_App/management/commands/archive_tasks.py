@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from Join_App.archiving import archive_tasks, archiving_settings
+from Join_App.sharding import sharding_settings
+
+class Command(BaseCommand):
+    """
+    Django management command moving old done tasks into the archive.
+
+    Runs in batches of short transactions on every shard (or the default
+    database without sharding), so it can run while the board is in use.
+    """
+    help = 'Archives done tasks completed more than --days days ago'
+
+    def add_arguments(self, parser):
+        config = archiving_settings()
+        parser.add_argument('--days', type=int, default=config['AFTER_DAYS'],
+                            help='Archive tasks completed more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'],
+                            help='Tasks per transaction.')
+        parser.add_argument('--database', action='append',
+                            help='Database to archive in; repeatable (default: all shards).')
+
+    def handle(self, *args, **options):
+        """
+        Execute the archiving.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Age threshold, batch size and databases.
+
+        Returns:
+            None: Outputs the number of archived tasks per database.
+        """
+        completed_before = timezone.now() - timedelta(days=options['days'])
+        databases = options['database'] or sharding_settings()['SHARDS'] or ['default']
+        for alias in databases:
+            count = archive_tasks(completed_before, options['batch_size'], using=alias)
+            self.stdout.write(f'Archived {count} tasks in {alias}')
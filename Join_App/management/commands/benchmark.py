@@ -0,0 +1,118 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from Join_App.benchmarking import (
+    BenchmarkContext, compare, environment, measure_overhead, measure_throttling, run_benchmark,
+    uncovered_routes,
+)
+from Join_App.seeding import seed
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+class Command(BaseCommand):
+    """
+    Django management command for benchmarking the API in-process.
+
+    Creates a throwaway test database, seeds it with reproducible data and
+    sends requests to every route of the Join and user_auth APIs through
+    the full middleware stack. Reports latency percentiles, queries and
+    allocations per request as JSON and compares them with a committed
+    baseline. The configured database is never touched.
+    """
+    help = 'Benchmarks every API route on a freshly seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per route.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route.')
+        parser.add_argument('--users', type=int, default=5, help='Seeded users.')
+        parser.add_argument('--tasks', type=int, default=100, help='Average tasks per user.')
+        parser.add_argument('--subtasks', type=int, default=3, help='Average subtasks per task.')
+        parser.add_argument('--contacts', type=int, default=30, help='Average contacts per user.')
+        parser.add_argument('--only', nargs='*', help='Route names or "METHOD route" keys to run.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help='Baseline report to compare with.')
+        parser.add_argument('--tolerance', type=float, default=1.0,
+                            help='Allowed relative growth of latency and allocations.')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Store this run as the new baseline; with --only, just its routes.')
+        parser.add_argument('--no-compare', action='store_true', help='Skip the baseline comparison.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the benchmark.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Data set size, iteration counts and report options.
+
+        Returns:
+            None: Outputs the JSON report to stdout or the given file.
+
+        Raises:
+            CommandError: If the run regressed compared to the baseline.
+        """
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with transaction.atomic():
+                seeded = seed(
+                    users=options['users'], tasks=options['tasks'],
+                    subtasks=options['subtasks'], contacts=options['contacts'],
+                    prefix='bench',
+                )
+            user = seeded['users'][0]
+            ctx = BenchmarkContext(user, seeded['tokens'][user.id])
+            routes = run_benchmark(
+                ctx, iterations=options['iterations'], warmup=options['warmup'],
+                only=options['only'],
+            )
+            overhead = measure_overhead()
+            throttled = measure_throttling(ctx)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'environment': environment(),
+            'dataset': {key: value for key, value in seeded['counts'].items()},
+            'iterations': options['iterations'],
+            'routes': routes,
+            'instrumentation_overhead': overhead,
+            'throttled_routes': throttled,
+            'uncovered_routes': uncovered_routes(),
+        }
+        rendered = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            Path(options['output']).write_text(rendered + '\n')
+        else:
+            self.stdout.write(rendered)
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            if options['only'] and baseline_path.exists():
+                # Only the routes that were run are replaced
+                baseline = json.loads(baseline_path.read_text())
+                baseline['routes'].update(routes)
+                rendered = json.dumps(baseline, indent=2, sort_keys=True)
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(rendered + '\n')
+            self.stderr.write(f"Baseline written to {baseline_path}")
+            return
+        if options['no_compare'] or not baseline_path.exists():
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('dataset') != report['dataset']:
+            self.stderr.write("Baseline was recorded on a different data set; skipping comparison.")
+            return
+        regressions = compare(routes, baseline['routes'], options['tolerance'])
+        if regressions:
+            raise CommandError("Benchmark regressions:\n" + "\n".join(regressions))
+        self.stderr.write("No regressions compared to the baseline.")
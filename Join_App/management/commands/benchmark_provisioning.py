@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+from Join_App.provisioning import measure_provisioning
+
+class Command(BaseCommand):
+    """
+    Django management command measuring bulk provisioning per hashing process count.
+
+    Provisions the same users with 1..N hashing processes in transactions
+    that are rolled back, so the database is left unchanged. The speed-up
+    is bounded by the number of CPUs.
+    """
+    help = 'Measures bulk user provisioning with 1..N password hashing processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=64, help='Users provisioned per run.')
+        parser.add_argument('--workers', type=int, nargs='+',
+                            help='Hashing process counts to test (default: 1, 2, 4 and one per CPU).')
+
+    def handle(self, *args, **options):
+        """
+        Execute the benchmark.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Users per run and process counts.
+
+        Returns:
+            None: Outputs the JSON report to stdout.
+        """
+        report = measure_provisioning(options['users'], options['workers'])
+        self.stdout.write(json.dumps(report, indent=2))
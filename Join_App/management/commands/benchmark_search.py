@@ -0,0 +1,93 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from Join_App.benchmarking import summarize
+from Join_App.models import Task
+from Join_App.search import KIND_TASK, SEARCH_TABLE, USER_SHIFT, search
+
+# Words of the synthetic task titles, padded to SEARCH_WORD_WIDTH characters
+SEARCH_WORDS = ['review', 'design', 'deploy', 'meeting', 'invoice', 'release', 'backlog', 'customer']
+SEARCH_WORD_WIDTH = 10
+# First user ID of the synthetic boards, above any real user
+SEARCH_USER_BASE = 2 ** 20
+
+
+def measure_search(tasks=100000, users=100, queries=200):
+    """
+    Measures full-text search latency on a synthetic index.
+
+    Indexes the given number of tasks, spread evenly over synthetic users,
+    in a transaction that is rolled back afterwards, so the database is
+    left unchanged. The queries alternate between words matching an
+    eighth of a board and prefixes of them.
+
+    Args:
+        tasks: Indexed tasks over all users
+        users: Synthetic users owning the tasks
+        queries: Searches measured
+
+    Returns:
+        dict: Index size, matches per query and the latency summary in ms
+    """
+    count = len(SEARCH_WORDS)
+    words = ''.join(word.ljust(SEARCH_WORD_WIDTH) for word in SEARCH_WORDS)
+    # SQL picking the word number n from the padded word list
+    pick = f"trim(substr(%s, (({{n}}) %% {count}) * {SEARCH_WORD_WIDTH} + 1, {SEARCH_WORD_WIDTH}))"
+    terms = SEARCH_WORDS + [word[:3] for word in SEARCH_WORDS]
+    using = router.db_for_write(Task)
+    latencies, matches = [], []
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < %s - 1) "
+                f"INSERT INTO {SEARCH_TABLE}(rowid, kind, object_id, task_id, title, body) "
+                f"SELECT (%s + n %% %s) * {USER_SHIFT} + n * 4 + {KIND_TASK}, {KIND_TASK}, n, n, "
+                f"{pick.format(n='n')} || ' ' || {pick.format(n=f'n / {count}')} || ' ' || n, "
+                f"{pick.format(n=f'n / {count * count}')} FROM seq",
+                [tasks, SEARCH_USER_BASE, users, words, words, words],
+            )
+        for index in range(queries):
+            user = User(id=SEARCH_USER_BASE + index % users)
+            start = time.perf_counter()
+            results = search(user, terms[index % len(terms)], using=using)
+            latencies.append((time.perf_counter() - start) * 1000)
+            matches.append(len(results))
+        transaction.set_rollback(True, using=using)
+    return {
+        'tasks': tasks,
+        'users': users,
+        'results_per_query': round(sum(matches) / len(matches), 1),
+        'latency_ms': summarize(latencies),
+    }
+
+class Command(BaseCommand):
+    """
+    Django management command measuring full-text search latency.
+
+    Indexes synthetic tasks spread over synthetic users in a transaction
+    that is rolled back, so the database is left unchanged, and times
+    searches on single boards.
+    """
+    help = 'Measures full-text search latency on a synthetic index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000, help='Indexed tasks over all users.')
+        parser.add_argument('--users', type=int, default=100, help='Users owning the tasks.')
+        parser.add_argument('--queries', type=int, default=200, help='Searches measured.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the benchmark.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Tasks, users and queries.
+
+        Returns:
+            None: Outputs the JSON report to stdout.
+        """
+        report = measure_search(options['tasks'], options['users'], options['queries'])
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,105 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from Join_App.benchmarking import run_write_load
+from Join_App.sharding import hashed_shard
+
+class Command(BaseCommand):
+    """
+    Django management command measuring write throughput per shard count.
+
+    For every shard count, creates that many scratch shard files and runs
+    writer processes whose users are spread evenly over the shards. Each
+    SQLite file has a single writer lock, so throughput grows with the
+    number of shards until the CPU is saturated. On few cores, this shows
+    best with --synchronous FULL, where commits wait for the disk. The
+    configured databases are never touched. Requires the fork start method.
+    """
+    help = 'Measures write throughput with the board data split over 1..N shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4], help='Shard counts to test.')
+        parser.add_argument('--writers', type=int, default=8, help='Writing processes, one user each.')
+        parser.add_argument('--writes', type=int, default=100, help='Transactions per writer.')
+        parser.add_argument('--synchronous', choices=['OFF', 'NORMAL', 'FULL'],
+                            help='SQLite synchronous mode; FULL syncs every commit to disk.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the benchmark.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Shard counts, processes and transactions.
+
+        Returns:
+            None: Outputs the JSON report to stdout.
+        """
+        report = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for count in options['shards']:
+                report[count] = self.run_shards(count, Path(directory) / str(count), options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_shards(self, count, directory, options):
+        """
+        Runs the writers against a fresh set of shards.
+
+        Args:
+            count: Number of shards
+            directory: Directory for the shard files
+            options: Command options
+
+        Returns:
+            dict: Throughput, error rate and latency of the writes
+        """
+        directory.mkdir()
+        shards = [f'bench_shard{index + 1}' for index in range(count)]
+        for alias in shards:
+            connections.settings[alias] = {
+                **connections['default'].settings_dict, 'NAME': str(directory / f'{alias}.sqlite3'),
+            }
+        try:
+            sqlite = {**getattr(settings, 'SQLITE', {})}
+            if options['synchronous']:
+                sqlite['SYNCHRONOUS'] = options['synchronous']
+            with override_settings(SHARDING={'SHARDS': shards}, SQLITE=sqlite):
+                for alias in shards:
+                    call_command('migrate', database=alias, verbosity=0)
+                writers = self.spread_users(shards, options['writers'])
+                result = run_write_load(writers=writers, readers=[], writes=options['writes'])
+        finally:
+            for alias in shards:
+                connections[alias].close()
+                del connections[alias]
+                del connections.settings[alias]
+        result['writers_per_shard'] = {alias: sum(1 for shard, _ in writers if shard == alias) for alias in shards}
+        return result
+
+    def spread_users(self, shards, writers):
+        """
+        Picks user IDs so the writers are spread evenly over the shards.
+
+        Args:
+            shards: Shard aliases
+            writers: Number of writers
+
+        Returns:
+            list: (alias, user_id) per writer
+        """
+        quota = {alias: writers // len(shards) + (index < writers % len(shards))
+                 for index, alias in enumerate(shards)}
+        picked, user_id = [], 0
+        while len(picked) < writers:
+            user_id += 1
+            alias = hashed_shard(user_id, shards)
+            if quota[alias]:
+                quota[alias] -= 1
+                picked.append((alias, user_id))
+        return picked
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from Join_App.sharding import move_user, shard_for_user
+
+class Command(BaseCommand):
+    """
+    Django management command moving a user's board data to another shard.
+
+    The board stays readable during the move; writes are answered with
+    503 and Retry-After until the rows have been copied. Moved rows keep
+    their IDs.
+    """
+    help = "Moves a user's contacts and tasks to another shard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_id', type=int, help='ID of the user to move.')
+        parser.add_argument('target', help='Alias of the destination shard.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the move.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: User and target shard.
+
+        Returns:
+            None: Outputs the number of moved rows.
+
+        Raises:
+            CommandError: If the user or the shard does not exist.
+        """
+        user_id, target = options['user_id'], options['target']
+        if not User.objects.filter(pk=user_id).exists():
+            raise CommandError(f'User {user_id} does not exist.')
+        if target not in connections.settings:
+            raise CommandError(f'Unknown shard {target}.')
+        source, _ = shard_for_user(user_id)
+        counts = move_user(user_id, target)
+        if not counts:
+            self.stdout.write(f'User {user_id} already lives in {target}')
+            return
+        moved = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Moved user {user_id} from {source} to {target}: {moved}'))
@@ -0,0 +1,59 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from Join_App.provisioning import provision_users, provisioning_settings
+
+class Command(BaseCommand):
+    """
+    Django management command creating many users from a file.
+
+    Reads a CSV file with the columns name, email and password, or a JSON
+    list of objects with these keys. Passwords are hashed in parallel and
+    users, profiles and tokens are inserted in bulk. Rows with errors are
+    reported and skipped.
+    """
+    help = 'Creates users from a CSV or JSON file with name, email and password'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or JSON file, or - for CSV on stdin.')
+        parser.add_argument('--workers', type=int,
+                            help='Password hashing processes (default: one per CPU).')
+
+    def read_rows(self, path):
+        """
+        Reads the rows of the input file.
+
+        Args:
+            path: File path, or - for stdin
+
+        Returns:
+            list: Rows as dicts
+        """
+        if path == '-':
+            return list(csv.DictReader(sys.stdin))
+        with open(path, newline='') as source:
+            if path.endswith('.json'):
+                return json.load(source)
+            return list(csv.DictReader(source))
+
+    def handle(self, *args, **options):
+        """
+        Execute the provisioning.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Input file and hashing processes.
+
+        Returns:
+            None: Outputs the number of created users and the skipped rows.
+        """
+        rows = self.read_rows(options['file'])
+        limit = provisioning_settings()['MAX_USERS']
+        if len(rows) > limit:
+            raise CommandError(f'At most {limit} users can be provisioned at once; split the file.')
+        users, errors = provision_users(rows, workers=options['workers'])
+        for error in errors:
+            self.stderr.write(f"Row {error['index'] + 1}: {json.dumps(error['errors'])}")
+        self.stdout.write(f'Created {len(users)} users, skipped {len(errors)} rows')
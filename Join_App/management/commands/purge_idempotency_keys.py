@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from Join_App.idempotency import purge_expired
+
+class Command(BaseCommand):
+    """
+    Django management command deleting idempotency records past their TTL.
+
+    Expired records are no longer replayed anyway; run it periodically to
+    keep the table small.
+    """
+    help = 'Deletes stored Idempotency-Key responses older than the TTL'
+
+    def handle(self, *args, **options):
+        """
+        Execute the purge.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Command options.
+
+        Returns:
+            None: Outputs the number of deleted records.
+        """
+        self.stdout.write(f'Deleted {purge_expired()} expired idempotency records')
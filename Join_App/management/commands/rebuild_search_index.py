@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from Join_App.search import rebuild_search_index
+
+class Command(BaseCommand):
+    """
+    Django management command for rebuilding the full-text search index.
+
+    Drops the FTS5 table and its triggers, recreates them and fills the
+    index again from tasks, subtasks and contacts. Useful after restoring
+    a backup or if the index is suspected to be out of sync.
+    """
+    help = 'Rebuilds the full-text search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database alias to rebuild the index on.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the command to rebuild the search index.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Command options, including the database alias.
+
+        Returns:
+            None: Outputs results to stdout.
+        """
+        alias = options['database']
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            self.stderr.write("Full-text search is only available on SQLite.")
+            return
+
+        with transaction.atomic(using=alias):
+            rebuild_search_index(connection)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM join_app_search")
+            count = cursor.fetchone()[0]
+        self.stdout.write(f"Search index rebuilt. {count} entries indexed.")
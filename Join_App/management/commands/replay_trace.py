@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from Join_App.benchmarking import environment
+from Join_App.capture import read_trace
+from Join_App.replay import ReplayContext, compare_replays, replay_trace
+from Join_App.seeding import seed
+
+class Command(BaseCommand):
+    """
+    Django management command replaying a captured request trace.
+
+    Creates a throwaway test database, seeds it with reproducible data and
+    sends the recorded requests through the full middleware stack, one at
+    a time, at their original pacing or as fast as possible. Reports
+    throughput, latency percentiles and status codes per route as JSON,
+    optionally next to an earlier report of the same trace. The configured
+    database is never touched.
+    """
+    help = 'Replays a captured request trace against a freshly seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace', help='Trace file written by the capture middleware.')
+        parser.add_argument('--pace', choices=['fast', 'original'], default='fast',
+                            help='Send requests back to back or at their recorded offsets.')
+        parser.add_argument('--speed', type=float, default=1.0, help='Speed-up of the original pacing.')
+        parser.add_argument('--limit', type=int, help='Replay only the first N requests.')
+        parser.add_argument('--users', type=int, default=5, help='Seeded users the trace users are mapped to.')
+        parser.add_argument('--tasks', type=int, default=100, help='Average tasks per user.')
+        parser.add_argument('--subtasks', type=int, default=3, help='Average subtasks per task.')
+        parser.add_argument('--contacts', type=int, default=30, help='Average contacts per user.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the data and the replayed values.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--baseline', help='Earlier report of the same trace to compare with.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the replay.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Trace file, pacing, data set size and report options.
+
+        Returns:
+            None: Outputs the JSON report to stdout or the given file.
+
+        Raises:
+            CommandError: If the trace is missing or empty.
+        """
+        try:
+            records = read_trace(options['trace'])[:options['limit']]
+        except FileNotFoundError:
+            raise CommandError(f"Trace file not found: {options['trace']}")
+        if not records:
+            raise CommandError("The trace contains no requests.")
+
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with transaction.atomic():
+                seeded = seed(
+                    users=options['users'], tasks=options['tasks'],
+                    subtasks=options['subtasks'], contacts=options['contacts'],
+                    random_seed=options['seed'], prefix='replay',
+                )
+            ctx = ReplayContext(seeded['users'], seeded['tokens'], random_seed=options['seed'])
+            result = replay_trace(records, ctx, pace=options['pace'], speed=options['speed'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'environment': environment(),
+            'dataset': seeded['counts'],
+            'trace': {
+                'path': str(options['trace']),
+                'users': len({record['u'] for record in records if 'u' in record}),
+                'recorded_seconds': round(records[-1]['ts'] - records[0]['ts'], 3),
+            },
+            'pace': options['pace'],
+            'speed': options['speed'],
+            **result,
+        }
+        if options['baseline']:
+            report['comparison'] = compare_replays(result, json.loads(Path(options['baseline']).read_text()))
+        rendered = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            Path(options['output']).write_text(rendered + '\n')
+        else:
+            self.stdout.write(rendered)
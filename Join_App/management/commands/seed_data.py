@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Join_App.seeding import seed, SEED_PASSWORD
+
+class Command(BaseCommand):
+    """
+    Django management command for filling the database with generated data.
+
+    Creates users with profiles and tokens, contacts, tasks, subtasks and
+    task assignments using bulk inserts. The data is reproducible for a
+    given seed, which makes it suitable for load tests and benchmarks.
+    """
+    help = 'Seeds the database with generated users, contacts, tasks and subtasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users.')
+        parser.add_argument('--tasks', type=int, default=100, help='Average tasks per user.')
+        parser.add_argument('--subtasks', type=int, default=3, help='Average subtasks per task.')
+        parser.add_argument('--contacts', type=int, default=20, help='Average contacts per user.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT.')
+        parser.add_argument('--prefix', default='seed', help='Prefix for generated usernames.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the command to seed the database.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Sizes of the generated data set.
+
+        Returns:
+            None: Outputs results to stdout.
+        """
+        with transaction.atomic():
+            result = seed(
+                users=options['users'],
+                tasks=options['tasks'],
+                subtasks=options['subtasks'],
+                contacts=options['contacts'],
+                random_seed=options['seed'],
+                batch_size=options['batch_size'],
+                prefix=options['prefix'],
+            )
+
+        for model, count in result['counts'].items():
+            self.stdout.write(f"Created {count} {model}")
+        self.stdout.write(f"Seed users log in with the password '{SEED_PASSWORD}'.")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from Join_App.reminders import ConsoleSink, get_sink, reminder_settings, send_reminders
+
+class Command(BaseCommand):
+    """
+    Django management command sending reminders for tasks due soon.
+
+    Scans the open tasks due within the horizon on every shard in batches
+    of short transactions and hands each reminder once to the configured
+    sink. Run it periodically, e.g. every 15 minutes.
+    """
+    help = 'Sends a reminder for every open task due within --horizon-days days'
+
+    def add_arguments(self, parser):
+        config = reminder_settings()
+        parser.add_argument('--horizon-days', type=int, default=config['HORIZON_DAYS'],
+                            help='Remind of tasks due from today until this many days ahead.')
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'],
+                            help='Tasks per transaction.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the scan.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Horizon and batch size.
+
+        Returns:
+            None: Outputs the number of sent reminders, after the reminders
+            themselves with the console sink.
+        """
+        sink = get_sink()
+        if type(sink) is ConsoleSink:
+            sink.stream = self.stdout
+        count = send_reminders(options['horizon_days'], options['batch_size'], sink)
+        self.stdout.write(f'Sent {count} reminders')
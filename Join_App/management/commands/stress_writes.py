@@ -0,0 +1,90 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from Join_App.benchmarking import run_write_load
+
+ALIAS = 'stress'
+
+# Connection setups compared by the stress test
+PROFILES = {
+    # Django's defaults: rollback journal, deferred transactions, no retries
+    'baseline': {'tuned': False, 'options': {}},
+    # The production profile from settings.DATABASES and settings.SQLITE
+    'tuned': {'tuned': True, 'options': {'transaction_mode': 'IMMEDIATE'}},
+}
+
+class Command(BaseCommand):
+    """
+    Django management command stress-testing concurrent writes on SQLite.
+
+    Runs writer and reader processes against a scratch database file, once
+    with Django's default SQLite setup and once with the tuned connection
+    profile (WAL, busy timeout, immediate transactions and lock retries),
+    and reports write throughput and error rate of both as JSON. The
+    configured database is never touched. Requires the fork start method.
+    """
+    help = 'Measures write throughput and lock errors of concurrent processes on SQLite'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Writing processes.')
+        parser.add_argument('--readers', type=int, default=2, help='Reading processes.')
+        parser.add_argument('--writes', type=int, default=100, help='Transactions per writer.')
+        parser.add_argument('--profile', choices=[*PROFILES, 'both'], default='both',
+                            help='Connection profile to test.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the stress test.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Process counts, transactions and profile.
+
+        Returns:
+            None: Outputs the JSON report to stdout.
+        """
+        names = list(PROFILES) if options['profile'] == 'both' else [options['profile']]
+        report = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name in names:
+                report[name] = self.run_profile(name, Path(directory) / f'{name}.sqlite3', options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_profile(self, name, path, options):
+        """
+        Runs the processes against a fresh database set up with one profile.
+
+        Args:
+            name: Key of the profile in PROFILES
+            path: Database file to create
+            options: Command options
+
+        Returns:
+            dict: Throughput, error rate and latency of the writes
+        """
+        profile = PROFILES[name]
+        connections.settings[ALIAS] = {
+            **connections['default'].settings_dict, 'NAME': str(path), 'OPTIONS': profile['options'],
+        }
+        try:
+            with override_settings(SQLITE={**getattr(settings, 'SQLITE', {}), 'ENABLED': profile['tuned']}):
+                call_command('migrate', database=ALIAS, verbosity=0)
+                user = User(username=f'stress_{name}')
+                User.objects.using(ALIAS).bulk_create([user])
+                user_id = User.objects.using(ALIAS).get(username=user.username).id
+                return run_write_load(
+                    writers=[(ALIAS, user_id)] * options['writers'],
+                    readers=[(ALIAS, user_id)] * options['readers'],
+                    writes=options['writes'],
+                )
+        finally:
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            del connections.settings[ALIAS]
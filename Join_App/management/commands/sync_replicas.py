@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from Join_App.database import copy_database
+from Join_App.routers import replication_settings
+
+class Command(BaseCommand):
+    """
+    Django management command copying the primary database to the replicas.
+
+    Meant for local setups and single-host deployments of SQLite; a
+    streaming replication tool replaces it in production.
+    """
+    help = 'Copies the primary SQLite database onto every configured replica'
+
+    def handle(self, *args, **options):
+        """
+        Execute the copy.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Additional keyword arguments.
+
+        Returns:
+            None: Outputs one line per replica.
+
+        Raises:
+            CommandError: If no replicas are configured.
+        """
+        config = replication_settings()
+        if not config['REPLICAS']:
+            raise CommandError('No replicas configured, set DATABASE_REPLICAS.')
+        for replica in config['REPLICAS']:
+            copy_database(config['PRIMARY'], replica)
+            self.stdout.write(f'Copied {config["PRIMARY"]} to {replica}')
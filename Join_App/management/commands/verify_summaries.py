@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from Join_App.sharding import sharding_settings
+from Join_App.summary import BATCH_SIZE, verify_summaries
+
+class Command(BaseCommand):
+    """
+    Django management command checking the per-user board summaries.
+
+    Recomputes every stored summary from the tasks, in batches of short
+    transactions on every shard (or the default database without
+    sharding), and reports the fields that drifted from the incremental
+    updates. With --fix the drifted summaries are overwritten.
+    """
+    help = 'Recomputes the board summaries from scratch and reports drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted summaries.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Summaries per transaction.')
+        parser.add_argument('--database', action='append',
+                            help='Database to verify; repeatable (default: all shards).')
+
+    def handle(self, *args, **options):
+        """
+        Execute the verification.
+
+        Args:
+            *args: Additional positional arguments.
+            **options: Fix flag, batch size and databases.
+
+        Returns:
+            None: Outputs every drifted field and the number of drifted
+            summaries per database.
+
+        Raises:
+            CommandError: If summaries drifted and --fix was not given.
+        """
+        databases = options['database'] or sharding_settings()['SHARDS'] or ['default']
+        drifted = 0
+        for alias in databases:
+            drift = verify_summaries(alias, fix=options['fix'], batch_size=options['batch_size'])
+            for user_id, fields in sorted(drift.items()):
+                for field, (stored, actual) in fields.items():
+                    self.stdout.write(f'{alias} user {user_id}: {field} is {stored}, should be {actual}')
+            self.stdout.write(f"{'Fixed' if options['fix'] else 'Found'} {len(drift)} drifted summaries in {alias}")
+            drifted += len(drift)
+        if drifted and not options['fix']:
+            raise CommandError(f'{drifted} summaries drifted; run with --fix to repair them.')
@@ -0,0 +1,380 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager, suppress
+from pathlib import Path
+
+from django.conf import settings
+
+METRICS_DEFAULTS = {
+    'ENABLED': True,
+    # Directory shared by all worker processes of one deployment
+    'DIRECTORY': None,
+    # Seconds between two writes of a worker's metrics file
+    'FLUSH_INTERVAL': 5,
+    # Bearer token for scrapers; staff users can always read the metrics
+    'TOKEN': None,
+}
+
+# Files of the metrics directory besides the workers' own
+AGGREGATE_FILE = 'metrics-aggregate.json'
+LOCK_FILE = 'metrics.lock'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+METRICS = {
+    'join_http_requests_total': ('counter', 'HTTP requests by view, method and status code.'),
+    'join_http_request_duration_seconds': ('histogram', 'HTTP request latency by view and method.'),
+    'join_db_queries_per_request': ('histogram', 'SQL statements per request by view.'),
+    'join_db_duration_seconds': ('histogram', 'SQL time per request by view.'),
+    'join_auth_events_total': ('counter', 'Authentication outcomes by event.'),
+    'join_db_lock_retries_total': ('counter', 'Write transactions retried after database lock errors.'),
+    'join_coalesced_reads_total': ('counter', 'Coalesced board reads by outcome.'),
+}
+BUCKETS = {
+    'join_http_request_duration_seconds': DURATION_BUCKETS,
+    'join_db_queries_per_request': QUERY_COUNT_BUCKETS,
+    'join_db_duration_seconds': DURATION_BUCKETS,
+}
+
+
+def metrics_settings():
+    """
+    Returns the metrics settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    config = {**METRICS_DEFAULTS, **getattr(settings, 'METRICS', {})}
+    if config['DIRECTORY'] is None:
+        config['DIRECTORY'] = Path(settings.BASE_DIR) / 'metrics'
+    return config
+
+
+class MetricsRegistry:
+    """
+    In-process store of counters and histograms shared across workers via files.
+
+    Every process keeps its own values in memory and periodically writes
+    them to its own file in the metrics directory. Reading the metrics
+    merges the files of all processes, so a scrape hitting any worker sees
+    the totals of the whole deployment. The files of exited workers are
+    folded into one aggregate file when the metrics are read, so their
+    counts stay in the totals without the directory growing with every
+    worker restart.
+
+    Args:
+        directory: Directory shared by the worker processes
+        flush_interval: Seconds between two writes of this process's file
+    """
+
+    def __init__(self, directory, flush_interval=5):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self._reset()
+        atexit.register(self.flush)
+
+    def _reset(self):
+        # A forked worker must not report the counts of its parent again
+        self.pid = os.getpid()
+        self.path = self.directory / f'metrics-{self.pid}-{uuid.uuid4().hex[:8]}.json'
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = time.monotonic()
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increments a counter.
+
+        Args:
+            name: Metric name
+            value: Amount to add
+            **labels: Label values of the series
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if os.getpid() != self.pid:
+                self._reset()
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.maybe_flush()
+
+    def _observe(self, name, value, labels):
+        key = (name, labels)
+        series = self.histograms.get(key)
+        if series is None:
+            series = self.histograms[key] = [[0] * (len(BUCKETS[name]) + 1), 0.0, 0]
+        series[0][bisect_left(BUCKETS[name], value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def observe(self, name, value, **labels):
+        """
+        Records a value in a histogram.
+
+        Args:
+            name: Metric name, must have buckets in BUCKETS
+            value: Observed value
+            **labels: Label values of the series
+        """
+        with self.lock:
+            if os.getpid() != self.pid:
+                self._reset()
+            self._observe(name, value, tuple(sorted(labels.items())))
+        self.maybe_flush()
+
+    def record_request(self, view, method, status, duration, queries=None, sql_duration=None):
+        """
+        Records all metrics of one HTTP request under a single lock acquisition.
+
+        Args:
+            view: View label (URL name)
+            method: HTTP method
+            status: Response status code
+            duration: Request duration in seconds
+            queries: Number of SQL statements, if known
+            sql_duration: SQL time in seconds, if known
+        """
+        request_key = ('join_http_requests_total',
+                       (('method', method), ('status', str(status)), ('view', view)))
+        view_labels = (('method', method), ('view', view))
+        with self.lock:
+            if os.getpid() != self.pid:
+                self._reset()
+            self.counters[request_key] = self.counters.get(request_key, 0) + 1
+            self._observe('join_http_request_duration_seconds', duration, view_labels)
+            if queries is not None:
+                self._observe('join_db_queries_per_request', queries, (('view', view),))
+                self._observe('join_db_duration_seconds', sql_duration, (('view', view),))
+        self.maybe_flush()
+
+    def snapshot(self):
+        """
+        Returns the values of this process in a JSON-serializable form.
+
+        Returns:
+            dict: Counters and histograms of this process
+        """
+        with self.lock:
+            return _snapshot(self.counters, self.histograms)
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes this process's values to its file in the metrics directory.
+
+        The file is replaced atomically, so readers never see partial data.
+        """
+        self.last_flush = time.monotonic()
+        data = self.snapshot()
+        if not data['counters'] and not data['histograms']:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, self.path)
+
+    def compact(self):
+        """
+        Folds the files of exited workers into the aggregate file.
+
+        Runs under an exclusive lock on the directory, so concurrent
+        scrapes merge every file once. The aggregate lists the files it
+        already contains, so a file left behind by an interrupted
+        compaction is deleted instead of being counted again.
+        """
+        exited = [path for path in self._worker_files() if not _is_running(_file_pid(path))]
+        if not exited:
+            return
+        with self._locked(fcntl.LOCK_EX):
+            aggregate = self._read_aggregate()
+            merged = {name for name in aggregate['merged'] if (self.directory / name).exists()}
+            snapshots = [aggregate]
+            for path in exited:
+                if path.name in merged:
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError):
+                    # Unreadable files are dropped
+                    pass
+                merged.add(path.name)
+            data = _snapshot(*_merge(snapshots))
+            data['merged'] = sorted(merged)
+            temporary = (self.directory / AGGREGATE_FILE).with_suffix('.tmp')
+            temporary.write_text(json.dumps(data))
+            os.replace(temporary, self.directory / AGGREGATE_FILE)
+            for path in exited:
+                with suppress(FileNotFoundError):
+                    path.unlink()
+
+    @contextmanager
+    def _locked(self, operation):
+        # Compaction takes the directory lock exclusively, readers share it
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / LOCK_FILE, 'a') as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    def _worker_files(self):
+        return [path for path in self.directory.glob('metrics-*-*.json')
+                if path != self.path and _file_pid(path) is not None]
+
+    def _read_aggregate(self):
+        try:
+            return json.loads((self.directory / AGGREGATE_FILE).read_text())
+        except (OSError, ValueError):
+            return {'counters': [], 'histograms': [], 'merged': []}
+
+    def collect(self):
+        """
+        Merges the values of all processes.
+
+        The files of exited workers are compacted first. The files of the
+        other processes and the aggregate are read from the metrics
+        directory; the values of this process are taken from memory, as
+        its file may be outdated. The reads hold a shared lock, so a
+        concurrent compaction cannot move a file into the aggregate between
+        reading the one and the other.
+
+        Returns:
+            tuple: (counters, histograms) dicts keyed by (name, labels)
+        """
+        self.compact()
+        snapshots = [self.snapshot()]
+        with self._locked(fcntl.LOCK_SH):
+            aggregate = self._read_aggregate()
+            snapshots.append(aggregate)
+            for path in self._worker_files():
+                if path.name in aggregate['merged']:
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        return _merge(snapshots)
+
+
+def _file_pid(path):
+    # Worker files are named metrics-<pid>-<random>.json
+    try:
+        return int(path.name.split('-')[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+
+def _snapshot(counters, histograms):
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), list(counts), total, count]
+                       for (name, labels), (counts, total, count) in histograms.items()],
+    }
+
+
+def _merge(snapshots):
+    counters, histograms = {}, {}
+    for data in snapshots:
+        for name, labels, value in data['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in data['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = [f'{key}="{_escape(value)}"' for key, value in tuple(labels) + tuple(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render_prometheus(counters, histograms):
+    """
+    Formats merged metrics in the Prometheus text exposition format.
+
+    Args:
+        counters: Counter values keyed by (name, labels)
+        histograms: Histogram values keyed by (name, labels)
+
+    Returns:
+        str: The exposition text
+    """
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (series, labels), value in sorted(counters.items()):
+                if series == name:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+            continue
+        for (series, labels), (counts, total, count) in sorted(histograms.items()):
+            if series != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS[name] + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {total}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Returns the registry of this process, creating it on first use.
+
+    Returns:
+        MetricsRegistry: The process-wide registry
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                config = metrics_settings()
+                _registry = MetricsRegistry(config['DIRECTORY'], config['FLUSH_INTERVAL'])
+    return _registry
+
+
+def count_auth_event(event):
+    """
+    Counts an authentication outcome, e.g. 'token_hit' or 'login_failed'.
+
+    Args:
+        event: Name of the outcome
+    """
+    if metrics_settings()['ENABLED']:
+        get_registry().inc('join_auth_events_total', event=event)
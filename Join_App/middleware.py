@@ -0,0 +1,383 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from Join_App.capture import TraceWriter, capture_settings, read_body, trace_record
+from Join_App.metrics import get_registry, metrics_settings
+from Join_App.profiling import SamplingProfiler, profiling_settings, store_profile
+from Join_App.routers import replication_settings, request_routing, sticky_cache_key
+
+logger = logging.getLogger(__name__)
+
+SQL_INSTRUMENTATION_DEFAULTS = {
+    'ENABLED': True,
+    # A request is logged as slow above this duration (ms) ...
+    'SLOW_REQUEST_MS': 500,
+    # ... or if one statement ran at least this often (likely an N+1 pattern)
+    'DUPLICATE_QUERY_THRESHOLD': 10,
+    # Per-endpoint overrides of SLOW_REQUEST_MS, keyed by URL name
+    'ENDPOINT_THRESHOLDS': {},
+    'SERVER_TIMING_HEADER': True,
+}
+
+
+def sql_instrumentation_settings():
+    """
+    Returns the SQL instrumentation settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**SQL_INSTRUMENTATION_DEFAULTS, **getattr(settings, 'SQL_INSTRUMENTATION', {})}
+
+
+class QueryStats:
+    """
+    Collects statistics about the SQL statements of one request.
+
+    Instances are installed with connection.execute_wrapper(), so they are
+    called for every statement executed on the wrapped connections.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = None
+        self.slowest_duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self.statements[sql] += 1
+            if elapsed > self.slowest_duration:
+                self.slowest_duration = elapsed
+                self.slowest_sql = sql
+
+    def duplicates(self, limit=5):
+        """
+        Returns the statements that ran more than once, most frequent first.
+
+        Statements are compared with placeholders, so the same query with
+        different parameters counts as a duplicate.
+
+        Args:
+            limit: Maximum number of statements to return
+
+        Returns:
+            list: (sql, count) tuples
+        """
+        return [(sql, count) for sql, count in self.statements.most_common(limit) if count > 1]
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Middleware measuring the SQL work done for each request.
+
+    Records query count, total SQL time, the slowest statement and
+    repeated statements on all database connections, exposes them in a
+    Server-Timing response header and logs a structured record for slow
+    requests. The statistics are left on the request as `sql_stats` for
+    outer middleware. Configured through the SQL_INSTRUMENTATION setting.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = sql_instrumentation_settings()
+
+    def __call__(self, request):
+        """
+        Processes a request with all database connections instrumented.
+
+        Args:
+            request: The HTTP request.
+
+        Returns:
+            HttpResponse: The response, with a Server-Timing header if enabled.
+        """
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+
+        stats = request.sql_stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all(initialized_only=False):
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = stats.duration * 1000
+
+        if self.config['SERVER_TIMING_HEADER']:
+            response['Server-Timing'] = (
+                f'db;dur={sql_ms:.1f};desc="{stats.count} queries", '
+                f'app;dur={max(total_ms - sql_ms, 0):.1f}, total;dur={total_ms:.1f}'
+            )
+        self.log_if_slow(request, response, stats, total_ms)
+        return response
+
+    def threshold_for(self, request):
+        """
+        Returns the slow-request threshold of the endpoint handling a request.
+
+        Args:
+            request: The HTTP request.
+
+        Returns:
+            float: Threshold in milliseconds
+        """
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        return self.config['ENDPOINT_THRESHOLDS'].get(url_name, self.config['SLOW_REQUEST_MS'])
+
+    def log_if_slow(self, request, response, stats, total_ms):
+        """
+        Logs a structured record if a request was slow or repeated statements.
+
+        Args:
+            request: The HTTP request.
+            response: The HTTP response.
+            stats: QueryStats of the request.
+            total_ms: Total request duration in milliseconds.
+        """
+        duplicates = stats.duplicates()
+        too_slow = total_ms > self.threshold_for(request)
+        repeated = duplicates and duplicates[0][1] >= self.config['DUPLICATE_QUERY_THRESHOLD']
+        if not (too_slow or repeated):
+            return
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': match.url_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'sql_ms': round(stats.duration * 1000, 1),
+            'queries': stats.count,
+            'slowest_sql': stats.slowest_sql,
+            'slowest_sql_ms': round(stats.slowest_duration * 1000, 1),
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in duplicates],
+        }
+        logger.warning("Slow request: %s", json.dumps(record), extra={'sql_stats': record})
+
+
+def request_user(request):
+    """
+    Authenticates a request with the API's authentication classes before the view runs.
+
+    Args:
+        request: The HTTP request.
+
+    Returns:
+        User: The authenticated or anonymous user, or None if the
+        credentials were rejected.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        return Request(request, authenticators=authenticators).user
+    except APIException:
+        return None
+
+
+class RequestProfilerMiddleware:
+    """
+    Middleware profiling single requests end to end with a sampling profiler.
+
+    A request is profiled if a staff user sends the configured header, or
+    at random with the configured sample rate. Requests with the header
+    are authenticated up front, like the API views do, and only staff
+    requests start the sampler, so the header costs other clients no more
+    than one authentication. Must come after AuthenticationMiddleware, so
+    session users are known. Profiles are stored as collapsed-stack files
+    and listed in the Django admin. Configured through the PROFILING
+    setting.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = profiling_settings()
+        self.header = 'HTTP_' + self.config['HEADER'].upper().replace('-', '_')
+
+    def __call__(self, request):
+        """
+        Processes a request, profiling it if requested or sampled.
+
+        Args:
+            request: The HTTP request.
+
+        Returns:
+            HttpResponse: The response, with an X-Profile-ID header if a
+            profile was stored.
+        """
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+        if request.META.get(self.header):
+            user = request_user(request)
+            if user is None or not user.is_staff:
+                return self.get_response(request)
+            trigger = 'header'
+        elif self.config['SAMPLE_RATE'] and random.random() < self.config['SAMPLE_RATE']:
+            trigger = 'sample'
+        else:
+            return self.get_response(request)
+
+        profiler = SamplingProfiler(interval=self.config['INTERVAL_MS'] / 1000)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            profile = store_profile(profiler, request, response, duration_ms, trigger)
+        except Exception:
+            logger.exception("Could not store request profile")
+            return response
+        response['X-Profile-ID'] = str(profile.id)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Middleware recording request metrics for the Prometheus endpoint.
+
+    Counts requests per view, method and status code and records latency
+    histograms. If SQLInstrumentationMiddleware runs inside this middleware,
+    its statistics are recorded as query count and SQL time histograms.
+    Configured through the METRICS setting.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = metrics_settings()['ENABLED']
+
+    def __call__(self, request):
+        """
+        Processes a request and records its metrics.
+
+        Args:
+            request: The HTTP request.
+
+        Returns:
+            HttpResponse: The unchanged response.
+        """
+        if not self.enabled:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        stats = getattr(request, 'sql_stats', None)
+        get_registry().record_request(
+            view=match.view_name if match else '<unresolved>',
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            queries=stats.count if stats else None,
+            sql_duration=stats.duration if stats else None,
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware deciding whether the reads of a request may use a replica.
+
+    Safe requests read from the replicas unless the client wrote within
+    the last STICKY_SECONDS, so users always see their own changes. Other
+    requests use the primary only. Clients are remembered as writers in
+    the cache, which must be shared by all workers for the stickiness to
+    hold across them. Configured through the REPLICATION setting.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = replication_settings()
+
+    def __call__(self, request):
+        """
+        Processes a request with the read routing set up.
+
+        Args:
+            request: The HTTP request.
+
+        Returns:
+            HttpResponse: The unchanged response.
+        """
+        if not self.config['REPLICAS']:
+            return self.get_response(request)
+
+        key = sticky_cache_key(request)
+        allow_replica = request.method in self.SAFE_METHODS and not (key and cache.get(key))
+        with request_routing(allow_replica) as wrote:
+            response = self.get_response(request)
+        if wrote and key:
+            cache.set(key, True, self.config['STICKY_SECONDS'])
+        return response
+
+
+class TrafficCaptureMiddleware:
+    """
+    Middleware recording sanitised traces of the API requests.
+
+    Records method, route, the shape of query and body, a pseudonym of the
+    user, the status and the duration of each sampled request to an
+    append-only JSON lines file, which the replay_trace command runs
+    against a seeded database. Personal data is reduced to lengths and
+    placeholders before it is written. Off by default; configured through
+    the CAPTURE setting.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = capture_settings()
+        self.writer = TraceWriter(self.config['PATH'], self.config['MAX_BYTES'])
+
+    def __call__(self, request):
+        """
+        Processes a request, recording it if sampled.
+
+        Args:
+            request: The HTTP request.
+
+        Returns:
+            HttpResponse: The unchanged response.
+        """
+        if not self.config['ENABLED'] or self.writer.full or random.random() >= self.config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        body = read_body(request, self.config)
+        started = time.time()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        try:
+            record = trace_record(request, response, body, started, duration_ms, self.config)
+            if record is not None:
+                self.writer.append(record)
+        except Exception:
+            logger.exception("Could not record request trace")
+        return response
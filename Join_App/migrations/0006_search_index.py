@@ -0,0 +1,98 @@
+from django.db import migrations
+
+# Frozen copy of the search index DDL as of this migration; later changes to
+# Join_App.search must not alter what historical migrations create. The
+# migrations rebuilding tables under the index (0009, 0012, 0015) reuse
+# drop_index and rebuild_index from here.
+CREATE_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS join_app_search USING fts5(
+        kind UNINDEXED,
+        object_id UNINDEXED,
+        task_id UNINDEXED,
+        title,
+        body,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4 5 6'
+    )
+"""
+
+TRIGGER_SQL = [
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_task_ai AFTER INSERT ON Join_App_task BEGIN "
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "VALUES ((new.user_id) * 17179869184 + new.id * 4 + 1, 1, new.id, new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_task_au AFTER UPDATE OF title, description ON Join_App_task BEGIN "
+    "DELETE FROM join_app_search WHERE rowid = (old.user_id) * 17179869184 + old.id * 4 + 1; "
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "VALUES ((new.user_id) * 17179869184 + new.id * 4 + 1, 1, new.id, new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_task_ad AFTER DELETE ON Join_App_task BEGIN "
+    "DELETE FROM join_app_search WHERE rowid = (old.user_id) * 17179869184 + old.id * 4 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_task_ad_subtasks AFTER DELETE ON Join_App_task BEGIN "
+    "DELETE FROM join_app_search WHERE rowid BETWEEN old.user_id * 17179869184 "
+    "AND (old.user_id + 1) * 17179869184 - 1 AND task_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_subtask_ai AFTER INSERT ON Join_App_subtask BEGIN "
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "VALUES (((SELECT user_id FROM Join_App_task WHERE id = new.task_id)) * 17179869184 + new.id * 4 + 2, "
+    "2, new.id, new.task_id, new.name, ''); END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_subtask_au AFTER UPDATE OF name, task_id ON Join_App_subtask BEGIN "
+    "DELETE FROM join_app_search "
+    "WHERE rowid = ((SELECT user_id FROM Join_App_task WHERE id = old.task_id)) * 17179869184 + old.id * 4 + 2; "
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "VALUES (((SELECT user_id FROM Join_App_task WHERE id = new.task_id)) * 17179869184 + new.id * 4 + 2, "
+    "2, new.id, new.task_id, new.name, ''); END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_subtask_ad AFTER DELETE ON Join_App_subtask BEGIN "
+    "DELETE FROM join_app_search "
+    "WHERE rowid = ((SELECT user_id FROM Join_App_task WHERE id = old.task_id)) * 17179869184 + old.id * 4 + 2; END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_contact_ai AFTER INSERT ON Join_App_contact BEGIN "
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "VALUES ((new.user_id) * 17179869184 + new.id * 4 + 3, 3, new.id, NULL, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_contact_au AFTER UPDATE OF name, email ON Join_App_contact BEGIN "
+    "DELETE FROM join_app_search WHERE rowid = (old.user_id) * 17179869184 + old.id * 4 + 3; "
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "VALUES ((new.user_id) * 17179869184 + new.id * 4 + 3, 3, new.id, NULL, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS join_app_search_contact_ad AFTER DELETE ON Join_App_contact BEGIN "
+    "DELETE FROM join_app_search WHERE rowid = (old.user_id) * 17179869184 + old.id * 4 + 3; END",
+]
+
+POPULATE_SQL = [
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "SELECT (user_id) * 17179869184 + id * 4 + 1, 1, id, id, title, description FROM Join_App_task",
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "SELECT (t.user_id) * 17179869184 + s.id * 4 + 2, 2, s.id, s.task_id, s.name, '' "
+    "FROM Join_App_subtask s JOIN Join_App_task t ON t.id = s.task_id",
+    "INSERT INTO join_app_search(rowid, kind, object_id, task_id, title, body) "
+    "SELECT (user_id) * 17179869184 + id * 4 + 3, 3, id, NULL, name, email FROM Join_App_contact",
+    "INSERT INTO join_app_search(join_app_search) VALUES ('optimize')",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS join_app_search_{name}"
+    for name in ('task_ai', 'task_au', 'task_ad', 'task_ad_subtasks',
+                 'subtask_ai', 'subtask_au', 'subtask_ad',
+                 'contact_ai', 'contact_au', 'contact_ad')
+] + ["DROP TABLE IF EXISTS join_app_search"]
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+def rebuild_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    drop_index(apps, schema_editor)
+    for statement in [CREATE_TABLE_SQL, *TRIGGER_SQL, *POPULATE_SQL]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0005_contact_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_index, drop_index),
+    ]
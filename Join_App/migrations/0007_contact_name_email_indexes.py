@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:43
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0006_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(models.F('user'), django.db.models.functions.text.Lower('name'), name='contact_user_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(models.F('user'), django.db.models.functions.text.Lower('email'), name='contact_user_email_lower_idx'),
+        ),
+    ]
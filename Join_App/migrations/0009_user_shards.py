@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:59
+
+from importlib import import_module
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Altering the user fields rebuilds the tables, which fails while the
+# search triggers reference them; the index is dropped and rebuilt around it
+search_index = import_module('Join_App.migrations.0006_search_index')
+drop_index = search_index.drop_index
+rebuild_index = search_index.rebuild_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0008_requestprofile'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_index, rebuild_index),
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('shard', models.CharField(max_length=50)),
+                ('moving', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='contacts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(rebuild_index, drop_index),
+    ]
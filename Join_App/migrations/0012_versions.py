@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:17
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+# The version columns carry a CHECK constraint, so SQLite rebuilds the
+# tables; the search triggers referencing them are dropped meanwhile
+search_index = import_module('Join_App.migrations.0006_search_index')
+drop_index = search_index.drop_index
+rebuild_index = search_index.rebuild_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0011_idempotency_records'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_index, rebuild_index),
+        migrations.AddField(
+            model_name='contact',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(rebuild_index, drop_index),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:48
+
+import hashlib
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+# The new columns are NOT NULL, so SQLite rebuilds the contact table; the
+# search triggers referencing it are dropped meanwhile
+search_index = import_module('Join_App.migrations.0006_search_index')
+drop_index = search_index.drop_index
+rebuild_index = search_index.rebuild_index
+
+
+# Frozen copies of Contact.get_initials and Join_App.avatars.avatar_hash as of
+# this migration; later changes to them must not alter the stored values
+def get_initials(name):
+    parts = name.split()
+    if len(parts) > 1:
+        return parts[0][0].upper() + parts[-1][0].upper()
+    return parts[0][0].upper() if parts else ''
+
+
+def avatar_hash(initials, color):
+    return hashlib.sha256(f'{initials}\n{color}'.encode()).hexdigest()[:16]
+
+
+def fill_avatars(apps, schema_editor):
+    """
+    Stores the initials and avatar hash of the existing contacts.
+    """
+    Contact = apps.get_model('Join_App', 'Contact')
+    alias = schema_editor.connection.alias
+    last = 0
+    # Keyset batches, as SQLite does not isolate a running read from the updates
+    while True:
+        batch = list(Contact.objects.using(alias).filter(id__gt=last).order_by('id')
+                     .only('id', 'name', 'color')[:1000])
+        if not batch:
+            return
+        for contact in batch:
+            contact.initials = get_initials(contact.name)
+            contact.avatar_hash = avatar_hash(contact.initials, contact.color)
+        Contact.objects.using(alias).bulk_update(batch, ['initials', 'avatar_hash'])
+        last = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0014_task_category_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_index, rebuild_index),
+        migrations.AddField(
+            model_name='contact',
+            name='avatar_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='initials',
+            field=models.CharField(blank=True, default='', editable=False, max_length=2),
+        ),
+        migrations.RunPython(rebuild_index, drop_index),
+        migrations.RunPython(fill_avatars, migrations.RunPython.noop),
+    ]
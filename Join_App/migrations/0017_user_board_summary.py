@@ -0,0 +1,55 @@
+# Generated by Django 5.1.5 on 2026-10-19 12:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+
+def fill_summaries(apps, schema_editor):
+    """
+    Computes the summaries of the users with tasks in one grouped query.
+
+    Users without tasks get theirs on the first read.
+    """
+    Task = apps.get_model('Join_App', 'Task')
+    UserBoardSummary = apps.get_model('Join_App', 'UserBoardSummary')
+    alias = schema_editor.connection.alias
+    as_of = timezone.localdate()
+    open_tasks = ~Q(category='done')
+    rows = (Task.objects.using(alias).values('user_id').order_by()
+            .annotate(**{key: Count('id', filter=Q(category=key))
+                         for key in ('todo', 'inprogress', 'awaitfeedback', 'done')},
+                      urgent=Count('id', filter=open_tasks & Q(priority='urgent')),
+                      overdue=Count('id', filter=open_tasks & Q(due_date__lt=as_of)),
+                      next_deadline=Min('due_date', filter=open_tasks & Q(due_date__gte=as_of))))
+    UserBoardSummary.objects.using(alias).bulk_create(
+        (UserBoardSummary(as_of=as_of, **row) for row in rows), batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0016_task_reminders'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBoardSummary',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('todo', models.IntegerField(default=0)),
+                ('inprogress', models.IntegerField(default=0)),
+                ('awaitfeedback', models.IntegerField(default=0)),
+                ('done', models.IntegerField(default=0)),
+                ('urgent', models.IntegerField(default=0)),
+                ('overdue', models.IntegerField(default=0)),
+                ('next_deadline', models.DateField(blank=True, null=True)),
+                ('as_of', models.DateField()),
+            ],
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
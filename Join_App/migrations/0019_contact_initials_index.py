@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0018_shard_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['user', 'initials'], name='contact_user_initials_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0019_contact_initials_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskreminder',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='taskreminder',
+            index=models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['id'], name='task_reminder_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+import hashlib
+from functools import partial
+
+from django.db import migrations
+
+
+# Frozen copy of Join_App.avatars.avatar_hash as of this migration. Migrations
+# bumping TEMPLATE_VERSION later reuse store_hashes from here.
+def avatar_hash(initials, color, template_version):
+    if template_version is None:
+        # Hash of migration 0015, before the template version was added
+        return hashlib.sha256(f'{initials}\n{color}'.encode()).hexdigest()[:16]
+    return hashlib.sha256(f'{template_version}\n{initials}\n{color}'.encode()).hexdigest()[:16]
+
+
+def store_hashes(apps, schema_editor, template_version):
+    """
+    Recomputes the avatar hashes of all contacts for a template version.
+    """
+    Contact = apps.get_model('Join_App', 'Contact')
+    alias = schema_editor.connection.alias
+    last = 0
+    # Keyset batches, as SQLite does not isolate a running read from the updates
+    while True:
+        batch = list(Contact.objects.using(alias).filter(id__gt=last).order_by('id')
+                     .only('id', 'initials', 'color')[:1000])
+        if not batch:
+            return
+        for contact in batch:
+            contact.avatar_hash = avatar_hash(contact.initials, contact.color, template_version)
+        Contact.objects.using(alias).bulk_update(batch, ['avatar_hash'])
+        last = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Join_App', '0021_archivedtask_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(partial(store_hashes, template_version=1), partial(store_hashes, template_version=None)),
+    ]
@@ -1,19 +1,145 @@
-from django.db import models
+from datetime import date
+from pathlib import Path
+
+from django.db import models, router, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import User 
 from django.contrib.auth import get_user_model
 
-class Contact(models.Model):
+from Join_App.avatars import avatar_hash
+from Join_App.sharding import assign_ids
+
+# Marks a task whose counted state was not loaded; its summary is rebuilt
+UNKNOWN_STATE = object()
+
+
+class VersionConflict(Exception):
+    """
+    Raised when a versioned row was changed since it was loaded.
+    """
+
+
+class ShardedIdQuerySet(models.QuerySet):
+    """
+    QuerySet giving bulk-created rows IDs that are unique across shards.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        assign_ids(self.model, objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class ShardedIdModel(models.Model):
+    """
+    Abstract model for board rows addressed by ID in the API.
+
+    With sharding, new rows get their ID from the central sequence (see
+    sharding.reserve_ids) instead of the shard's own counter, so IDs are
+    unique across shards and survive moving a user to another shard.
+    """
+    objects = ShardedIdQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.pk is None and assign_ids(type(self), [self]):
+            # The ID is new, so Django need not try an UPDATE first
+            kwargs['force_insert'] = True
+        super().save(*args, **kwargs)
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract model with a version for optimistic concurrency control.
+
+    The API writes these models through save_version(), which increments
+    the version and fails if another write came first. Clients send the
+    version as If-Match to avoid overwriting each other's changes. Other
+    writes through save(), e.g. from the admin, increment the version as
+    well, without the check.
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the row, incrementing the version of an existing one.
+
+        The increment happens in the UPDATE, so a concurrent write cannot
+        leave both writes with the same version.
+
+        Args:
+            *args: Positional arguments for Model.save().
+            **kwargs: Keyword arguments for Model.save().
+        """
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or kwargs.get('force_insert') or (update_fields is not None and not update_fields):
+            super().save(*args, **kwargs)
+            return
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        version, self.version = self.version, F('version') + 1
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = version
+            raise
+        self.refresh_from_db(using=kwargs.get('using'), fields=['version'])
+
+    def save_version(self, update_fields):
+        """
+        Writes fields and increments the version in one conditional UPDATE.
+
+        The UPDATE only matches while the row still has the version this
+        instance was loaded with.
+
+        Args:
+            update_fields: Names of the fields to write
+
+        Raises:
+            VersionConflict: If the row was changed or deleted meanwhile
+        """
+        using = router.db_for_write(type(self), instance=self)
+        values = {field: getattr(self, field) for field in update_fields}
+        updated = type(self)._base_manager.using(using).filter(pk=self.pk, version=self.version).update(
+            version=F('version') + 1, **values,
+        )
+        if not updated:
+            raise VersionConflict()
+        self.version += 1
+
+
+class Contact(ShardedIdModel, VersionedModel):
     """
     Model representing a contact that can be assigned to tasks.
     
     Each contact belongs to a specific user and contains basic contact information
     such as name, email, phone, and a color for UI representation.
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contacts')  # Added user field
+    # No constraint, as contacts may live in a shard without the user table
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contacts', db_constraint=False)
     name = models.CharField(max_length=100)
     email = models.EmailField(max_length=255)
     phone = models.CharField(max_length=20, blank=True, null=True)
     color = models.CharField(max_length=7, default="#6e6ee5")  # Hex color code
+    # Derived from name and colour on save, so listings do not recompute them
+    initials = models.CharField(max_length=2, blank=True, default='', editable=False)
+    avatar_hash = models.CharField(max_length=16, blank=True, default='', editable=False, db_index=True)
+    
+    class Meta:
+        indexes = [
+            # Serve prefix autocomplete and alphabetical grouping per user
+            models.Index(F('user'), Lower('name'), name='contact_user_name_lower_idx'),
+            models.Index(F('user'), Lower('email'), name='contact_user_email_lower_idx'),
+            # Alphabetical group counts and listings
+            models.Index(fields=['user', 'initials'], name='contact_user_initials_idx'),
+        ]
     
     def __str__(self):
         """
@@ -38,8 +164,60 @@ class Contact(models.Model):
         if len(parts) > 1:
             return parts[0][0].upper() + parts[-1][0].upper()
         return parts[0][0].upper() if parts else ""
+    
+    def get_group_initial(self):
+        """
+        Returns the letter the contact is grouped under in alphabetical listings.
+        
+        Uses the same logic as get_initials, so the grouping matches the
+        initials shown for the contact.
+        
+        Returns:
+            str: First letter of the initials, or "#" if the name has none.
+        """
+        return self.get_initials()[:1] or "#"
+    
+    def update_avatar(self):
+        """
+        Stores the initials and the hash of the avatar drawn from them.
+        
+        bulk_create() skips save(), so callers creating contacts in bulk
+        call this themselves.
+        
+        Returns:
+            list: Names of the fields that changed.
+        """
+        initials = self.get_initials()
+        digest = avatar_hash(initials, self.color)
+        changed = [field for field, value in (('initials', initials), ('avatar_hash', digest))
+                   if getattr(self, field) != value]
+        self.initials, self.avatar_hash = initials, digest
+        return changed
+    
+    def save(self, *args, **kwargs):
+        """
+        Saves the contact with its initials and avatar hash.
+        
+        Args:
+            *args: Positional arguments for Model.save().
+            **kwargs: Keyword arguments for Model.save().
+        """
+        changed = self.update_avatar()
+        update_fields = kwargs.get('update_fields')
+        if changed and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *changed}
+        super().save(*args, **kwargs)
+    
+    def save_version(self, update_fields):
+        """
+        Writes fields with a version check, with the initials and avatar hash.
+        
+        Args:
+            update_fields: Names of the fields to write
+        """
+        super().save_version([*update_fields, *self.update_avatar()])
 
-class Task(models.Model):
+class Task(ShardedIdModel, VersionedModel):
     """
     Model representing a task in the task management system.
     
@@ -60,7 +238,8 @@ class Task(models.Model):
         ('done', 'Done'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
+    # No constraint, as tasks may live in a shard without the user table
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks', db_constraint=False)
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     assigned_to = models.ManyToManyField(Contact, related_name='assigned_tasks', blank=True)
@@ -68,6 +247,147 @@ class Task(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     category = models.CharField(max_length=15, choices=CATEGORY_CHOICES, default='todo')
     current_progress = models.IntegerField(default=0)
+    # Set when the task enters the done category; drives the archiving
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Scanned by the archiving for done tasks past the threshold
+            models.Index(fields=['completed_at'], condition=models.Q(category='done'),
+                         name='task_done_completed_at_idx'),
+            # Range scans and per-day counts of the calendar
+            models.Index(fields=['user', 'due_date'], name='task_user_due_date_idx'),
+            # Category filter of the admin changelist
+            models.Index(fields=['category'], name='task_category_idx'),
+            # Keyset scan of the reminders over all users' open tasks
+            models.Index(fields=['due_date', 'id'], condition=~models.Q(category='done'),
+                         name='task_open_due_date_idx'),
+        ]
+    
+    def track_completion(self):
+        """
+        Sets or clears the completion time according to the category.
+        
+        Returns:
+            bool: True if completed_at changed.
+        """
+        completed_at = self.completed_at
+        if self.category == 'done' and self.completed_at is None:
+            self.completed_at = timezone.now()
+        elif self.category != 'done':
+            self.completed_at = None
+        return self.completed_at != completed_at
+    
+    # Category, priority and due date as last read or written, for the summary
+    _summary_state = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Loads a task, remembering the state counted in the user's summary.
+        """
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'category', 'priority', 'due_date'}:
+            instance._summary_state = instance.summary_state()
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        """
+        Reloads fields from the database, remembering the reloaded counted state.
+        """
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None and not self.get_deferred_fields() & {'category', 'priority', 'due_date'}:
+            self._summary_state = self.summary_state()
+    
+    def summary_state(self):
+        """
+        Returns the fields of the task counted in UserBoardSummary.
+        
+        Returns:
+            tuple: (category, priority, due_date)
+        """
+        due_date = self.due_date
+        if isinstance(due_date, str):
+            due_date = date.fromisoformat(due_date)
+        return self.category, self.priority, due_date
+    
+    def record_summary_change(self, old, using):
+        """
+        Applies the change of this task to the user's summary.
+        
+        Args:
+            old: State before the write, None for a new task, or
+                UNKNOWN_STATE if it was not loaded
+            using: Database alias of the write
+        """
+        from Join_App.summary import record_changes
+        
+        new = self.summary_state()
+        record_changes(self.user_id, [(old, new)], using)
+        self._summary_state = new
+    
+    def save(self, *args, **kwargs):
+        """
+        Saves the task, tracking when it was completed and updating the
+        user's summary in the same transaction.
+        
+        Args:
+            *args: Positional arguments for Model.save().
+            **kwargs: Keyword arguments for Model.save().
+        """
+        update_fields = kwargs.get('update_fields')
+        if self.track_completion() and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'completed_at'}
+        old = None if self._state.adding else (self._summary_state or UNKNOWN_STATE)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            self.record_summary_change(old, using)
+    
+    def save_version(self, update_fields):
+        """
+        Writes fields with a version check, tracking when the task was
+        completed and updating the user's summary in the same transaction.
+        
+        Args:
+            update_fields: Names of the fields to write
+            
+        Raises:
+            VersionConflict: If the row was changed or deleted meanwhile
+        """
+        if self.track_completion():
+            update_fields = [*update_fields, 'completed_at']
+        using = router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            try:
+                super().save_version(update_fields)
+            except VersionConflict:
+                # Raised outside the block, so the caller's transaction stays usable
+                conflict = True
+            else:
+                conflict = False
+                self.record_summary_change(self._summary_state or UNKNOWN_STATE, using)
+        if conflict:
+            raise VersionConflict()
+    
+    def delete(self, using=None, keep_parents=False):
+        """
+        Deletes the task and removes it from the user's summary in the same transaction.
+        
+        Args:
+            using: Database alias
+            keep_parents: Passed to Model.delete()
+            
+        Returns:
+            tuple: Number of deleted objects and the counts per model.
+        """
+        from Join_App.summary import record_changes
+        
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            deleted = super().delete(using=using, keep_parents=keep_parents)
+            record_changes(self.user_id, [(self._summary_state or UNKNOWN_STATE, None)], using)
+        return deleted
     
     def __str__(self):
         """
@@ -78,7 +398,7 @@ class Task(models.Model):
         """
         return self.title
 
-class Subtask(models.Model):
+class Subtask(ShardedIdModel):
     """
     Model representing a subtask within a main task.
     
@@ -96,4 +416,251 @@ class Subtask(models.Model):
         Returns:
             str: Name of the subtask.
         """
-        return self.name
\ No newline at end of file
+        return self.name
+class RequestProfile(models.Model):
+    """
+    Model representing a stored profile of a single API request.
+    
+    The samples themselves are kept in a collapsed-stack file in the
+    profile directory (see Join_App.profiling); this model records which
+    request was profiled and where the file is.
+    """
+    TRIGGER_CHOICES = [
+        ('header', 'Request header'),
+        ('sample', 'Random sample'),
+    ]
+    
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    duration_ms = models.FloatField()
+    samples = models.PositiveIntegerField()
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    filename = models.CharField(max_length=64)
+    size = models.PositiveIntegerField()
+    
+    def __str__(self):
+        """
+        String representation of the RequestProfile.
+        
+        Returns:
+            str: Method and path of the profiled request.
+        """
+        return f"{self.method} {self.path}"
+    
+    @property
+    def file_path(self):
+        """
+        Location of the collapsed-stack file of this profile.
+        
+        Returns:
+            Path: Path of the profile file.
+        """
+        from Join_App.profiling import profiling_settings
+        return Path(profiling_settings()['DIRECTORY']) / self.filename
+
+
+class UserShard(models.Model):
+    """
+    Model pinning the board data of a user to a shard.
+
+    Users without a record live in the shard chosen by the hash of their
+    ID (see Join_App.sharding). Records are written when a user's data is
+    moved, and mark the user as moving while the rows are copied.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    shard = models.CharField(max_length=50)
+    moving = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """
+        String representation of the UserShard.
+
+        Returns:
+            str: User ID and shard alias.
+        """
+        return f"{self.user_id} -> {self.shard}"
+
+
+class ShardSequence(models.Model):
+    """
+    Model holding the next free ID of a sharded model.
+
+    Lives on the default database; see sharding.reserve_ids.
+    """
+    model = models.CharField(max_length=100, primary_key=True)
+    next_id = models.BigIntegerField()
+
+    def __str__(self):
+        """
+        String representation of the ShardSequence.
+
+        Returns:
+            str: Model label and next ID.
+        """
+        return f"{self.model}: {self.next_id}"
+
+
+class ArchivedTask(ShardedIdModel):
+    """
+    Model representing a done task moved out of the active board.
+
+    Subtasks and assigned contacts are archived with it (see
+    Join_App.archiving). The ID of the original task is kept, so restoring
+    brings back the same taskID unless it has been taken meanwhile.
+    """
+    original_id = models.BigIntegerField()
+    # No constraint, as archived tasks may live in a shard without the user table
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks', db_constraint=False)
+    title = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    assigned_to = models.ManyToManyField(Contact, related_name='archived_tasks', blank=True)
+    due_date = models.DateField()
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default='medium')
+    category = models.CharField(max_length=15, choices=Task.CATEGORY_CHOICES, default='done')
+    current_progress = models.IntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # Version of the task when it was archived; restoring continues from it
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-completed_at'], name='archived_user_completed_idx'),
+        ]
+
+    def __str__(self):
+        """
+        String representation of the ArchivedTask.
+
+        Returns:
+            str: Title of the task.
+        """
+        return self.title
+
+class ArchivedSubtask(ShardedIdModel):
+    """
+    Model representing a subtask of an archived task.
+    """
+    task = models.ForeignKey(ArchivedTask, on_delete=models.CASCADE, related_name='subtasks')
+    name = models.CharField(max_length=100)
+    done = models.BooleanField(default=False)
+
+    def __str__(self):
+        """
+        String representation of the ArchivedSubtask.
+
+        Returns:
+            str: Name of the subtask.
+        """
+        return self.name
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Model storing the response of a create request sent with an Idempotency-Key.
+
+    The record is claimed before the request runs, without a response, so
+    duplicates arriving meanwhile wait for it (see Join_App.idempotency).
+    Retries within the TTL get the stored response replayed.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    # SHA-256 of method, path and body; a key may not be reused for another request
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+
+    @property
+    def completed(self):
+        """
+        Whether the response of the first request is stored.
+
+        Returns:
+            bool: True once the first request has finished.
+        """
+        return self.status_code is not None
+
+    def __str__(self):
+        """
+        String representation of the IdempotencyRecord.
+
+        Returns:
+            str: User ID and key.
+        """
+        return f"{self.user_id}: {self.key}"
+
+
+class TaskReminder(models.Model):
+    """
+    Model recording a deadline reminder for a task.
+
+    There is one reminder per task and due date, so every reminder is sent
+    once; moving the due date makes the task due for a new one (see
+    Join_App.reminders). Reminders are recorded before they are handed to
+    the sink and have no sent_at until it accepted them.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='reminders')
+    due_date = models.DateField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'due_date'], name='task_reminder_task_due_uniq'),
+        ]
+        indexes = [
+            # Finds the reminders left pending by failed scans
+            models.Index(fields=['id'], condition=models.Q(sent_at__isnull=True), name='task_reminder_pending_idx'),
+        ]
+
+    def __str__(self):
+        """
+        String representation of the TaskReminder.
+
+        Returns:
+            str: Task ID and due date.
+        """
+        return f"{self.task_id}: {self.due_date}"
+
+
+class UserBoardSummary(models.Model):
+    """
+    Model holding the figures of a user's summary page.
+
+    Kept current by every task write in the same transaction (see
+    Join_App.summary), so the page reads one row. Overdue tasks and the
+    next deadline depend on the day; they are relative to as_of and
+    recomputed on the first read of a new day.
+    """
+    # No constraint, as summaries live in the shard of the user's tasks
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+',
+                                db_constraint=False)
+    todo = models.IntegerField(default=0)
+    inprogress = models.IntegerField(default=0)
+    awaitfeedback = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+    # Open tasks, i.e. not done, with urgent priority
+    urgent = models.IntegerField(default=0)
+    # Open tasks due before as_of
+    overdue = models.IntegerField(default=0)
+    # Earliest due date of the open tasks on or after as_of
+    next_deadline = models.DateField(null=True, blank=True)
+    as_of = models.DateField()
+
+    def __str__(self):
+        """
+        String representation of the UserBoardSummary.
+
+        Returns:
+            str: User ID and date of the figures.
+        """
+        return f"{self.user_id} as of {self.as_of}"
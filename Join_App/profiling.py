@@ -0,0 +1,159 @@
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILING_DEFAULTS = {
+    'ENABLED': True,
+    # Staff users get their request profiled when they send this header
+    'HEADER': 'X-Profile-Request',
+    # Fraction of all requests that is profiled at random
+    'SAMPLE_RATE': 0.0,
+    'INTERVAL_MS': 2,
+    'DIRECTORY': None,
+    'MAX_PROFILES': 200,
+    'MAX_TOTAL_BYTES': 50 * 1024 * 1024,
+}
+
+
+def profiling_settings():
+    """
+    Returns the profiling settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    config = {**PROFILING_DEFAULTS, **getattr(settings, 'PROFILING', {})}
+    if config['DIRECTORY'] is None:
+        config['DIRECTORY'] = Path(settings.BASE_DIR) / 'profiles'
+    return config
+
+
+def frame_label(code):
+    """
+    Formats a code object as a flame graph frame, e.g. "api/views.py:list".
+
+    Args:
+        code: Code object of a stack frame
+
+    Returns:
+        str: Short frame label
+    """
+    parent, filename = os.path.split(code.co_filename)
+    return f"{os.path.basename(parent)}/{filename}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stack of one thread.
+
+    A background thread periodically reads the target thread's current
+    frame and counts the stacks seen. The result is in the collapsed-stack
+    format understood by flamegraph.pl, speedscope and similar tools.
+
+    Args:
+        thread_id: Identifier of the thread to sample (default: the calling thread)
+        interval: Seconds between two samples
+    """
+
+    def __init__(self, thread_id=None, interval=0.002):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def collapsed(self):
+        """
+        Returns the recorded samples in the collapsed-stack format.
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def store_profile(profiler, request, response, duration_ms, trigger):
+    """
+    Writes a profile to the profile directory and records it in the database.
+
+    Args:
+        profiler: The stopped SamplingProfiler
+        request: The profiled HTTP request
+        response: The HTTP response
+        duration_ms: Duration of the request in milliseconds
+        trigger: What caused the profiling ('header' or 'sample')
+
+    Returns:
+        RequestProfile: The created record
+    """
+    from Join_App.models import RequestProfile
+
+    config = profiling_settings()
+    directory = Path(config['DIRECTORY'])
+    directory.mkdir(parents=True, exist_ok=True)
+    content = profiler.collapsed().encode()
+    filename = f'{uuid.uuid4().hex}.collapsed'
+    (directory / filename).write_bytes(content)
+
+    user = getattr(request, 'user', None)
+    profile = RequestProfile.objects.create(
+        method=request.method,
+        path=request.get_full_path()[:255],
+        status_code=response.status_code,
+        user=user if user is not None and user.is_authenticated else None,
+        duration_ms=duration_ms,
+        samples=profiler.samples,
+        trigger=trigger,
+        filename=filename,
+        size=len(content),
+    )
+    enforce_limits(config)
+    return profile
+
+
+def enforce_limits(config=None):
+    """
+    Deletes the oldest profiles until the count and size limits hold.
+
+    Args:
+        config: Profiling settings (default: the current settings)
+    """
+    from Join_App.models import RequestProfile
+
+    config = config or profiling_settings()
+    profiles = list(RequestProfile.objects.order_by('-created_at').values_list('id', 'size'))
+    keep, total = 0, 0
+    for _, size in profiles:
+        if keep >= config['MAX_PROFILES'] or total + size > config['MAX_TOTAL_BYTES']:
+            break
+        keep += 1
+        total += size
+    if keep < len(profiles):
+        RequestProfile.objects.filter(id__in=[pk for pk, _ in profiles[keep:]]).delete()
@@ -0,0 +1,177 @@
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from Join_App.database import run_in_transaction
+from user_auth_app.models import ExpiringToken, UserProfile
+from user_auth_app.tokens import new_token
+
+PROVISIONING_DEFAULTS = {
+    # Processes hashing passwords; None uses one per CPU
+    'WORKERS': None,
+    # Users per provisioning request or file
+    'MAX_USERS': 5000,
+    # Rows per INSERT statement
+    'BATCH_SIZE': 500,
+}
+
+
+def provisioning_settings():
+    """
+    Returns the provisioning settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**PROVISIONING_DEFAULTS, **getattr(settings, 'PROVISIONING', {})}
+
+
+def _setup_worker():
+    # Forked workers inherit the set-up Django, spawned ones start without it
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hashes passwords with the configured hasher in a pool of processes.
+
+    Password hashing is CPU-bound and holds the GIL, so only processes
+    spread it over the cores. The pool lives for one call; its start-up is
+    small next to a few hundred hashes.
+
+    Args:
+        passwords: Raw passwords
+        workers: Number of processes (default: WORKERS, or one per CPU)
+
+    Returns:
+        list: Encoded passwords in the order of the input
+    """
+    workers = workers or provisioning_settings()['WORKERS'] or os.cpu_count() or 1
+    workers = min(workers, len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    # A few chunks per worker keep them busy until the end
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def find_conflicts(rows):
+    """
+    Finds rows whose name or email is taken, or repeated within the rows.
+
+    Uses one query per field for all rows; the first of repeated rows
+    is kept.
+
+    Args:
+        rows: Validated rows keyed by their index, with username and email
+
+    Returns:
+        dict: Errors per field keyed by row index
+    """
+    taken = {
+        'name': set(User.objects.filter(username__in={row['username'] for row in rows.values()})
+                    .values_list('username', flat=True)),
+        'email': set(User.objects.filter(email__in={row['email'] for row in rows.values()})
+                     .values_list('email', flat=True)),
+    }
+    seen = {'name': set(), 'email': set()}
+    errors = {}
+    for index, row in rows.items():
+        for field, value in (('name', row['username']), ('email', row['email'])):
+            if value in taken[field]:
+                errors.setdefault(index, {})[field] = ['Already exists.']
+            elif value in seen[field]:
+                errors.setdefault(index, {})[field] = ['Appears more than once.']
+            seen[field].add(value)
+    return errors
+
+
+def _insert(users, batch_size):
+    User.objects.bulk_create(users, batch_size=batch_size)
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users], batch_size=batch_size)
+    ExpiringToken.objects.bulk_create([new_token(user) for user in users], batch_size=batch_size)
+
+
+def provision_users(entries, workers=None):
+    """
+    Creates many users with their profiles and tokens.
+
+    Every row is validated on its own; rows with errors are skipped and
+    reported, the others are created. Passwords are hashed in parallel
+    before the insert, so the write transaction only holds the bulk
+    inserts. The profile signals are not sent; profiles are inserted
+    directly.
+
+    Args:
+        entries: Rows with name, email and password
+        workers: Number of hashing processes (default: WORKERS)
+
+    Returns:
+        tuple: (users, errors) with the created users in input order and a
+        list of {'index', 'errors'} for the skipped rows
+    """
+    # The serializers module reads the settings of this one
+    from Join_App.api.serializers import ProvisionUserSerializer
+
+    rows, errors = {}, {}
+    for index, entry in enumerate(entries):
+        serializer = ProvisionUserSerializer(data=entry)
+        if serializer.is_valid():
+            rows[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+    errors.update(find_conflicts(rows))
+
+    valid = [row for index, row in rows.items() if index not in errors]
+    passwords = hash_passwords([row['password'] for row in valid], workers)
+    users = [User(username=row['username'], email=row['email'], password=password)
+             for row, password in zip(valid, passwords)]
+    if users:
+        run_in_transaction(_insert, users, provisioning_settings()['BATCH_SIZE'], using=DEFAULT_DB_ALIAS)
+    return users, [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+
+
+def measure_provisioning(users=64, worker_counts=None):
+    """
+    Measures bulk provisioning with growing numbers of hashing processes.
+
+    Every run provisions the same number of fresh users in a transaction
+    that is rolled back afterwards. Hashing dominates, so the throughput
+    should grow with the workers up to the number of CPUs.
+
+    Args:
+        users: Users provisioned per run
+        worker_counts: Hashing process counts to test (default: 1, 2, 4 and
+            one per CPU)
+
+    Returns:
+        dict: CPU count and, per worker count, seconds, users per second and
+        speed-up over one worker
+    """
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted(set(worker_counts or [1, 2, 4, cpus]))
+    runs = {}
+    for workers in worker_counts:
+        prefix = uuid.uuid4().hex[:8]
+        rows = [{'name': f'bench_{prefix}_{index}', 'email': f'bench_{prefix}_{index}@example.com',
+                 'password': f'bench-password-{index}'} for index in range(users)]
+        with transaction.atomic():
+            start = time.perf_counter()
+            created, _ = provision_users(rows, workers=workers)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        runs[workers] = {
+            'seconds': round(elapsed, 3),
+            'users_per_second': round(len(created) / elapsed, 1),
+        }
+    for result in runs.values():
+        result['speedup'] = round(runs[worker_counts[0]]['seconds'] / result['seconds'], 2)
+    return {'cpus': cpus, 'users': users, 'runs': runs}
@@ -0,0 +1,234 @@
+import json
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from Join_App.database import run_in_transaction
+from Join_App.models import Task, TaskReminder
+from Join_App.sharding import sharding_settings
+
+REMINDER_DEFAULTS = {
+    # Open tasks due from today until this many days ahead get a reminder
+    'HORIZON_DAYS': 1,
+    # Tasks per batch and transaction
+    'BATCH_SIZE': 500,
+    # Dotted path of the sink class delivering the reminders
+    'SINK': 'Join_App.reminders.ConsoleSink',
+    # File appended to by FileSink
+    'FILE': None,
+}
+
+
+def reminder_settings():
+    """
+    Returns the reminder settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    config = {**REMINDER_DEFAULTS, **getattr(settings, 'REMINDERS', {})}
+    if config['FILE'] is None:
+        config['FILE'] = Path(settings.BASE_DIR) / 'reminders.jsonl'
+    return config
+
+
+class ConsoleSink:
+    """
+    Writes reminders as JSON lines to a stream, standing in for e-mail or push.
+
+    Sinks get the reminders of one batch at a time. The batch is recorded
+    as pending before send() and marked sent after it returns; if send()
+    raises, or the process dies before the batch is marked, the next scan
+    sends it again. Delivery is therefore at least once.
+
+    Args:
+        stream: Text stream (default: standard output)
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, reminders):
+        """
+        Delivers the reminders of one batch.
+
+        Args:
+            reminders: Dicts with user ID, e-mail address, task ID, title,
+                due date and priority
+        """
+        self.stream.write(''.join(json.dumps(reminder) + '\n' for reminder in reminders))
+        self.stream.flush()
+
+
+class FileSink(ConsoleSink):
+    """
+    Appends reminders as JSON lines to the FILE of the reminder settings.
+    """
+
+    def send(self, reminders):
+        path = Path(reminder_settings()['FILE'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as stream:
+            ConsoleSink(stream).send(reminders)
+
+
+def get_sink():
+    """
+    Instantiates the sink configured as SINK.
+
+    Returns:
+        The sink
+    """
+    return import_string(reminder_settings()['SINK'])()
+
+
+def due_tasks(start, end, using=DEFAULT_DB_ALIAS):
+    """
+    Returns the open tasks due in a date range without a reminder for their due date.
+
+    Ordered by due date and ID, matching the partial index on open tasks,
+    so the scan reads only tasks in the range.
+
+    Args:
+        start: First due date
+        end: Last due date
+        using: Database alias
+
+    Returns:
+        QuerySet: The tasks
+    """
+    reminded = TaskReminder.objects.using(using).filter(task_id=OuterRef('id'), due_date=OuterRef('due_date'))
+    return (Task.objects.using(using)
+            .filter(due_date__gte=start, due_date__lte=end)
+            .exclude(category='done')
+            .filter(~Exists(reminded))
+            .order_by('due_date', 'id'))
+
+
+def claim_batch(start, end, after, batch_size, using=DEFAULT_DB_ALIAS):
+    """
+    Records pending reminders for the next batch of due tasks.
+
+    Run in a transaction; nothing is delivered here, so retrying it on
+    lock errors cannot send a reminder twice.
+
+    Args:
+        start: First due date
+        end: Last due date
+        after: (due_date, id) of the last task of the previous batch, or None
+        batch_size: Maximum number of tasks
+        using: Database alias
+
+    Returns:
+        tuple: ((due_date, id) of the last task of this batch, primary keys
+        of the recorded reminders)
+    """
+    # Starting the range at the last due date lets the index seek past the claimed tasks
+    tasks = due_tasks(after[0] if after else start, end, using=using)
+    if after is not None:
+        tasks = tasks.filter(Q(due_date__gt=after[0]) | Q(due_date=after[0], id__gt=after[1]))
+    rows = list(tasks.values_list('due_date', 'id')[:batch_size])
+    if not rows:
+        return after, []
+    reminders = TaskReminder.objects.using(using).bulk_create(
+        TaskReminder(task_id=task_id, due_date=due_date) for due_date, task_id in rows
+    )
+    return rows[-1], [reminder.pk for reminder in reminders]
+
+
+def deliver(reminder_ids, sink, using=DEFAULT_DB_ALIAS):
+    """
+    Hands pending reminders to the sink and marks them sent.
+
+    Runs outside of a transaction, so a slow sink holds no database lock.
+
+    Args:
+        reminder_ids: Primary keys of pending reminders
+        sink: Sink delivering the reminders
+        using: Database alias
+
+    Returns:
+        int: Number of sent reminders
+    """
+    rows = list(TaskReminder.objects.using(using).filter(id__in=reminder_ids, sent_at=None).order_by('id')
+                .values('id', 'task_id', 'due_date', 'task__user_id', 'task__title', 'task__priority'))
+    if not rows:
+        return 0
+    emails = dict(User.objects.using(DEFAULT_DB_ALIAS).filter(id__in={row['task__user_id'] for row in rows})
+                  .values_list('id', 'email'))
+    sink.send([{
+        'user_id': row['task__user_id'], 'email': emails.get(row['task__user_id']), 'task_id': row['task_id'],
+        'title': row['task__title'], 'due_date': str(row['due_date']), 'priority': row['task__priority'],
+    } for row in rows])
+    run_in_transaction(_mark_sent, [row['id'] for row in rows], using, using=using)
+    return len(rows)
+
+
+def _mark_sent(reminder_ids, using):
+    TaskReminder.objects.using(using).filter(id__in=reminder_ids).update(sent_at=timezone.now())
+
+
+def deliver_pending(batch_size, sink, using=DEFAULT_DB_ALIAS):
+    """
+    Sends the reminders left pending by failed or interrupted scans.
+
+    Args:
+        batch_size: Reminders per batch
+        sink: Sink delivering the reminders
+        using: Database alias
+
+    Returns:
+        int: Number of sent reminders
+    """
+    sent, after = 0, 0
+    while True:
+        ids = list(TaskReminder.objects.using(using).filter(sent_at=None, id__gt=after)
+                   .order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return sent
+        sent += deliver(ids, sink, using)
+        after = ids[-1]
+
+
+def send_reminders(horizon_days=None, batch_size=None, sink=None, today=None):
+    """
+    Sends a reminder for every open task due soon that has none yet.
+
+    Scans the due tasks of every shard in batches, continuing after the
+    last task of the previous one, so the work grows with the number of
+    due tasks, not with all tasks. Every batch is recorded as pending in a
+    short transaction, then delivered and marked sent. Reminders left
+    pending by an earlier scan are delivered first.
+
+    Args:
+        horizon_days: Days ahead to look (default: HORIZON_DAYS)
+        batch_size: Tasks per batch (default: BATCH_SIZE)
+        sink: Sink delivering the reminders (default: SINK)
+        today: First due date (default: the current date)
+
+    Returns:
+        int: Number of sent reminders
+    """
+    config = reminder_settings()
+    horizon_days = config['HORIZON_DAYS'] if horizon_days is None else horizon_days
+    batch_size = batch_size or config['BATCH_SIZE']
+    sink = sink or get_sink()
+    today = today or timezone.localdate()
+    sent = 0
+    for alias in sharding_settings()['SHARDS'] or [DEFAULT_DB_ALIAS]:
+        sent += deliver_pending(batch_size, sink, alias)
+        end = today + timedelta(days=horizon_days)
+        after = None
+        while True:
+            after, reminder_ids = run_in_transaction(claim_batch, today, end, after, batch_size, alias, using=alias)
+            if not reminder_ids:
+                break
+            sent += deliver(reminder_ids, sink, alias)
+    return sent
@@ -0,0 +1,298 @@
+import json
+import random
+import re
+import string
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import NoReverseMatch, reverse
+
+from Join_App.api.throttling import throttling_settings
+from Join_App.archiving import archive_batch
+from Join_App.benchmarking import summarize
+from Join_App.capture import capture_settings
+from Join_App.models import ArchivedTask, Contact, Subtask, Task
+from Join_App.seeding import SEED_PASSWORD
+from user_auth_app.models import UserProfile
+
+MARKER = re.compile(r'^<(str|date|email|id|path)(?::(.*))?>$')
+
+# Models behind the IDs of a route, by the route's URL name prefix
+ROUTE_MODELS = {
+    'task': Task,
+    'contact': Contact,
+    'archive': ArchivedTask,
+    'user': User,
+    'userprofile': UserProfile,
+}
+
+
+def consumes(method, route):
+    """
+    Tells whether a request removes the object it refers to.
+
+    Args:
+        method: HTTP method
+        route: URL name
+
+    Returns:
+        bool: True for deletions and restores
+    """
+    return method == 'DELETE' or route.endswith('bulk-delete') or route == 'archive-restore'
+
+
+class ReplayContext:
+    """
+    Seeded users standing in for the users of a trace.
+
+    Every pseudonym is assigned a seeded user, round-robin in the order of
+    first appearance; staff requests share one staff user. Recorded IDs are
+    replaced by objects of the assigned user: existing ones for reads and
+    updates, freshly created ones for requests that remove them, so the
+    seeded boards keep their size. All choices come from one seeded random
+    generator, so replays of a trace send the same requests.
+
+    Args:
+        users: Seeded users
+        tokens: Token keys of the seeded users by user ID
+        random_seed: Seed for the random number generator
+    """
+
+    def __init__(self, users, tokens, random_seed=42):
+        self.rng = random.Random(random_seed)
+        self.users = users
+        self.clients = {
+            user.id: Client(HTTP_AUTHORIZATION=f'Token {tokens[user.id]}', raise_request_exception=False)
+            for user in users
+        }
+        self.staff_user = User.objects.create_user('replay_staff', is_staff=True)
+        self.staff = Client(raise_request_exception=False)
+        self.staff.force_login(self.staff_user)
+        self.anonymous = Client(raise_request_exception=False)
+        self.assigned = {}
+        self.ids = {}
+
+    def user_for(self, pseudonym):
+        if pseudonym not in self.assigned:
+            self.assigned[pseudonym] = self.users[len(self.assigned) % len(self.users)]
+        return self.assigned[pseudonym]
+
+    def text(self, length):
+        return ''.join(self.rng.choices(string.ascii_lowercase, k=length))
+
+    def existing_id(self, model, user):
+        key = (model, user.id)
+        if key not in self.ids:
+            owned = model.objects.filter(pk=user.pk) if model is User else model.objects.filter(user=user)
+            self.ids[key] = list(owned.order_by('pk').values_list('pk', flat=True))
+        return self.rng.choice(self.ids[key]) if self.ids[key] else 0
+
+    def fresh_id(self, model, user):
+        if model is Contact:
+            return Contact.objects.create(user=user, name='Replay Contact', email='replay@example.com').pk
+        if model not in (Task, ArchivedTask):
+            return self.existing_id(model, user)
+        task = Task.objects.create(user=user, title='Replay task', due_date=date.today(),
+                                   category='done' if model is ArchivedTask else 'todo')
+        Subtask.objects.create(task=task, name='Replay step')
+        contact = Contact.objects.filter(user=user).first()
+        if contact:
+            task.assigned_to.add(contact)
+        if model is Task:
+            return task.pk
+        archive_batch([task.pk])
+        return ArchivedTask.objects.get(original_id=task.pk).pk
+
+    def object_id(self, model, user, consume):
+        return self.fresh_id(model, user) if consume else self.existing_id(model, user)
+
+    def path(self, route, user, consume, kwargs=None):
+        """
+        Builds the path of a route with recorded or guessed URL arguments.
+
+        Args:
+            route: URL name
+            user: User owning the referenced objects
+            consume: Whether the request removes the referenced object
+            kwargs: Sanitised URL arguments, or None if they were not recorded
+
+        Returns:
+            str: The path
+        """
+        if kwargs is not None:
+            return reverse(route, kwargs=self.synthesize(kwargs, route, user, consume))
+        try:
+            return reverse(route)
+        except NoReverseMatch:
+            return reverse(route, kwargs={'pk': self.object_id(ROUTE_MODELS[route.split('-')[0]], user, consume)})
+
+    def synthesize(self, value, route, user, consume, key=None):
+        """
+        Turns a sanitised value back into a concrete one.
+
+        Args:
+            value: Value as written by capture.sanitize()
+            route: URL name of the request
+            user: User owning the referenced objects
+            consume: Whether the request removes the referenced objects
+            key: Name of the field holding the value
+
+        Returns:
+            The concrete value
+        """
+        if isinstance(value, dict):
+            if 'method' in value and 'path' in value:
+                # A batch sub-request
+                route = value['path'][6:-1] if str(value['path']).startswith('<path:') else route
+                consume = consumes(value['method'], route)
+            return {name: self.synthesize(item, route, user, consume, name) for name, item in value.items()}
+        if isinstance(value, list):
+            return [self.synthesize(item, route, user, consume, key) for item in value]
+        match = MARKER.match(value) if isinstance(value, str) else None
+        if match is None:
+            return value
+        kind, argument = match.groups()
+        if kind == 'str':
+            return self.text(int(argument))
+        if kind == 'date':
+            return str(date.today() + timedelta(days=int(argument)))
+        if kind == 'email':
+            return f'{self.text(10)}@example.com'
+        if kind == 'path':
+            return self.path(argument, user, consume)
+        name = (key or '').lower()
+        prefix = next((prefix for prefix in ('contact', 'task') if name.startswith(prefix)), route.split('-')[0])
+        return self.object_id(ROUTE_MODELS.get(prefix, Task), user, consume)
+
+    def build(self, record):
+        """
+        Prepares the request of a trace record; runs outside of the timed section.
+
+        Args:
+            record: Trace record
+
+        Returns:
+            tuple: Client, method, path and keyword arguments for Client.generic
+        """
+        method, route = record['m'], record['r']
+        consume = consumes(method, route)
+        if record.get('st'):
+            client, user = self.staff, self.staff_user
+        elif 'u' in record:
+            user = self.user_for(record['u'])
+            client = self.clients[user.id]
+        else:
+            client, user = self.anonymous, self.rng.choice(self.users)
+
+        path = self.path(route, user, consume, record.get('k', {}))
+        if record.get('q'):
+            path += '?' + urlencode(self.synthesize(record['q'], route, user, consume))
+        body = record.get('b')
+        if route == 'login':
+            # Credentials are not recorded; log in as one of the seeded users
+            body = {'username': user.username, 'password': SEED_PASSWORD}
+        elif body is not None and body != '<large>':
+            body = self.synthesize(body, route, user, consume)
+        else:
+            body = None
+        kwargs = {}
+        if body is not None:
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'}
+        return client, method, path, kwargs
+
+
+def replay_trace(records, ctx, pace='fast', speed=1.0):
+    """
+    Sends the requests of a trace one after another and measures them.
+
+    With pace 'original' every request is sent at its recorded offset from
+    the first one, divided by speed, or right away if the replay is behind;
+    with 'fast' requests follow each other without pause. Preparing the
+    requests is not counted. Throttling and capturing are disabled.
+
+    Args:
+        records: Trace records ordered by start time
+        ctx: The replay context
+        pace: 'original' or 'fast'
+        speed: Speed-up of the original pacing
+
+    Returns:
+        dict: Requests, seconds and throughput of the replay, and per
+        "METHOD route" the throughput, latency statistics, status codes and
+        the recorded median latency
+    """
+    latencies, captured, statuses = defaultdict(list), defaultdict(list), defaultdict(Counter)
+    overrides = {
+        'THROTTLING': {**throttling_settings(), 'ENABLED': False},
+        'CAPTURE': {**capture_settings(), 'ENABLED': False},
+    }
+    preparing = 0.0
+    with override_settings(**overrides):
+        began = time.perf_counter()
+        for record in records:
+            start = time.perf_counter()
+            client, method, path, kwargs = ctx.build(record)
+            preparing += time.perf_counter() - start
+            if pace == 'original':
+                delay = (record['ts'] - records[0]['ts']) / speed - (time.perf_counter() - began)
+                if delay > 0:
+                    time.sleep(delay)
+            start = time.perf_counter()
+            response = client.generic(method, path, **kwargs)
+            # Streamed bodies are only produced while they are read
+            if getattr(response, 'streaming', False):
+                for _ in response.streaming_content:
+                    pass
+            key = f"{method} {record['r']}"
+            latencies[key].append((time.perf_counter() - start) * 1000)
+            statuses[key][str(response.status_code)] += 1
+            if 'd' in record:
+                captured[key].append(record['d'])
+        seconds = time.perf_counter() - began - preparing
+
+    routes = {}
+    for key, values in sorted(latencies.items()):
+        routes[key] = summarize(values)
+        routes[key].update({
+            'requests_per_second': round(len(values) / seconds, 2) if seconds else 0.0,
+            'statuses': dict(statuses[key]),
+            'captured_p50_ms': summarize(captured[key])['p50_ms'],
+        })
+    total = sum(len(values) for values in latencies.values())
+    return {
+        'requests': total,
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(total / seconds, 2) if seconds else 0.0,
+        'routes': routes,
+    }
+
+
+def compare_replays(current, baseline):
+    """
+    Compares the latencies of two replays of the same trace.
+
+    Args:
+        current: Report of replay_trace()
+        baseline: Earlier report of replay_trace()
+
+    Returns:
+        dict: Per route present in both, the p50 and p90 of both runs and
+        the relative change of the p50
+    """
+    comparison = {}
+    for key, result in current['routes'].items():
+        previous = baseline['routes'].get(key)
+        if previous is None:
+            continue
+        comparison[key] = {
+            'p50_ms': [previous['p50_ms'], result['p50_ms']],
+            'p90_ms': [previous['p90_ms'], result['p90_ms']],
+            'p50_change': round(result['p50_ms'] / previous['p50_ms'] - 1, 3) if previous['p50_ms'] else None,
+        }
+    comparison['requests_per_second'] = [baseline['requests_per_second'], current['requests_per_second']]
+    return comparison
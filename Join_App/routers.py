@@ -0,0 +1,150 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from Join_App.sharding import current_shard, sharding_settings
+
+REPLICATION_DEFAULTS = {
+    # Alias receiving all writes
+    'PRIMARY': 'default',
+    # Aliases serving reads of the replicated apps
+    'REPLICAS': [],
+    # Apps whose reads may be served by a replica
+    'APPS': ['Join_App'],
+    # Seconds a client reads from the primary after a write
+    'STICKY_SECONDS': 5,
+}
+
+# Whether reads of the current request may go to a replica; only the
+# replica middleware enables it, so commands and shells use the primary
+_replica_reads = ContextVar('replica_reads', default=False)
+# Set when the current request wrote to the database
+_wrote = ContextVar('wrote', default=None)
+
+
+def replication_settings():
+    """
+    Returns the replication settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**REPLICATION_DEFAULTS, **getattr(settings, 'REPLICATION', {})}
+
+
+def sticky_cache_key(request):
+    """
+    Returns the cache key marking a client as a recent writer.
+
+    Clients are identified by their credentials, so a user's requests
+    stick to the primary across workers sharing the cache.
+
+    Args:
+        request: The HTTP request
+
+    Returns:
+        str: Cache key, or None for requests without credentials
+    """
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'replica-sticky:' + hashlib.sha256(credentials.encode()).hexdigest()[:32]
+
+
+@contextmanager
+def request_routing(allow_replica):
+    """
+    Sets the routing of the reads of one request.
+
+    Args:
+        allow_replica: Whether reads may go to a replica until the first write
+
+    Yields:
+        list: Labels of the models written during the request
+    """
+    wrote = []
+    reads_token = _replica_reads.set(allow_replica)
+    wrote_token = _wrote.set(wrote)
+    try:
+        yield wrote
+    finally:
+        _replica_reads.reset(reads_token)
+        _wrote.reset(wrote_token)
+
+
+class ReadReplicaRouter:
+    """
+    Database router sending reads to replicas and writes to the primary.
+
+    Reads go to a random replica only while the replica middleware allows
+    it for the current request, i.e. for safe requests of clients that did
+    not write recently. A write switches the rest of the request to the
+    primary. Reads inside a transaction on the primary stay on it.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return None
+        config = replication_settings()
+        if not config['REPLICAS'] or model._meta.app_label not in config['APPS']:
+            return None
+        if connections[config['PRIMARY']].in_atomic_block:
+            return None
+        return random.choice(config['REPLICAS'])
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote.append(model._meta.label)
+        _replica_reads.set(False)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        config = replication_settings()
+        databases = {config['PRIMARY'], *config['REPLICAS']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication
+        if db in replication_settings()['REPLICAS']:
+            return False
+        return None
+
+
+class ShardRouter:
+    """
+    Database router storing each user's board data in one shard.
+
+    Queries of the sharded models go to the shard selected for the running
+    code, which views set up from the authenticated user. Queries through
+    an instance, e.g. task.subtasks, stay on the instance's database. Auth
+    tables and everything else remain on the default database.
+    """
+
+    def _db(self, model, hints):
+        models = sharding_settings()['MODELS']
+        if model._meta.label_lower not in models:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db and instance._meta.label_lower in models:
+            return instance._state.db
+        return current_shard()
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Board rows reference users on the default database without a constraint
+        shards = sharding_settings()['SHARDS']
+        if obj1._state.db in shards or obj2._state.db in shards:
+            return True
+        return None
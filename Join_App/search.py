@@ -0,0 +1,273 @@
+import re
+
+from django.db import connections, router
+
+from Join_App.models import Task, Subtask, Contact
+
+SEARCH_TABLE = 'join_app_search'
+
+# The rowid of an indexed row encodes its owner, the object id and the kind
+# of object. All rows of one user therefore form a contiguous rowid range,
+# which FTS5 can seek to directly instead of intersecting term lists over
+# the whole table, and triggers can address an entry without a lookup.
+KIND_TASK = 1
+KIND_SUBTASK = 2
+KIND_CONTACT = 3
+USER_SHIFT = 2 ** 34
+
+TASK_TABLE = Task._meta.db_table
+SUBTASK_TABLE = Subtask._meta.db_table
+CONTACT_TABLE = Contact._meta.db_table
+
+CREATE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        kind UNINDEXED,
+        object_id UNINDEXED,
+        task_id UNINDEXED,
+        title,
+        body,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4 5 6'
+    )
+"""
+
+
+def _rowid(user, object_id, kind):
+    return f"({user}) * {USER_SHIFT} + {object_id} * 4 + {kind}"
+
+
+_SUBTASK_OWNER = "(SELECT user_id FROM {table} WHERE id = {ref}.task_id)".format
+_COLUMNS = 'rowid, kind, object_id, task_id, title, body'
+_TASK_ROW = (
+    f"{_rowid('new.user_id', 'new.id', KIND_TASK)}, {KIND_TASK}, new.id, new.id, "
+    f"new.title, new.description"
+)
+_SUBTASK_ROW = (
+    f"{_rowid(_SUBTASK_OWNER(table=TASK_TABLE, ref='new'), 'new.id', KIND_SUBTASK)}, "
+    f"{KIND_SUBTASK}, new.id, new.task_id, new.name, ''"
+)
+_CONTACT_ROW = (
+    f"{_rowid('new.user_id', 'new.id', KIND_CONTACT)}, {KIND_CONTACT}, new.id, NULL, "
+    f"new.name, new.email"
+)
+_USER_RANGE = f"rowid BETWEEN old.user_id * {USER_SHIFT} AND (old.user_id + 1) * {USER_SHIFT} - 1"
+
+
+def _triggers(name, table, row, delete_old, watched):
+    """
+    Builds the insert, update and delete triggers for one source table.
+
+    Args:
+        name: Short name used in the trigger names
+        table: Source table the triggers are attached to
+        row: SQL expression list producing the indexed row from `new`
+        delete_old: SQL condition selecting the index entries of `old`
+        watched: Columns whose update requires re-indexing
+
+    Returns:
+        list: CREATE TRIGGER statements
+    """
+    delete = f"DELETE FROM {SEARCH_TABLE} WHERE {delete_old};"
+    insert = f"INSERT INTO {SEARCH_TABLE}({_COLUMNS}) VALUES ({row});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{name}_ai AFTER INSERT ON {table} "
+        f"BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{name}_au AFTER UPDATE OF {watched} ON {table} "
+        f"BEGIN {delete} {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{name}_ad AFTER DELETE ON {table} "
+        f"BEGIN {delete} END",
+    ]
+
+
+# Deleting a task also drops the entries of its subtasks, which is needed
+# when the subtasks are removed after their task (e.g. by a cascade).
+TRIGGER_SQL = (
+    _triggers('task', TASK_TABLE, _TASK_ROW,
+              f"rowid = {_rowid('old.user_id', 'old.id', KIND_TASK)}", 'title, description')
+    + [f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_task_ad_subtasks AFTER DELETE ON {TASK_TABLE} "
+       f"BEGIN DELETE FROM {SEARCH_TABLE} WHERE {_USER_RANGE} AND task_id = old.id; END"]
+    + _triggers('subtask', SUBTASK_TABLE, _SUBTASK_ROW,
+                f"rowid = {_rowid(_SUBTASK_OWNER(table=TASK_TABLE, ref='old'), 'old.id', KIND_SUBTASK)}",
+                'name, task_id')
+    + _triggers('contact', CONTACT_TABLE, _CONTACT_ROW,
+                f"rowid = {_rowid('old.user_id', 'old.id', KIND_CONTACT)}", 'name, email')
+)
+
+POPULATE_SQL = [
+    f"INSERT INTO {SEARCH_TABLE}({_COLUMNS}) "
+    f"SELECT {_rowid('user_id', 'id', KIND_TASK)}, {KIND_TASK}, id, id, title, description "
+    f"FROM {TASK_TABLE}",
+    f"INSERT INTO {SEARCH_TABLE}({_COLUMNS}) "
+    f"SELECT {_rowid('t.user_id', 's.id', KIND_SUBTASK)}, {KIND_SUBTASK}, s.id, s.task_id, s.name, '' "
+    f"FROM {SUBTASK_TABLE} s JOIN {TASK_TABLE} t ON t.id = s.task_id",
+    f"INSERT INTO {SEARCH_TABLE}({_COLUMNS}) "
+    f"SELECT {_rowid('user_id', 'id', KIND_CONTACT)}, {KIND_CONTACT}, id, NULL, name, email "
+    f"FROM {CONTACT_TABLE}",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{name}"
+    for name in ('task_ai', 'task_au', 'task_ad', 'task_ad_subtasks',
+                 'subtask_ai', 'subtask_au', 'subtask_ad',
+                 'contact_ai', 'contact_au', 'contact_ad')
+] + [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+# bm25() needs document frequencies over the whole table, which makes it
+# scale with the total index size instead of the user's share of it. Matches
+# are therefore only collected from the user's rowid range here and ranked
+# in Python (see rank_rows). Only the MAX_CANDIDATES newest matches are
+# ranked, which bounds the work for broad queries on large boards; a better
+# match outside them is not returned until the query gets more specific.
+SEARCH_SQL = f"""
+    SELECT kind, object_id, task_id, title, body
+    FROM {SEARCH_TABLE}
+    WHERE {SEARCH_TABLE} MATCH %s AND rowid BETWEEN %s AND %s
+    ORDER BY rowid DESC
+    LIMIT %s
+"""
+
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+MAX_CANDIDATES = 200
+TITLE_WEIGHT = 10
+
+
+def create_search_index(connection):
+    """
+    Creates the FTS5 table and the triggers keeping it in sync.
+
+    Args:
+        connection: Database connection (only SQLite is supported)
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        for statement in TRIGGER_SQL:
+            cursor.execute(statement)
+
+
+def drop_search_index(connection):
+    """
+    Drops the FTS5 table together with its triggers.
+
+    Args:
+        connection: Database connection (only SQLite is supported)
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(connection):
+    """
+    Recreates the search index from scratch and fills it from the source tables.
+
+    Args:
+        connection: Database connection (only SQLite is supported)
+    """
+    drop_search_index(connection)
+    create_search_index(connection)
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in POPULATE_SQL:
+            cursor.execute(statement)
+
+
+def build_match_query(text):
+    """
+    Turns free user input into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so FTS5 operators typed by the
+    user are treated as plain text.
+
+    Args:
+        text: Raw search input
+
+    Returns:
+        str: MATCH expression, or None if the input contains no words
+    """
+    terms = TERM_PATTERN.findall(text)[:MAX_TERMS]
+    if not terms:
+        return None
+    words = ' AND '.join(f'"{term}"*' for term in terms)
+    return f'{{title body}} : ({words})'
+
+
+def rank_rows(rows, text):
+    """
+    Orders search candidates by relevance.
+
+    Each search word found at the start of a word in the title scores
+    TITLE_WEIGHT points, one found in the description/email scores one.
+    Ties are broken by recency.
+
+    Args:
+        rows: Candidate rows as returned by SEARCH_SQL, newest first
+        text: Raw search input
+
+    Returns:
+        list: The rows, best match first
+    """
+    patterns = [
+        re.compile(r'\b' + re.escape(term), re.IGNORECASE)
+        for term in TERM_PATTERN.findall(text)[:MAX_TERMS]
+    ]
+
+    def score(row):
+        title, body = row[3] or '', row[4] or ''
+        points = 0
+        for pattern in patterns:
+            if pattern.search(title):
+                points += TITLE_WEIGHT
+            if pattern.search(body):
+                points += 1
+        return points
+
+    return sorted(rows, key=score, reverse=True)
+
+
+def search(user, text, limit=20, using=None):
+    """
+    Searches tasks, subtasks and contacts of a user, ordered by relevance.
+
+    Only the MAX_CANDIDATES newest matches are ranked (see SEARCH_SQL).
+
+    Args:
+        user: The user whose board is searched
+        text: Raw search input
+        limit: Maximum number of results
+        using: Database alias (default: the read database of tasks)
+
+    Returns:
+        list: Dicts describing the matching objects, best match first
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+    connection = connections[using or router.db_for_read(Task)]
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_SQL, [
+            match, user.id * USER_SHIFT, (user.id + 1) * USER_SHIFT - 1, MAX_CANDIDATES,
+        ])
+        rows = cursor.fetchall()
+
+    results = []
+    for kind, object_id, task_id, title, body in rank_rows(rows, text)[:limit]:
+        if kind == KIND_TASK:
+            results.append({'type': 'task', 'taskID': object_id, 'title': title})
+        elif kind == KIND_SUBTASK:
+            results.append({
+                'type': 'subtask', 'subTaskID': object_id,
+                'taskID': task_id, 'subTaskName': title,
+            })
+        else:
+            results.append({
+                'type': 'contact', 'contactID': object_id,
+                'name': title, 'email': body,
+            })
+    return results
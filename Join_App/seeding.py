@@ -0,0 +1,160 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from Join_App.models import Task, Subtask, Contact
+from Join_App.summary import rebuild_summaries
+from user_auth_app.models import ExpiringToken, UserProfile
+from user_auth_app.tokens import new_token
+
+SEED_PASSWORD = 'join-seed-password'
+
+FIRST_NAMES = [
+    'Anna', 'Ben', 'Clara', 'David', 'Emma', 'Felix', 'Greta', 'Hannah', 'Jonas',
+    'Lea', 'Lukas', 'Marie', 'Noah', 'Paul', 'Sophie', 'Tim', 'Zoe',
+]
+LAST_NAMES = [
+    'Bauer', 'Becker', 'Fischer', 'Hoffmann', 'Koch', 'Meyer', 'Müller', 'Richter',
+    'Schmidt', 'Schneider', 'Schulz', 'Wagner', 'Weber', 'Wolf',
+]
+COLORS = ['#ff7a00', '#ff5eb3', '#6e52ff', '#9327ff', '#00bee8', '#1fd7c1', '#ff745e', '#ffa35e']
+VERBS = ['Design', 'Implement', 'Review', 'Test', 'Deploy', 'Document', 'Refactor', 'Plan']
+OBJECTS = [
+    'login page', 'board layout', 'contact form', 'API client', 'drag and drop',
+    'summary view', 'release notes', 'database backup', 'sprint goals', 'user survey',
+]
+WORDS = (
+    'the a to for with and update check frontend backend customer meeting budget '
+    'deadline feedback draft final version issue bug feature team review'
+).split()
+
+# Weights roughly matching the boards we see in production
+CATEGORY_WEIGHTS = {'todo': 35, 'inprogress': 20, 'awaitfeedback': 15, 'done': 30}
+PRIORITY_WEIGHTS = {'low': 30, 'medium': 50, 'urgent': 20}
+
+
+def _vary(rng, mean):
+    """
+    Draws a count around a mean, so boards differ in size.
+
+    Args:
+        rng: Random number generator
+        mean: Average count
+
+    Returns:
+        int: A count between half and one and a half times the mean
+    """
+    if mean <= 0:
+        return 0
+    return rng.randint(mean // 2, mean + mean // 2)
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed(users=10, tasks=100, subtasks=3, contacts=20, random_seed=42,
+         batch_size=1000, prefix='seed'):
+    """
+    Fills the database with generated users and boards using bulk inserts.
+
+    The same arguments always produce the same data (due dates are relative
+    to the current day), so benchmark runs on fresh databases are comparable.
+    Task, subtask and contact counts vary around the given averages.
+
+    Args:
+        users: Number of users to create
+        tasks: Average number of tasks per user
+        subtasks: Average number of subtasks per task
+        contacts: Average number of contacts per user
+        random_seed: Seed for the random number generator
+        batch_size: Rows per INSERT statement
+        prefix: Prefix for the generated usernames
+
+    Returns:
+        dict: Number of created rows per model, plus the created users
+        and their token keys
+    """
+    rng = random.Random(random_seed)
+    password = make_password(SEED_PASSWORD)
+    today = date.today()
+    now = timezone.now()
+
+    user_objs = User.objects.bulk_create([
+        User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com', password=password)
+        for i in range(users)
+    ], batch_size=batch_size)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user=user) for user in user_objs], batch_size=batch_size
+    )
+    tokens = ExpiringToken.objects.bulk_create([
+        new_token(user, now, key='%040x' % rng.getrandbits(160)) for user in user_objs
+    ], batch_size=batch_size)
+
+    contact_objs = []
+    for user in user_objs:
+        for _ in range(_vary(rng, contacts)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            contact = Contact(
+                user=user,
+                name=f'{first} {last}',
+                email=f'{first}.{last}{rng.randint(1, 999)}@example.com'.lower(),
+                phone=f'+49 {rng.randint(100, 999)} {rng.randint(100000, 999999)}',
+                color=rng.choice(COLORS),
+            )
+            # bulk_create skips Contact.save(), which stores the avatar fields
+            contact.update_avatar()
+            contact_objs.append(contact)
+    contact_objs = Contact.objects.bulk_create(contact_objs, batch_size=batch_size)
+    contacts_by_user = {}
+    for contact in contact_objs:
+        contacts_by_user.setdefault(contact.user_id, []).append(contact.id)
+
+    categories, category_weights = zip(*CATEGORY_WEIGHTS.items())
+    priorities, priority_weights = zip(*PRIORITY_WEIGHTS.items())
+    task_objs = []
+    for user in user_objs:
+        for _ in range(_vary(rng, tasks)):
+            category = rng.choices(categories, category_weights)[0]
+            # bulk_create skips Task.save(), which tracks the completion time
+            completed_at = now - timedelta(days=rng.randint(0, 90)) if category == 'done' else None
+            task_objs.append(Task(
+                user=user,
+                title=f'{rng.choice(VERBS)} {rng.choice(OBJECTS)}',
+                description=_sentence(rng, rng.randint(0, 20)),
+                due_date=today + timedelta(days=rng.randint(-60, 90)),
+                priority=rng.choices(priorities, priority_weights)[0],
+                category=category,
+                current_progress=rng.randint(0, 100),
+                completed_at=completed_at,
+            ))
+    task_objs = Task.objects.bulk_create(task_objs, batch_size=batch_size)
+
+    subtask_objs = []
+    assignments = []
+    Assignment = Task.assigned_to.through
+    for task in task_objs:
+        for _ in range(_vary(rng, subtasks)):
+            subtask_objs.append(Subtask(task=task, name=_sentence(rng, 3), done=rng.random() < 0.4))
+        candidates = contacts_by_user.get(task.user_id, [])
+        for contact_id in rng.sample(candidates, min(len(candidates), rng.randint(0, 3))):
+            assignments.append(Assignment(task_id=task.id, contact_id=contact_id))
+    Subtask.objects.bulk_create(subtask_objs, batch_size=batch_size)
+    Assignment.objects.bulk_create(assignments, batch_size=batch_size)
+    # bulk_create skips the summary updates of Task.save()
+    rebuild_summaries([user.id for user in user_objs])
+
+    return {
+        'users': user_objs,
+        'tokens': {token.user_id: token.key for token in tokens},
+        'counts': {
+            'users': len(user_objs),
+            'contacts': len(contact_objs),
+            'tasks': len(task_objs),
+            'subtasks': len(subtask_objs),
+            'assignments': len(assignments),
+        },
+    }
@@ -0,0 +1,361 @@
+import threading
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+
+SHARDING_DEFAULTS = {
+    # Aliases holding the board data; empty disables sharding
+    'SHARDS': [],
+    # Models stored in the shards, as app_label.model_name
+    'MODELS': ['Join_App.contact', 'Join_App.task', 'Join_App.subtask', 'Join_App.task_assigned_to',
+               'Join_App.archivedtask', 'Join_App.archivedsubtask', 'Join_App.archivedtask_assigned_to',
+               'Join_App.taskreminder', 'Join_App.userboardsummary'],
+    # IDs a process reserves at once per model from the central sequence
+    'ID_BLOCK_SIZE': 100,
+}
+
+# Shard of the user whose board data the current code works on
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def sharding_settings():
+    """
+    Returns the sharding settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**SHARDING_DEFAULTS, **getattr(settings, 'SHARDING', {})}
+
+
+def hashed_shard(user_id, shards):
+    """
+    Returns the shard a user ID hashes to.
+
+    crc32 is stable across processes and Python versions, unlike hash().
+
+    Args:
+        user_id: Primary key of the user
+        shards: Shard aliases
+
+    Returns:
+        str: Shard alias
+    """
+    return shards[zlib.crc32(str(user_id).encode()) % len(shards)]
+
+
+def shard_for_user(user_id):
+    """
+    Looks up the shard holding a user's board data.
+
+    Args:
+        user_id: Primary key of the user
+
+    Returns:
+        tuple: (alias, moving) with moving True while the rows are being
+        moved, or (None, False) if sharding is disabled
+    """
+    from Join_App.models import UserShard
+
+    shards = sharding_settings()['SHARDS']
+    if not shards:
+        return None, False
+    pinned = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).values_list('shard', 'moving').first()
+    if pinned:
+        return pinned
+    return hashed_shard(user_id, shards), False
+
+
+def is_moving(user_id):
+    """
+    Tells whether a user's board data is being moved right now.
+
+    Reads the pin itself, not a cached lookup, so writes can check it
+    inside their transaction.
+
+    Args:
+        user_id: Primary key of the user
+
+    Returns:
+        bool: True while the rows are being copied
+    """
+    from Join_App.models import UserShard
+
+    return UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id, moving=True).exists()
+
+
+def reserve_ids(model, count):
+    """
+    Reserves a range of IDs for a sharded model in the central sequence.
+
+    The sequence lives on the default database, so IDs are unique across
+    all shards and rows keep them when they are moved. It starts after
+    the highest ID found in any shard.
+
+    Args:
+        model: Model class
+        count: Number of IDs
+
+    Returns:
+        tuple: (first, end) of the reserved IDs, end excluded
+    """
+    from Join_App.models import ShardSequence
+
+    label = model._meta.label_lower
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        sequence = ShardSequence.objects.using(DEFAULT_DB_ALIAS).filter(model=label).first()
+        if sequence is None:
+            highest = [model._base_manager.using(alias).aggregate(highest=Max('pk'))['highest'] or 0
+                       for alias in [DEFAULT_DB_ALIAS, *sharding_settings()['SHARDS']]]
+            sequence = ShardSequence(model=label, next_id=max(highest) + 1)
+        first = sequence.next_id
+        sequence.next_id += count
+        sequence.save(using=DEFAULT_DB_ALIAS)
+    return first, first + count
+
+
+class IdPool:
+    """
+    Hands out IDs from blocks reserved in the central sequence.
+
+    One block per model and process, so most inserts need no query on
+    the default database. IDs are unique but only ordered within a process.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def take(self, model, count):
+        """
+        Returns unused IDs for a model.
+
+        Args:
+            model: Model class
+            count: Number of IDs
+
+        Returns:
+            list: The IDs
+        """
+        label = model._meta.label_lower
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                first, end = self._blocks.get(label, (0, 0))
+                if first == end:
+                    first, end = reserve_ids(model, max(sharding_settings()['ID_BLOCK_SIZE'], count - len(ids)))
+                taken = min(end - first, count - len(ids))
+                ids.extend(range(first, first + taken))
+                self._blocks[label] = (first + taken, end)
+        return ids
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+_ids = IdPool()
+
+
+def assign_ids(model, objs):
+    """
+    Gives new rows of a sharded model IDs from the central sequence.
+
+    Does nothing without sharding, where the database assigns the IDs.
+
+    Args:
+        model: Model class
+        objs: Instances; those with an ID keep it
+
+    Returns:
+        bool: True if IDs were assigned
+    """
+    if not sharding_settings()['SHARDS']:
+        return False
+    new = [obj for obj in objs if obj.pk is None]
+    for obj, pk in zip(new, _ids.take(model, len(new)) if new else []):
+        obj.pk = pk
+    return bool(new)
+
+
+def current_shard():
+    """
+    Returns the shard selected for the running code, if any.
+
+    Returns:
+        str: Shard alias or None
+    """
+    return _current_shard.get()
+
+
+def select_shard(alias):
+    """
+    Routes the board data queries of the rest of the current context to a shard.
+
+    Callers restore the previous selection by running inside use_shard().
+
+    Args:
+        alias: Shard alias, or None to use the default routing
+    """
+    _current_shard.set(alias)
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Routes the board data queries inside the block to a shard.
+
+    Args:
+        alias: Shard alias, or None to use the default routing
+
+    Yields:
+        str: The alias
+    """
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+@contextmanager
+def use_user_shard(user_id):
+    """
+    Routes the board data queries inside the block to a user's shard.
+
+    Args:
+        user_id: Primary key of the user
+
+    Yields:
+        str: The shard alias, or None if sharding is disabled
+    """
+    alias, _ = shard_for_user(user_id)
+    with use_shard(alias):
+        yield alias
+
+
+def _copy_rows(model, rows, target, batch_size):
+    # IDs come from the central sequence, so they are free in the target
+    model.objects.using(target).bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def copy_user_rows(user_id, source, target, batch_size=500):
+    """
+    Copies a user's board data from one database to another.
+
+    Runs in one transaction on the target, after removing rows left there
+    by an interrupted move. Contacts, tasks, subtasks and archived tasks
+    keep their IDs, so clients can go on using them. Rows created before
+    the central ID sequence may collide with rows of the target; the copy
+    then fails with an IntegrityError and nothing is moved.
+
+    Args:
+        user_id: Primary key of the user
+        source: Alias to copy from
+        target: Alias to copy to
+        batch_size: Rows per INSERT statement
+
+    Returns:
+        dict: Number of copied rows per model
+    """
+    from Join_App.models import ArchivedSubtask, ArchivedTask, Contact, Subtask, Task, TaskReminder
+    from Join_App.summary import rebuild_summary
+
+    Assignment = Task.assigned_to.through
+    ArchivedAssignment = ArchivedTask.assigned_to.through
+    with transaction.atomic(using=target):
+        delete_user_rows(user_id, target)
+        contacts = _copy_rows(Contact, list(Contact.objects.using(source).filter(user_id=user_id)),
+                              target, batch_size)
+        tasks = _copy_rows(Task, list(Task.objects.using(source).filter(user_id=user_id)),
+                           target, batch_size)
+        subtasks = _copy_rows(Subtask, list(Subtask.objects.using(source).filter(task__user_id=user_id)),
+                              target, batch_size)
+        # Assignments and reminders are never addressed by ID and get new ones
+        assignments = [
+            Assignment(task_id=task_id, contact_id=contact_id)
+            for task_id, contact_id in Assignment.objects.using(source)
+            .filter(task__user_id=user_id).values_list('task_id', 'contact_id')
+        ]
+        Assignment.objects.using(target).bulk_create(assignments, batch_size=batch_size)
+        # Sent reminders move along, so they are not sent again from the target
+        TaskReminder.objects.using(target).bulk_create([
+            TaskReminder(task_id=task_id, due_date=due_date, sent_at=sent_at)
+            for task_id, due_date, sent_at in TaskReminder.objects.using(source)
+            .filter(task__user_id=user_id).values_list('task_id', 'due_date', 'sent_at')
+        ], batch_size=batch_size)
+
+        archived = _copy_rows(ArchivedTask, list(ArchivedTask.objects.using(source).filter(user_id=user_id)),
+                              target, batch_size)
+        _copy_rows(ArchivedSubtask, list(ArchivedSubtask.objects.using(source).filter(task__user_id=user_id)),
+                   target, batch_size)
+        ArchivedAssignment.objects.using(target).bulk_create([
+            ArchivedAssignment(archivedtask_id=task_id, contact_id=contact_id)
+            for task_id, contact_id in ArchivedAssignment.objects.using(source)
+            .filter(archivedtask__user_id=user_id).values_list('archivedtask_id', 'contact_id')
+        ], batch_size=batch_size)
+        rebuild_summary(user_id, using=target)
+    return {'contacts': contacts, 'tasks': tasks, 'subtasks': subtasks,
+            'assignments': len(assignments), 'archived_tasks': archived}
+
+
+def delete_user_rows(user_id, alias):
+    """
+    Deletes a user's board data from one database.
+
+    Args:
+        user_id: Primary key of the user
+        alias: Database alias
+    """
+    from Join_App.models import ArchivedTask, Contact, Task, UserBoardSummary
+
+    ArchivedTask.objects.using(alias).filter(user_id=user_id).delete()
+    Task.objects.using(alias).filter(user_id=user_id).delete()
+    Contact.objects.using(alias).filter(user_id=user_id).delete()
+    UserBoardSummary.objects.using(alias).filter(user_id=user_id).delete()
+
+
+def move_user(user_id, target):
+    """
+    Moves a user's board data to another shard while the board stays readable.
+
+    The user is marked as moving first. Writes check the mark inside their
+    transaction on the shard (see ShardRoutingMixin), which holds the
+    shard's write lock from its start, so once this function has taken the
+    lock itself no write of the user can still be running or start. The
+    rows are then copied, the user is pinned to the target and the
+    originals are deleted. Reads are served by the source until the pin
+    changes.
+
+    Args:
+        user_id: Primary key of the user
+        target: Alias of the destination shard
+
+    Returns:
+        dict: Number of moved rows per model, empty if the user already
+        lives in the target
+    """
+    from Join_App.models import UserShard
+
+    source, _ = shard_for_user(user_id)
+    if source == target:
+        return {}
+    pins = UserShard.objects.using(DEFAULT_DB_ALIAS)
+    pins.update_or_create(user_id=user_id, defaults={'shard': source, 'moving': True})
+    try:
+        # BEGIN IMMEDIATE waits for the writes that passed the check before the mark was set
+        with transaction.atomic(using=source):
+            pass
+        counts = copy_user_rows(user_id, source, target)
+    except BaseException:
+        pins.filter(user_id=user_id).update(moving=False)
+        raise
+    pins.filter(user_id=user_id).update(shard=target, moving=False)
+    delete_user_rows(user_id, source)
+    return counts
+
@@ -0,0 +1,42 @@
+from django.db.backends.signals import connection_created
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from Join_App.database import configure_sqlite
+from Join_App.models import RequestProfile
+from Join_App.sharding import delete_user_rows, shard_for_user
+
+connection_created.connect(configure_sqlite, dispatch_uid='Join_App.configure_sqlite')
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_file(sender, instance, **kwargs):
+    """
+    Signal handler to remove the file of a RequestProfile when it is deleted.
+    
+    Connected to post_delete, so it also runs for queryset deletes such as
+    the admin's bulk delete action and the profile limit enforcement.
+    
+    Args:
+        sender: The model class that sent the signal (RequestProfile)
+        instance: The deleted RequestProfile instance
+        **kwargs: Additional keyword arguments from the signal
+    """
+    instance.file_path.unlink(missing_ok=True)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_board_data(sender, instance, **kwargs):
+    """
+    Signal handler to remove a user's board data from their shard.
+
+    Deleting a user only cascades on the default database, so the rows in
+    the user's shard are deleted here when sharding is enabled.
+
+    Args:
+        sender: The model class that sent the signal (User)
+        instance: The User instance being deleted
+        **kwargs: Additional keyword arguments from the signal
+    """
+    alias, _ = shard_for_user(instance.pk)
+    if alias is not None:
+        delete_user_rows(instance.pk, alias)
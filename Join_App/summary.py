@@ -0,0 +1,233 @@
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from Join_App.database import run_in_transaction
+from Join_App.models import UNKNOWN_STATE, Task, UserBoardSummary
+
+CATEGORIES = [key for key, _ in Task.CATEGORY_CHOICES]
+# Fields of UserBoardSummary derived from the tasks
+SUMMARY_FIELDS = [*CATEGORIES, 'urgent', 'overdue', 'next_deadline']
+# Users per aggregate query and verifier batch, keeping the IN lists within SQLite's limits
+BATCH_SIZE = 500
+
+
+def compute_summaries(user_ids, as_of, using=DEFAULT_DB_ALIAS):
+    """
+    Computes the summary figures of users from their tasks.
+
+    One GROUP BY over the users' tasks, counting all figures at once.
+
+    Args:
+        user_ids: Primary keys of the users
+        as_of: Day separating overdue tasks from upcoming ones
+        using: Database alias
+
+    Returns:
+        dict: Figures by user ID, zero for users without tasks
+    """
+    open_tasks = ~Q(category='done')
+    rows = (Task.objects.using(using).filter(user_id__in=user_ids)
+            .values('user_id').order_by()
+            .annotate(**{key: Count('id', filter=Q(category=key)) for key in CATEGORIES},
+                      urgent=Count('id', filter=open_tasks & Q(priority='urgent')),
+                      overdue=Count('id', filter=open_tasks & Q(due_date__lt=as_of)),
+                      next_deadline=Min('due_date', filter=open_tasks & Q(due_date__gte=as_of))))
+    figures = {user_id: {**{field: 0 for field in SUMMARY_FIELDS}, 'next_deadline': None} for user_id in user_ids}
+    for row in rows:
+        figures[row.pop('user_id')] = row
+    return figures
+
+
+def rebuild_summaries(user_ids, as_of=None, using=DEFAULT_DB_ALIAS):
+    """
+    Recomputes and stores the summaries of users from scratch.
+
+    Writes with one upsert per batch of users; call in a transaction to
+    keep the rows consistent with concurrent task writes.
+
+    Args:
+        user_ids: Primary keys of the users
+        as_of: Day of the figures (default: today)
+        using: Database alias
+
+    Returns:
+        list: The stored UserBoardSummary objects
+    """
+    as_of = as_of or timezone.localdate()
+    user_ids = list(user_ids)
+    summaries = []
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        figures = compute_summaries(user_ids[start:start + BATCH_SIZE], as_of, using)
+        batch = [UserBoardSummary(user_id=user_id, as_of=as_of, **values) for user_id, values in figures.items()]
+        UserBoardSummary.objects.using(using).bulk_create(
+            batch, update_conflicts=True, unique_fields=['user'], update_fields=[*SUMMARY_FIELDS, 'as_of'],
+        )
+        summaries.extend(batch)
+    return summaries
+
+
+def rebuild_summary(user_id, as_of=None, using=DEFAULT_DB_ALIAS):
+    """
+    Recomputes and stores the summary of one user.
+
+    Args:
+        user_id: Primary key of the user
+        as_of: Day of the figures (default: today)
+        using: Database alias
+
+    Returns:
+        UserBoardSummary: The stored summary
+    """
+    return rebuild_summaries([user_id], as_of, using)[0]
+
+
+def next_deadline(user_id, as_of, using=DEFAULT_DB_ALIAS):
+    """
+    Looks up the earliest due date of a user's open tasks on or after a day.
+
+    Args:
+        user_id: Primary key of the user
+        as_of: First day to consider
+        using: Database alias
+
+    Returns:
+        date: The due date, or None
+    """
+    return (Task.objects.using(using).filter(user_id=user_id, due_date__gte=as_of)
+            .exclude(category='done').order_by('due_date').values_list('due_date', flat=True).first())
+
+
+def record_changes(user_id, changes, using=DEFAULT_DB_ALIAS):
+    """
+    Applies task writes to a user's summary.
+
+    Called after the writes, in their transaction. Counts are adjusted
+    by the difference of the old and new states, relative to the as_of
+    of the stored row. Only losing the task holding the next deadline
+    needs a query over the tasks. A missing row or an unknown old state
+    rebuilds the summary from scratch.
+
+    Args:
+        user_id: Primary key of the user owning the tasks
+        changes: (old, new) pairs of Task.summary_state() values, None
+            for created or deleted tasks, or UNKNOWN_STATE
+        using: Database alias of the writes
+    """
+    changes = [(old, new) for old, new in changes if old != new]
+    if not changes:
+        return
+    with transaction.atomic(using=using, savepoint=False):
+        summary = UserBoardSummary.objects.using(using).select_for_update().filter(user_id=user_id).first()
+        if summary is None or any(UNKNOWN_STATE in change for change in changes):
+            rebuild_summary(user_id, summary.as_of if summary else None, using)
+            return
+        deadline_lost = False
+        for old, _ in changes:
+            if old is not None:
+                category, priority, due_date = old
+                setattr(summary, category, getattr(summary, category) - 1)
+                if category != 'done':
+                    summary.urgent -= priority == 'urgent'
+                    summary.overdue -= due_date < summary.as_of
+                    deadline_lost |= due_date == summary.next_deadline
+        if deadline_lost:
+            # The writes are done, so the lookup sees the added tasks as well
+            summary.next_deadline = next_deadline(user_id, summary.as_of, using)
+        for _, new in changes:
+            if new is not None:
+                category, priority, due_date = new
+                setattr(summary, category, getattr(summary, category) + 1)
+                if category != 'done':
+                    summary.urgent += priority == 'urgent'
+                    summary.overdue += due_date < summary.as_of
+                    if due_date >= summary.as_of and not deadline_lost:
+                        summary.next_deadline = min(filter(None, [summary.next_deadline, due_date]))
+        summary.save(using=using, update_fields=SUMMARY_FIELDS)
+
+
+def record_removals(states, using=DEFAULT_DB_ALIAS):
+    """
+    Applies deleted tasks to the summaries of their users.
+
+    Args:
+        states: (user_id, category, priority, due_date) of the deleted tasks
+        using: Database alias of the deletion
+    """
+    removals = defaultdict(list)
+    for user_id, *state in states:
+        removals[user_id].append((tuple(state), None))
+    for user_id, changes in removals.items():
+        record_changes(user_id, changes, using)
+
+
+def get_summary(user_id, today=None):
+    """
+    Returns the current summary of a user, normally with one primary key lookup.
+
+    A missing row, or one computed on an earlier day, is rebuilt first, as
+    overdue tasks and the next deadline change with the date.
+
+    Args:
+        user_id: Primary key of the user
+        today: Current day (default: today)
+
+    Returns:
+        UserBoardSummary: The summary
+    """
+    today = today or timezone.localdate()
+    summary = UserBoardSummary.objects.filter(user_id=user_id).first()
+    if summary is None or summary.as_of != today:
+        using = router.db_for_write(UserBoardSummary)
+        summary = run_in_transaction(rebuild_summary, user_id, today, using, using=using)
+    return summary
+
+
+def verify_summaries(using=DEFAULT_DB_ALIAS, fix=False, batch_size=BATCH_SIZE):
+    """
+    Recomputes the stored summaries from scratch and reports those that drifted.
+
+    Summaries are checked in batches of users, each in its own
+    transaction, against figures computed for their own as_of.
+
+    Args:
+        using: Database alias
+        fix: Overwrite drifted summaries with the recomputed figures
+        batch_size: Summaries per batch
+
+    Returns:
+        dict: Per drifted user ID, (stored, recomputed) by drifted field
+    """
+    drift = {}
+    after = 0
+    while True:
+        after, found = run_in_transaction(_verify_batch, after, batch_size, fix, using, using=using)
+        if after is None:
+            return drift
+        drift.update(found)
+
+
+def _verify_batch(after, batch_size, fix, using):
+    summaries = list(UserBoardSummary.objects.using(using).filter(user_id__gt=after).order_by('user_id')[:batch_size])
+    if not summaries:
+        return None, {}
+    by_day = defaultdict(list)
+    for summary in summaries:
+        by_day[summary.as_of].append(summary)
+    drift, drifted = {}, []
+    for as_of, group in by_day.items():
+        figures = compute_summaries([summary.user_id for summary in group], as_of, using)
+        for summary in group:
+            actual = figures[summary.user_id]
+            fields = {field: (getattr(summary, field), actual[field]) for field in SUMMARY_FIELDS
+                      if getattr(summary, field) != actual[field]}
+            if fields:
+                drift[summary.user_id] = fields
+                for field, (_, value) in fields.items():
+                    setattr(summary, field, value)
+                drifted.append(summary)
+    if fix and drifted:
+        UserBoardSummary.objects.using(using).bulk_update(drifted, SUMMARY_FIELDS)
+    return summaries[-1].user_id, drift
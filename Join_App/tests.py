@@ -1,3 +1,1756 @@
-from django.test import TestCase
+import fcntl
+import json
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth.hashers import check_password
+from rest_framework.test import APIClient
+
+from Join_App.api.throttling import take_token
+from Join_App.database import copy_database, run_in_transaction
+from Join_App.metrics import MetricsRegistry, render_prometheus
+from Join_App.middleware import QueryStats
+from Join_App.archiving import archive_batch, archive_tasks
+from Join_App.benchmarking import BenchmarkContext, compare, run_benchmark, uncovered_routes
+from Join_App.avatars import TEMPLATE_VERSION, _avatars, avatar_hash
+from Join_App.capture import read_trace
+from Join_App.coalescing import SingleFlight, _flights, board_version
+from Join_App.provisioning import hash_passwords
+from Join_App.reminders import claim_batch, send_reminders
+from Join_App.replay import ReplayContext, replay_trace
+from Join_App.search import SEARCH_TABLE
+from Join_App.summary import SUMMARY_FIELDS, compute_summaries, get_summary
+from Join_App.models import (
+    ArchivedTask, Contact, IdempotencyRecord, Subtask, Task, RequestProfile, TaskReminder, UserBoardSummary,
+    UserShard, VersionConflict,
+)
+from Join_App.seeding import seed
+from Join_App.sharding import _ids, hashed_shard
+from user_auth_app.models import ExpiringToken, UserProfile
+from user_auth_app.tokens import issue_token, sweep_expired
+
+class SearchTests(TestCase):
+    """
+    Tests for the full-text search endpoint and its index.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        response = self.client.get('/search/', {'q': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def index_size(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+            return cursor.fetchone()[0]
+
+    def test_title_matches_rank_first(self):
+        task = Task.objects.create(user=self.user, title='Order', description='concrete for the base',
+                                   due_date='2030-01-01')
+        newer = Task.objects.create(user=self.user, title='Pour concrete', due_date='2030-01-01')
+        subtask = Subtask.objects.create(task=task, name='Concrete delivery')
+        Contact.objects.create(user=self.user, name='Carla', email='concrete@example.com')
+        results = self.search('concr')
+        self.assertEqual(len(results), 4)
+        self.assertCountEqual(results[:2], [
+            {'type': 'subtask', 'subTaskID': subtask.id, 'taskID': task.id, 'subTaskName': 'Concrete delivery'},
+            {'type': 'task', 'taskID': newer.id, 'title': 'Pour concrete'},
+        ])
+        self.assertEqual(len(self.search('concrete', limit=2)), 2)
+        self.assertEqual(self.search('concrete base'), [{'type': 'task', 'taskID': task.id, 'title': 'Order'}])
+
+    def test_operators_in_the_input_are_plain_text(self):
+        Task.objects.create(user=self.user, title='Pour concrete', due_date='2030-01-01')
+        self.assertEqual(len(self.search('concrete OR "NEAR(')), 0)
+        self.assertEqual(self.search('!?'), [])
+        self.assertEqual(self.client.get('/search/', {'q': 'a', 'limit': 'x'}).status_code, 400)
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        task = Task.objects.create(user=self.user, title='Pour concrete', due_date='2030-01-01')
+        Subtask.objects.create(task=task, name='Mix cement')
+        contact = Contact.objects.create(user=self.user, name='Carla', email='carla@example.com')
+        self.assertEqual(self.index_size(), 3)
+
+        task.title = 'Lay bricks'
+        task.save()
+        contact.name = 'Bricklayer Carla'
+        contact.save()
+        self.assertEqual(self.search('concrete'), [])
+        self.assertEqual({result['type'] for result in self.search('brick')}, {'task', 'contact'})
+        self.assertEqual(self.index_size(), 3)
+
+        contact.delete()
+        task.delete()
+        self.assertEqual(self.search('cement'), [])
+        self.assertEqual(self.index_size(), 0)
+
+    def test_results_are_scoped_to_the_user(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        Task.objects.create(user=other, title='Pour concrete', due_date='2030-01-01')
+        Contact.objects.create(user=other, name='Concrete Inc', email='sales@example.com')
+        self.assertEqual(self.search('concrete'), [])
+        Task.objects.create(user=self.user, title='Pour concrete', due_date='2030-01-01')
+        self.assertEqual(len(self.search('concrete')), 1)
+
+    def test_only_the_newest_candidates_are_ranked(self):
+        Task.objects.create(user=self.user, title='Concrete', due_date='2030-01-01')
+        for _ in range(2):
+            Task.objects.create(user=self.user, title='Order', description='concrete', due_date='2030-01-01')
+        with mock.patch('Join_App.search.MAX_CANDIDATES', 2):
+            self.assertEqual([result['title'] for result in self.search('concrete')], ['Order', 'Order'])
+        self.assertEqual(self.search('concrete')[0]['title'], 'Concrete')
+
+    def test_rebuild_command_restores_the_index(self):
+        task = Task.objects.create(user=self.user, title='Pour concrete', due_date='2030-01-01')
+        Subtask.objects.create(task=task, name='Mix cement')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        self.assertEqual(self.search('concrete'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('2 entries indexed', out.getvalue())
+        self.assertEqual(len(self.search('concrete')), 1)
+        # The triggers are back as well
+        Task.objects.create(user=self.user, title='Pour more concrete', due_date='2030-01-01')
+        self.assertEqual(len(self.search('concrete')), 2)
+
+    def test_benchmark_leaves_the_index_unchanged(self):
+        Task.objects.create(user=self.user, title='Pour concrete', due_date='2030-01-01')
+        out = StringIO()
+        call_command('benchmark_search', '--tasks', '2000', '--users', '10', '--queries', '16', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['results_per_query'], 20)
+        self.assertEqual(report['latency_ms']['samples'], 16)
+        self.assertEqual(self.index_size(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkTests(TestCase):
+    """
+    Tests for the seeded-data generator and the benchmark runner.
+    """
+
+    def board(self, user):
+        return (list(Task.objects.filter(user=user).order_by('id').values_list('title', 'due_date', 'category')),
+                list(Contact.objects.filter(user=user).order_by('id').values_list('name', 'avatar_hash')))
+
+    def test_seed_is_reproducible_and_consistent(self):
+        # The token keys are generated too, so the first run is rolled back
+        with transaction.atomic():
+            second = seed(users=2, tasks=10, subtasks=2, contacts=5)
+            board = self.board(second['users'][1])
+            transaction.set_rollback(True)
+        first = seed(users=2, tasks=10, subtasks=2, contacts=5)
+        self.assertEqual(first['counts'], second['counts'])
+        self.assertEqual(self.board(first['users'][1]), board)
+        self.assertNotEqual(self.board(first['users'][0]), self.board(first['users'][1]))
+        counts = first['counts']
+        self.assertEqual(Task.objects.count(), counts['tasks'])
+        self.assertFalse(Contact.objects.filter(avatar_hash='').exists())
+        # The bulk inserts fill the search index and the summaries like single saves do
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], counts['tasks'] + counts['subtasks'] + counts['contacts'])
+        user = first['users'][0]
+        summary = UserBoardSummary.objects.get(user=user)
+        figures = compute_summaries([user.id], summary.as_of)[user.id]
+        self.assertEqual({field: getattr(summary, field) for field in SUMMARY_FIELDS}, figures)
+        response = self.client.get('/tasks/', HTTP_AUTHORIZATION=f"Token {first['tokens'][user.id]}")
+        self.assertEqual(len(response.json()), Task.objects.filter(user=user).count())
+
+    def test_every_route_has_a_succeeding_scenario(self):
+        self.assertEqual(uncovered_routes(), [])
+        seeded = seed(users=2, tasks=10, subtasks=2, contacts=5, prefix='bench')
+        user = seeded['users'][0]
+        results = run_benchmark(BenchmarkContext(user, seeded['tokens'][user.id]),
+                                iterations=2, warmup=0, alloc_iterations=1)
+        failed = {key: result['status'] for key, result in results.items() if result['status'] >= 400}
+        self.assertEqual(failed, {})
+        self.assertEqual(set(results['GET task-list']), {'samples', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms',
+                                                          'status', 'queries', 'alloc_peak_kib'})
+
+    def test_compare_reports_query_growth_and_slowdowns(self):
+        baseline = {'GET task-list': {'queries': 3, 'p50_ms': 10.0, 'alloc_peak_kib': 100.0}}
+        within = {'GET task-list': {'queries': 3, 'p50_ms': 14.0, 'alloc_peak_kib': 100.5},
+                  'GET new-route': {'queries': 50, 'p50_ms': 99.0, 'alloc_peak_kib': 999.0}}
+        self.assertEqual(compare(within, baseline, tolerance=0.5), [])
+        worse = {'GET task-list': {'queries': 4, 'p50_ms': 16.0, 'alloc_peak_kib': 100.0}}
+        self.assertEqual(compare(worse, baseline, tolerance=0.5), [
+            'GET task-list: queries 3 -> 4', 'GET task-list: p50_ms 10.0 -> 16.0 (limit 15.0)',
+        ])
+
+
+class SQLInstrumentationTests(TestCase):
+    """
+    Tests for the per-request SQL instrumentation middleware.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=')
+
+    def test_repeated_statements_are_logged(self):
+        for i in range(12):
+            Task.objects.create(user=self.user, title=f'Task {i}', due_date='2030-01-01')
+        with self.assertLogs('Join_App.middleware', level='WARNING') as logs:
+            self.client.get('/tasks/')
+        self.assertIn('"duplicates"', logs.output[0])
+
+    @override_settings(SQL_INSTRUMENTATION={'ENDPOINT_THRESHOLDS': {'hello_world': 0}})
+    def test_endpoint_threshold(self):
+        with self.assertLogs('Join_App.middleware', level='WARNING') as logs:
+            self.client.get('/hello/')
+        self.assertIn('"endpoint": "hello_world"', logs.output[0])
+
+    def test_wrapper_counts_each_statement_once_without_queries_of_its_own(self):
+        stats = QueryStats()
+        with CaptureQueriesContext(connection) as captured, connection.execute_wrapper(stats):
+            with connection.cursor() as cursor:
+                for _ in range(10):
+                    cursor.execute('SELECT 1')
+                cursor.execute('SELECT 2')
+        self.assertEqual(stats.count, 11)
+        self.assertEqual(len(captured), stats.count)
+        self.assertEqual(stats.duplicates(), [('SELECT 1', 10)])
+
+
+class RequestProfilerTests(TestCase):
+    """
+    Tests for the opt-in request profiler.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        profiling = override_settings(PROFILING={'DIRECTORY': self.directory.name, 'MAX_PROFILES': 2})
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+        self.staff = User.objects.create_user('admin', 'admin@example.com', 'secret', is_staff=True)
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+
+    def test_staff_header_stores_profile(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/tasks/', HTTP_X_PROFILE_REQUEST='1')
+        profile = RequestProfile.objects.get(pk=response['X-Profile-ID'])
+        self.assertEqual(profile.path, '/tasks/')
+        self.assertTrue(profile.file_path.exists())
+
+    def test_header_ignored_for_regular_users(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('Join_App.middleware.SamplingProfiler') as profiler:
+            response = self.client.get('/tasks/', HTTP_X_PROFILE_REQUEST='1')
+            self.client.force_authenticate(None)
+            self.client.post('/user_auth/guest-login/', HTTP_X_PROFILE_REQUEST='1')
+        profiler.assert_not_called()
+        self.assertNotIn('X-Profile-ID', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_header_of_token_authenticated_staff(self):
+        token = issue_token(self.staff)
+        response = APIClient().get('/tasks/', HTTP_X_PROFILE_REQUEST='1', HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertIn('X-Profile-ID', response)
+
+    def test_oldest_profiles_are_dropped(self):
+        self.client.force_authenticate(self.staff)
+        for _ in range(3):
+            self.client.get('/tasks/', HTTP_X_PROFILE_REQUEST='1')
+        self.assertEqual(RequestProfile.objects.count(), 2)
+        self.assertEqual(len(list(Path(self.directory.name).iterdir())), 2)
+
+
+class CountingLock:
+    """
+    Lock counting how often it was acquired.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquired = 0
+
+    def __enter__(self):
+        self.acquired += 1
+        return self.lock.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.lock.__exit__(*exc_info)
+
+
+class MetricsTests(TestCase):
+    """
+    Tests for the metrics registry and the Prometheus endpoint.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_values_of_all_workers_are_merged(self):
+        worker_a = MetricsRegistry(self.directory.name)
+        worker_b = MetricsRegistry(self.directory.name)
+        worker_a.record_request('task-list', 'GET', 200, 0.02, queries=3, sql_duration=0.001)
+        worker_b.record_request('task-list', 'GET', 200, 0.3, queries=3, sql_duration=0.001)
+        worker_b.inc('join_auth_events_total', event='guest_login')
+        worker_b.flush()
+
+        text = render_prometheus(*worker_a.collect())
+        self.assertIn('join_http_requests_total{method="GET",status="200",view="task-list"} 2', text)
+        self.assertIn('join_http_request_duration_seconds_bucket{method="GET",view="task-list",le="0.025"} 1', text)
+        self.assertIn('join_http_request_duration_seconds_count{method="GET",view="task-list"} 2', text)
+        self.assertIn('join_auth_events_total{event="guest_login"} 1', text)
+
+    def test_coalesced_reads_are_exported(self):
+        registry = MetricsRegistry(self.directory.name)
+        registry.inc('join_coalesced_reads_total', outcome='shared')
+        text = render_prometheus(*registry.collect())
+        self.assertIn('# TYPE join_coalesced_reads_total counter', text)
+        self.assertIn('join_coalesced_reads_total{outcome="shared"} 1', text)
+
+    def test_record_request_takes_the_lock_once_without_io(self):
+        registry = MetricsRegistry(self.directory.name, flush_interval=float('inf'))
+        registry.lock = CountingLock()
+        with mock.patch.object(registry, 'flush') as flush:
+            for _ in range(10):
+                registry.record_request('task-list', 'GET', 200, 0.01, queries=5, sql_duration=0.001)
+        self.assertEqual(registry.lock.acquired, 10)
+        flush.assert_not_called()
+        self.assertEqual(list(Path(self.directory.name).iterdir()), [])
+
+    def test_files_of_exited_workers_are_folded_into_the_aggregate(self):
+        directory = Path(self.directory.name)
+        live = MetricsRegistry(directory)
+        for pid in (4194305, 4194306):
+            exited = MetricsRegistry(directory)
+            exited.path = directory / f'metrics-{pid}-dead.json'
+            exited.record_request('task-list', 'GET', 200, 0.02, queries=3, sql_duration=0.001)
+            exited.flush()
+        other = MetricsRegistry(directory)
+        other.inc('join_auth_events_total', event='guest_login')
+        other.flush()
+        live.inc('join_auth_events_total', event='guest_login')
+
+        for _ in range(2):
+            counters, histograms = live.collect()
+            self.assertEqual(counters[('join_http_requests_total',
+                                       (('method', 'GET'), ('status', '200'), ('view', 'task-list')))], 2)
+            self.assertEqual(counters[('join_auth_events_total', (('event', 'guest_login'),))], 2)
+        self.assertCountEqual([path.name for path in directory.glob('metrics-*.json')],
+                              ['metrics-aggregate.json', other.path.name])
+
+        # A file whose deletion was interrupted is not counted twice
+        (directory / 'metrics-4194305-dead.json').write_text(json.dumps(exited.snapshot()))
+        aggregate = json.loads((directory / 'metrics-aggregate.json').read_text())
+        aggregate['merged'].append('metrics-4194305-dead.json')
+        (directory / 'metrics-aggregate.json').write_text(json.dumps(aggregate))
+        counters, _ = live.collect()
+        self.assertEqual(counters[('join_http_requests_total',
+                                   (('method', 'GET'), ('status', '200'), ('view', 'task-list')))], 2)
+        self.assertFalse((directory / 'metrics-4194305-dead.json').exists())
+
+    def test_files_are_read_under_a_shared_lock(self):
+        registry = MetricsRegistry(self.directory.name)
+        events = []
+        flock, read_aggregate = fcntl.flock, registry._read_aggregate
+
+        def record_flock(lock, operation):
+            events.append(operation)
+            flock(lock, operation)
+
+        def record_read():
+            events.append('read')
+            return read_aggregate()
+
+        with mock.patch('Join_App.metrics.fcntl.flock', side_effect=record_flock), \
+                mock.patch.object(registry, '_read_aggregate', side_effect=record_read):
+            registry.collect()
+        self.assertEqual(events, [fcntl.LOCK_SH, 'read'])
+
+    @override_settings(METRICS={'TOKEN': 'scrape-secret'})
+    def test_endpoint_access(self):
+        client = APIClient()
+        self.assertEqual(client.get('/metrics/').status_code, 401)
+        self.assertEqual(client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE join_http_requests_total counter', response.content.decode())
+
+        client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        self.assertEqual(client.get('/metrics/').status_code, 200)
+
+
+class SQLiteConnectionTests(TransactionTestCase):
+    """
+    Tests for the SQLite connection profile and the lock retries.
+    """
+
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    @override_settings(SQLITE={'LOCK_RETRIES': 2, 'LOCK_BACKOFF_MS': 0})
+    def test_lock_errors_are_retried(self):
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            Task.objects.create(user=User.objects.create_user(f'user{len(attempts)}'),
+                                title='Task', due_date='2030-01-01')
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        self.assertEqual(run_in_transaction(write), 'done')
+        self.assertEqual(len(attempts), 3)
+        # The failed attempts were rolled back
+        self.assertEqual(Task.objects.count(), 1)
+
+    @override_settings(SQLITE={'LOCK_RETRIES': 1, 'LOCK_BACKOFF_MS': 0})
+    def test_retries_are_limited(self):
+        def write():
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            run_in_transaction(write)
+
+
+@override_settings(REPLICATION={'REPLICAS': ['replica'], 'STICKY_SECONDS': 60})
+class ReadReplicaTests(TransactionTestCase):
+    """
+    Tests for the read replica routing, with a replica file that is only
+    updated when the test replicates explicitly, i.e. an arbitrary lag.
+    """
+    # Resolved in setUpClass, after the replica alias has been added
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = {
+            **connections['default'].settings_dict, 'NAME': str(Path(cls.directory.name) / 'replica.sqlite3'),
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.directory.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + issue_token(self.user).key)
+        self.create_task('Replicated')
+        copy_database('default', 'replica')
+
+    def create_task(self, title):
+        return Task.objects.create(user=self.user, title=title, due_date='2030-01-01')
+
+    def titles(self):
+        response = self.client.get('/tasks/')
+        self.assertEqual(response.status_code, 200)
+        return sorted(task['title'] for task in response.json())
+
+    def test_reads_are_served_by_the_replica(self):
+        self.create_task('Lagging')
+        self.assertEqual(self.titles(), ['Replicated'])
+        copy_database('default', 'replica')
+        self.assertEqual(self.titles(), ['Lagging', 'Replicated'])
+
+    def test_writers_read_their_own_writes(self):
+        response = self.client.post('/tasks/', {'title': 'Mine', 'dueDate': '2030-01-01'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.titles(), ['Mine', 'Replicated'])
+
+        # Once the window is over, the client reads the lagging replica again
+        cache.clear()
+        self.assertEqual(self.titles(), ['Replicated'])
+
+
+@override_settings(SHARDING={'SHARDS': ['shard_a', 'shard_b']})
+class ShardingTests(TransactionTestCase):
+    """
+    Tests for the per-user sharding of the board data.
+    """
+    databases = '__all__'
+    SHARDS = ['shard_a', 'shard_b']
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        for alias in cls.SHARDS:
+            connections.settings[alias] = {
+                **connections['default'].settings_dict, 'NAME': str(Path(cls.directory.name) / f'{alias}.sqlite3'),
+            }
+            call_command('migrate', database=alias, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.SHARDS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.directory.cleanup()
+
+    def setUp(self):
+        _ids.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.shard = hashed_shard(self.user.id, self.SHARDS)
+        self.other = next(alias for alias in self.SHARDS if alias != self.shard)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_board(self):
+        response = self.client.post('/contacts/', {'name': 'Bob Builder', 'email': 'bob@example.com'}, format='json')
+        contact_id = response.json()['contactID']
+        response = self.client.post('/tasks/', {
+            'title': 'Pour concrete', 'dueDate': '2030-01-01',
+            'assignedTo': [{'contactID': contact_id}], 'subtasks': [{'subTaskName': 'Mix'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_board_data_is_stored_in_the_user_shard(self):
+        self.create_board()
+        self.assertEqual(Task.objects.using(self.shard).count(), 1)
+        self.assertEqual(Contact.objects.using(self.shard).count(), 1)
+        self.assertFalse(Task.objects.using(self.other).exists())
+        self.assertFalse(Task.objects.using('default').exists())
+
+        task = self.client.get('/tasks/').json()[0]
+        self.assertEqual(len(task['assignedTo']), 1)
+        self.assertEqual(task['subtasks'][0]['subTaskName'], 'Mix')
+
+    def test_move_user_shard(self):
+        self.create_board()
+        task = Task.objects.using(self.shard).get()
+        self.assertEqual(send_reminders(sink=RecordingSink(), today=task.due_date), 1)
+        call_command('move_user_shard', self.user.id, self.other, stdout=StringIO())
+
+        self.assertEqual(TaskReminder.objects.using(self.other).get().task.title, 'Pour concrete')
+        self.assertEqual(send_reminders(sink=RecordingSink(), today=task.due_date), 0)
+
+        self.assertFalse(Task.objects.using(self.shard).exists())
+        self.assertFalse(Contact.objects.using(self.shard).exists())
+        self.assertFalse(UserBoardSummary.objects.using(self.shard).exists())
+        self.assertEqual(UserBoardSummary.objects.using(self.other).get().todo, 1)
+        self.assertEqual(self.client.get('/tasks/summary/').json()['total'], 1)
+        task = self.client.get('/tasks/').json()[0]
+        contact = self.client.get('/contacts/').json()[0]
+        self.assertEqual(task['assignedTo'], [{'contactID': contact['contactID']}])
+        self.assertEqual(task['subtasks'][0]['subTaskName'], 'Mix')
+        self.assertEqual(len(self.client.get('/search/', {'q': 'concrete'}).json()), 1)
+
+    def test_ids_are_unique_across_shards_and_kept_when_moving(self):
+        self.create_board()
+        bob = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        Task.objects.using(self.other).create(user=bob, title='Elsewhere', due_date='2030-01-01')
+        task = self.client.get('/tasks/').json()[0]
+        self.assertNotEqual(Task.objects.using(self.other).get().id, task['taskID'])
+
+        call_command('move_user_shard', self.user.id, self.other, stdout=StringIO())
+        self.assertEqual(Task.objects.using(self.other).count(), 2)
+        response = self.client.get(f"/tasks/{task['taskID']}/")
+        self.assertEqual(response.json()['title'], 'Pour concrete')
+        response = self.client.patch(f"/tasks/{task['taskID']}/", {'title': 'Pour more concrete'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        contact_id = task['assignedTo'][0]['contactID']
+        self.assertEqual(self.client.get(f'/contacts/{contact_id}/').status_code, 200)
+        self.assertEqual(self.client.delete(f"/tasks/{task['taskID']}/").status_code, 204)
+        self.assertEqual(Task.objects.using(self.other).get().title, 'Elsewhere')
+
+    def test_update_contact_in_the_user_shard(self):
+        self.create_board()
+        contact = self.client.get('/contacts/').json()[0]
+        url = f"/contacts/{contact['contactID']}/"
+        response = self.client.patch(url, {'phone': '+49 123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.put(url, {'name': 'Bob Builder', 'email': 'bob@builder.example'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Contact.objects.using(self.shard).get().email, 'bob@builder.example')
+
+    def test_writes_checking_before_a_move_started_are_refused(self):
+        self.create_board()
+        UserShard.objects.create(user=self.user, shard=self.shard, moving=True)
+        # The request passed the first check just before the move started
+        with mock.patch('Join_App.api.mixins.shard_for_user', return_value=(self.shard, False)):
+            response = self.client.post('/tasks/', {'title': 'Late', 'dueDate': '2030-01-01'}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Task.objects.using(self.shard).filter(title='Late').exists())
+
+    def test_writes_are_refused_while_moving(self):
+        UserShard.objects.create(user=self.user, shard=self.shard, moving=True)
+        response = self.client.post('/tasks/', {'title': 'Blocked', 'dueDate': '2030-01-01'}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(self.client.get('/tasks/').status_code, 200)
+
+
+class ArchivingTests(TestCase):
+    """
+    Tests for archiving done tasks and restoring them.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.contact = Contact.objects.create(user=self.user, name='Bob Builder', email='bob@example.com')
+
+    def create_task(self, title, category='todo', days_ago=0):
+        task = Task.objects.create(user=self.user, title=title, due_date='2030-01-01', category=category)
+        if category == 'done':
+            Task.objects.filter(pk=task.pk).update(completed_at=timezone.now() - timedelta(days=days_ago))
+        task.assigned_to.add(self.contact)
+        Subtask.objects.create(task=task, name=f'{title} step', done=True)
+        return task
+
+    def test_completion_time_is_tracked(self):
+        task = self.create_task('Ship')
+        self.assertIsNone(task.completed_at)
+        task.category = 'done'
+        task.save(update_fields=['category'])
+        task.refresh_from_db()
+        self.assertIsNotNone(task.completed_at)
+        self.client.patch(f'/tasks/{task.pk}/', {'category': 'todo'}, format='json')
+        task.refresh_from_db()
+        self.assertIsNone(task.completed_at)
+
+    def test_old_done_tasks_are_archived(self):
+        old = self.create_task('Old', 'done', days_ago=60)
+        self.create_task('Recent', 'done', days_ago=1)
+        self.create_task('Open')
+
+        self.assertEqual(archive_tasks(timezone.now() - timedelta(days=30), batch_size=1), 1)
+        self.assertEqual(sorted(task['title'] for task in self.client.get('/tasks/').json()), ['Open', 'Recent'])
+        self.assertFalse(Subtask.objects.filter(task_id=old.pk).exists())
+
+        page = self.client.get('/archive/').json()
+        self.assertEqual(page['count'], 1)
+        entry = page['results'][0]
+        self.assertEqual(entry['taskID'], old.pk)
+        self.assertEqual(entry['assignedTo'], [{'contactID': self.contact.pk}])
+        self.assertEqual(entry['subtasks'], [{'subTaskName': 'Old step', 'done': True}])
+
+    def test_restore(self):
+        old = self.create_task('Old', 'done', days_ago=60)
+        archive_tasks(timezone.now() - timedelta(days=30))
+        archived = ArchivedTask.objects.get()
+
+        response = self.client.post(f'/archive/{archived.pk}/restore/')
+        self.assertEqual(response.json()['taskID'], old.pk)
+        self.assertFalse(ArchivedTask.objects.exists())
+        task = self.client.get(f'/tasks/{old.pk}/').json()
+        self.assertEqual(task['assignedTo'], [{'contactID': self.contact.pk}])
+        self.assertEqual(task['subtasks'][0]['subTaskName'], 'Old step')
+        # ETags from before archiving are stale
+        self.assertEqual(task['version'], 2)
+        # Restored tasks get a new grace period before the next archiving
+        self.assertEqual(archive_tasks(timezone.now() - timedelta(days=30)), 0)
+
+
+@override_settings(THROTTLING={'RATES': {'guest-login': {'ip': (2, 60)},
+                                         'login': {'ip': (100, 1), 'credential': (2, 60)}}})
+class ThrottlingTests(TestCase):
+    """
+    Tests for the token-bucket throttles of the auth endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_rejected_requests_do_no_database_work(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/user_auth/guest-login/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.post('/user_auth/guest-login/')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+        # Other clients have their own bucket
+        self.assertEqual(self.client.post('/user_auth/guest-login/', REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_spoofed_forwarded_for_shares_the_bucket(self):
+        for address in ('1.1.1.1', '2.2.2.2'):
+            response = self.client.post('/user_auth/guest-login/', HTTP_X_FORWARDED_FOR=address)
+            self.assertEqual(response.status_code, 200)
+        response = self.client.post('/user_auth/guest-login/', HTTP_X_FORWARDED_FOR='3.3.3.3')
+        self.assertEqual(response.status_code, 429)
+
+        # Behind one trusted proxy only the address it appended counts, not what the client sent
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            response = self.client.post('/user_auth/guest-login/', HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.9')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post('/user_auth/guest-login/', HTTP_X_FORWARDED_FOR='2.2.2.2, 10.0.0.9')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post('/user_auth/guest-login/', HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.9')
+            self.assertEqual(response.status_code, 429)
+
+    def test_credentials_are_limited_across_addresses(self):
+        User.objects.create_user('alice', 'alice@example.com', 'secret')
+        for address in ('10.0.0.1', '10.0.0.2'):
+            response = self.client.post('/user_auth/login/', {'username': 'alice', 'password': 'wrong'},
+                                        format='json', REMOTE_ADDR=address)
+            self.assertEqual(response.status_code, 200)
+        response = self.client.post('/user_auth/login/', {'username': 'Alice ', 'password': 'secret'},
+                                    format='json', REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post('/user_auth/login/', {'username': 'bob', 'password': 'secret'},
+                                    format='json', REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bucket_refills(self):
+        with mock.patch('Join_App.api.throttling.time.time', return_value=1000.0) as now:
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 0)
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 0)
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 10)
+            now.return_value = 1004.0
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 6)
+            now.return_value = 1010.0
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 0)
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 10)
+            # Idle time refills the bucket only up to its capacity
+            now.return_value = 2000.0
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 0)
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 0)
+            self.assertEqual(take_token(cache, 'bucket', 2, 10), 10)
+
+
+class IdempotencyTests(TestCase):
+    """
+    Tests for replaying create requests sent with an Idempotency-Key.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {'title': 'Pay rent', 'dueDate': '2030-01-01', 'subtasks': [{'subTaskName': 'Transfer'}]}
+
+    def post(self, payload, key='retry-1'):
+        return self.client.post('/tasks/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_the_first_response(self):
+        first = self.post(self.payload)
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            retry = self.post(self.payload)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(Subtask.objects.count(), 1)
+
+        self.assertEqual(self.post(self.payload, key='retry-2').status_code, 201)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_key_reused_for_another_request(self):
+        self.post(self.payload)
+        self.assertEqual(self.post({**self.payload, 'title': 'Other'}).status_code, 422)
+
+    def test_failed_requests_release_the_key(self):
+        self.assertEqual(self.post({**self.payload, 'dueDate': 'tomorrow'}).status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        self.assertEqual(self.post(self.payload).status_code, 201)
+
+    @override_settings(IDEMPOTENCY={'WAIT_SECONDS': 5, 'POLL_MS': 0})
+    def test_duplicates_wait_for_the_first_request(self):
+        record = IdempotencyRecord.objects.create(user=self.user, key='retry-1', request_hash='')
+
+        def finish(seconds):
+            IdempotencyRecord.objects.filter(pk=record.pk).update(status_code=201, response_body={'id': 7})
+
+        with mock.patch('Join_App.idempotency.time.sleep', side_effect=finish):
+            with mock.patch('Join_App.api.mixins.request_fingerprint', return_value=''):
+                response = self.post(self.payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'id': 7})
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(IDEMPOTENCY={'WAIT_SECONDS': 0})
+    def test_unfinished_duplicates_are_rejected(self):
+        with mock.patch('Join_App.api.mixins.request_fingerprint', return_value=''):
+            IdempotencyRecord.objects.create(user=self.user, key='retry-1', request_hash='')
+            response = self.post(self.payload)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class BatchTests(TestCase):
+    """
+    Tests for running several API requests through /batch/.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + issue_token(self.user).key)
+        self.task = Task.objects.create(user=self.user, title='Existing', due_date='2030-01-01')
+
+    def batch(self, requests, **options):
+        return self.client.post('/batch/', {'requests': requests, **options}, format='json')
+
+    def test_requests_run_in_order_with_one_authentication(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.batch([
+                {'method': 'POST', 'path': '/tasks/', 'body': {'title': 'New', 'dueDate': '2030-01-01'}},
+                {'method': 'PATCH', 'path': f'/tasks/{self.task.pk}/', 'body': {'category': 'inprogress'}},
+                {'method': 'GET', 'path': '/tasks/'},
+            ])
+        self.assertEqual(response.status_code, 200)
+        statuses = [entry['status'] for entry in response.json()['responses']]
+        self.assertEqual(statuses, [201, 200, 200])
+        titles = sorted(task['title'] for task in response.json()['responses'][2]['body'])
+        self.assertEqual(titles, ['Existing', 'New'])
+        self.assertEqual(sum('user_auth_app_expiringtoken' in query['sql'] for query in captured), 1)
+
+    def test_atomic_batches_roll_back(self):
+        response = self.batch([
+            {'method': 'PATCH', 'path': f'/tasks/{self.task.pk}/', 'body': {'title': 'Renamed'}},
+            {'method': 'PATCH', 'path': '/tasks/999999/', 'body': {'title': 'Missing'}},
+            {'method': 'GET', 'path': '/tasks/'},
+        ], atomic=True)
+        body = response.json()
+        self.assertFalse(body['committed'])
+        self.assertEqual([entry['status'] for entry in body['responses']], [200, 404])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'Existing')
+
+    @override_settings(BATCH={'MAX_REQUESTS': 2, 'MAX_BYTES': 400})
+    def test_limits(self):
+        get = {'method': 'GET', 'path': '/tasks/'}
+        self.assertEqual(self.batch([get, get, get]).status_code, 400)
+        self.assertEqual(self.batch([{**get, 'body': {'padding': 'x' * 400}}]).status_code, 413)
+        self.assertEqual(self.batch([{**get, 'headers': {'Authorization': 'Token other'}}]).status_code, 400)
+        # Only the routes of the Join API router can be called
+        response = self.batch([{'method': 'POST', 'path': '/batch/'}, {'method': 'GET', 'path': '/metrics/'}])
+        self.assertEqual([entry['status'] for entry in response.json()['responses']], [404, 404])
+
+
+class ConditionalUpdateTests(TestCase):
+    """
+    Tests for the versions, ETags and If-Match on task and contact updates.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.task = Task.objects.create(user=self.user, title='Draft', due_date='2030-01-01')
+        self.contact = Contact.objects.create(user=self.user, name='Bob Builder', email='bob@example.com')
+
+    def test_detail_carries_the_version_as_etag(self):
+        response = self.client.get(f'/tasks/{self.task.pk}/')
+        self.assertEqual(response['ETag'], '"1"')
+        self.assertEqual(response.json()['version'], 1)
+
+    def test_matching_version_is_updated_in_one_statement(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.patch(f'/tasks/{self.task.pk}/', {'category': 'done'}, format='json',
+                                         HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"2"')
+        updates = [query['sql'] for query in captured if query['sql'].startswith('UPDATE "Join_App_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"version" = 1', updates[0])
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.category, self.task.version), ('done', 2))
+        self.assertIsNotNone(self.task.completed_at)
+
+    def test_stale_version_gets_412_with_the_current_state(self):
+        # Another tab edited the task meanwhile
+        self.client.patch(f'/tasks/{self.task.pk}/', {'title': 'Theirs'}, format='json')
+        response = self.client.put(f'/tasks/{self.task.pk}/', {'title': 'Mine', 'dueDate': '2030-01-01'},
+                                   format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(response.json()['title'], 'Theirs')
+
+        response = self.client.patch(f'/contacts/{self.contact.pk}/', {'phone': '123'}, format='json',
+                                     HTTP_IF_MATCH='W/"7"')
+        self.assertEqual(response.status_code, 412)
+        response = self.client.patch(f'/contacts/{self.contact.pk}/', {'phone': '123'}, format='json',
+                                     HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.json()['version'], 2)
+
+    def test_save_and_admin_edits_outdate_the_etag(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'Renamed'
+        task.save()
+        self.assertEqual(task.version, 2)
+        task.save(update_fields=['title'])
+        self.assertEqual(Task.objects.get(pk=self.task.pk).version, 3)
+        response = self.client.patch(f'/tasks/{self.task.pk}/', {'title': 'Mine'}, format='json',
+                                     HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], '"3"')
+
+        staff = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.force_login(staff)
+        response = self.client.post(f'/admin/Join_App/contact/{self.contact.pk}/change/', {
+            'user': self.user.pk, 'name': 'Bob Builder', 'email': 'bob@example.com', 'phone': '999',
+            'color': '#6e6ee5',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(f'/contacts/{self.contact.pk}/', {'phone': '123'}, format='json',
+                                     HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.json()['phone'], '999')
+
+    def test_conflicting_write_between_load_and_update(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        Task.objects.filter(pk=self.task.pk).update(version=5)
+        with self.assertRaises(VersionConflict):
+            stale.save_version(['title'])
+
+
+class ContactLookupTests(TestCase):
+    """
+    Tests for contact autocomplete and the alphabetical contact groups.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name, email in [('Anna Adams', 'anna@example.com'), (' Bob Builder', 'bob@example.com'),
+                            ('bella', 'b@example.com'), ('Östen Öberg', 'zed@example.com'),
+                            ('   ', 'blank@example.com')]:
+            Contact.objects.create(user=self.user, name=name, email=email)
+        other = User.objects.create_user('bob', 'bob@example.com', 'secret')
+        Contact.objects.create(user=other, name='Anton', email='anton@example.com')
+
+    def names(self, response):
+        return [contact['name'] for contact in response.json()]
+
+    def test_autocomplete_matches_name_and_email_prefixes(self):
+        self.assertEqual(self.names(self.client.get('/contacts/autocomplete/', {'q': 'AN'})), ['Anna Adams'])
+        self.assertEqual(self.names(self.client.get('/contacts/autocomplete/', {'q': 'zed'})), ['Östen Öberg'])
+        response = self.client.get('/contacts/autocomplete/', {'q': 'b', 'limit': 1})
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.client.get('/contacts/autocomplete/', {'q': ''}).json(), [])
+        self.assertEqual(self.client.get('/contacts/autocomplete/', {'q': 'a', 'limit': 'x'}).status_code, 400)
+
+    def test_autocomplete_folds_non_ascii_letters(self):
+        for prefix in ('Ö', 'ö', 'öst', 'ÖST'):
+            response = self.client.get('/contacts/autocomplete/', {'q': prefix})
+            self.assertEqual(self.names(response), ['Östen Öberg'], prefix)
+
+    def test_group_counts_match_group_listings(self):
+        groups = self.client.get('/contacts/groups/').json()
+        self.assertEqual(groups, [{'initial': '#', 'count': 1}, {'initial': 'A', 'count': 1},
+                                  {'initial': 'B', 'count': 2}, {'initial': 'Ö', 'count': 1}])
+        for group in groups:
+            response = self.client.get(f"/contacts/groups/{quote(group['initial'])}/")
+            self.assertEqual(response.json()['count'], group['count'], group['initial'])
+        response = self.client.get('/contacts/groups/b/')
+        self.assertEqual([contact['name'] for contact in response.json()['results']], [' Bob Builder', 'bella'])
+        response = self.client.get('/contacts/groups/ö/')
+        self.assertEqual(response.json()['results'][0]['name'], 'Östen Öberg')
+
+
+class CalendarTests(TestCase):
+    """
+    Tests for the task calendar with per-day workload counts.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        contact = Contact.objects.create(user=self.user, name='Bob Builder', email='bob@example.com')
+        for days, priority, category in [(-1, 'urgent', 'todo'), (-1, 'low', 'done'), (0, 'urgent', 'inprogress'),
+                                         (2, 'medium', 'todo'), (30, 'urgent', 'todo')]:
+            task = Task.objects.create(user=self.user, title=f'Due {days}', priority=priority, category=category,
+                                       due_date=self.today + timedelta(days=days))
+            task.assigned_to.add(contact)
+            Subtask.objects.create(task=task, name='Step')
+
+    def calendar(self, start, end):
+        return self.client.get('/tasks/calendar/', {'from': start.isoformat(), 'to': end.isoformat()})
+
+    def test_counts_per_day(self):
+        with self.assertNumQueries(4):
+            response = self.calendar(self.today - timedelta(days=1), self.today + timedelta(days=2))
+        body = response.json()
+        self.assertEqual([task['title'] for task in body['tasks']], ['Due -1', 'Due -1', 'Due 0', 'Due 2'])
+        self.assertEqual([day['total'] for day in body['days']], [2, 1, 0, 1])
+        yesterday = body['days'][0]
+        self.assertEqual((yesterday['overdue'], yesterday['urgent']), (1, 1))
+        self.assertEqual(yesterday['priority'], {'low': 1, 'medium': 0, 'urgent': 1})
+        self.assertEqual(yesterday['category']['done'], 1)
+        self.assertEqual((body['days'][1]['overdue'], body['days'][1]['urgent']), (0, 1))
+
+    def test_invalid_ranges(self):
+        self.assertEqual(self.client.get('/tasks/calendar/', {'from': 'soon'}).status_code, 400)
+        self.assertEqual(self.calendar(self.today, self.today - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.calendar(self.today, self.today + timedelta(days=93)).status_code, 400)
+        self.assertEqual(len(self.client.get('/tasks/calendar/').json()['days']), 7)
+
+
+class BulkDeleteTests(TestCase):
+    """
+    Tests for the set-based bulk delete of tasks and contacts.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.contact = Contact.objects.create(user=self.user, name='Bob Builder', email='bob@example.com')
+        self.tasks = []
+        for index in range(3):
+            task = Task.objects.create(user=self.user, title=f'Pour concrete {index}', due_date='2030-01-01')
+            task.assigned_to.add(self.contact)
+            Subtask.objects.create(task=task, name='Mix')
+            Subtask.objects.create(task=task, name='Pour')
+            self.tasks.append(task)
+
+    def test_deletes_tasks_with_dependents(self):
+        ids = [task.id for task in self.tasks[:2]]
+        response = self.client.post('/tasks/bulk-delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.json()['deleted'],
+                         {'Join_App.Subtask': 4, 'Join_App.Task_assigned_to': 2, 'Join_App.TaskReminder': 0,
+                          'Join_App.Task': 2})
+        self.assertEqual(list(Task.objects.values_list('id', flat=True)), [self.tasks[2].id])
+        self.assertEqual(Subtask.objects.count(), 2)
+        self.assertEqual(len(self.client.get('/search/', {'q': 'concrete'}).json()), 1)
+
+    def test_query_count_does_not_grow(self):
+        more = Task.objects.bulk_create(Task(user=self.user, title='Extra', due_date='2030-01-01')
+                                        for _ in range(20))
+        ids = [task.id for task in self.tasks + more]
+        with CaptureQueriesContext(connection) as few:
+            self.client.post('/tasks/bulk-delete/', {'ids': ids[:2]}, format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post('/tasks/bulk-delete/', {'ids': ids[2:]}, format='json')
+        self.assertEqual(len(few), len(many))
+        self.assertFalse(Task.objects.exists())
+
+    def test_deletes_contacts_with_assignments(self):
+        response = self.client.post('/contacts/bulk-delete/', {'ids': [self.contact.id]}, format='json')
+        self.assertEqual(response.json()['deleted']['Join_App.Task_assigned_to'], 3)
+        self.assertFalse(Contact.objects.exists())
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_foreign_ids_delete_nothing(self):
+        other = User.objects.create_user('mallory', 'mallory@example.com', 'secret')
+        foreign = Task.objects.create(user=other, title='Foreign', due_date='2030-01-01')
+        response = self.client.post('/tasks/bulk-delete/', {'ids': [self.tasks[0].id, foreign.id, 999]},
+                                    format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['missing'], [foreign.id, 999])
+        self.assertEqual(Task.objects.count(), 4)
+        self.assertEqual(self.client.post('/tasks/bulk-delete/', {'ids': []}, format='json').status_code, 400)
+
+
+@override_settings(STREAMING={'CHUNK_SIZE': 50})
+class StreamingListTests(TestCase):
+    """
+    Tests for the streamed task and contact lists.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.contact = Contact.objects.create(user=self.user, name='Bob Builder', email='bob@example.com')
+
+    def add_tasks(self, count):
+        tasks = Task.objects.bulk_create(
+            Task(user=self.user, title=f'Task {index}', description='x' * 200, due_date='2030-01-01')
+            for index in range(count)
+        )
+        Subtask.objects.bulk_create(Subtask(task=task, name=f'Step {index}')
+                                    for task in tasks for index in range(3))
+        Task.assigned_to.through.objects.bulk_create(
+            Task.assigned_to.through(task_id=task.id, contact_id=self.contact.id) for task in tasks
+        )
+
+    def stream_peak(self):
+        tracemalloc.start()
+        response = self.client.get('/tasks/', {'stream': 'true'})
+        for _ in response.streaming_content:
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    def test_streams_same_list(self):
+        self.add_tasks(120)
+        response = self.client.get('/tasks/', {'stream': 'true'})
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, self.client.get('/tasks/').json())
+        contacts = self.client.get('/contacts/', {'stream': '1'})
+        self.assertEqual(json.loads(b''.join(contacts.streaming_content)), self.client.get('/contacts/').json())
+
+    def test_empty_list(self):
+        Contact.objects.all().delete()
+        response = self.client.get('/contacts/', {'stream': 'true'})
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+    def test_peak_memory_independent_of_size(self):
+        self.add_tasks(100)
+        self.stream_peak()
+        small = self.stream_peak()
+        self.add_tasks(900)
+        large = self.stream_peak()
+        self.assertLess(large, small * 1.5)
+
+
+class CoalescingTests(TestCase):
+    """
+    Tests for the single-flight coalescing of board reads.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start_leader(self, flights, key, result):
+        # Runs a call of the key in a thread, blocked until release is set
+        release, started, outcomes = threading.Event(), threading.Event(), []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        def run():
+            try:
+                outcomes.append(flights.do(key, compute, 5)[1])
+            except ValueError:
+                outcomes.append('raised')
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        started.wait(5)
+        return thread, release, outcomes
+
+    def wait_for_leader(self, flights, key, release):
+        calls = []
+        waiter = threading.Thread(target=lambda: calls.append(flights.do(key, lambda: ['own'], 5)))
+        waiter.start()
+        time.sleep(0.05)
+        release.set()
+        waiter.join()
+        return calls
+
+    def test_waiters_share_the_result(self):
+        flights = SingleFlight()
+        thread, release, outcomes = self.start_leader(flights, 'key', ['shared'])
+        self.assertEqual(self.wait_for_leader(flights, 'key', release), [(['shared'], 'shared')])
+        thread.join()
+        self.assertEqual(outcomes, ['leader'])
+
+    def test_waiters_compute_themselves_on_timeout_or_failure(self):
+        flights = SingleFlight()
+        thread, release, _ = self.start_leader(flights, 'key', ['late'])
+        self.assertEqual(flights.do('key', lambda: ['own'], 0.01), (['own'], 'timeout'))
+        release.set()
+        thread.join()
+
+        thread, release, outcomes = self.start_leader(flights, 'key', ValueError('boom'))
+        self.assertEqual(self.wait_for_leader(flights, 'key', release), [(['own'], 'failed')])
+        thread.join()
+        self.assertEqual(outcomes, ['raised'])
+
+    def test_list_joins_running_read(self):
+        key = (self.user.id, board_version(self.user.id), '/tasks/')
+        thread, release, _ = self.start_leader(_flights, key, [{'taskID': 1, 'title': 'From the leader'}])
+        threading.Timer(0.05, release.set).start()
+        with self.assertNumQueries(0):
+            response = self.client.get('/tasks/')
+        thread.join()
+        self.assertEqual(response.json(), [{'taskID': 1, 'title': 'From the leader'}])
+
+    def test_committed_writes_raise_version(self):
+        version = board_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/contacts/', {'name': 'Bob Builder', 'email': 'bob@example.com'}, format='json')
+        self.assertEqual(board_version(self.user.id), version + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/contacts/', {'name': ''}, format='json')
+        self.assertEqual(board_version(self.user.id), version + 1)
+
+
+class BoardAdminTests(TestCase):
+    """
+    Tests for the query counts of the task, contact and subtask admin.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'secret')
+        self.client.force_login(self.admin)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def pages(self):
+        task = Task.objects.order_by('id').first()
+        contact = Contact.objects.order_by('id').first()
+        return [
+            '/admin/Join_App/task/', '/admin/Join_App/task/?category__exact=done',
+            '/admin/Join_App/contact/', '/admin/Join_App/subtask/',
+            f'/admin/Join_App/task/{task.id}/change/', f'/admin/Join_App/contact/{contact.id}/change/',
+            f'/admin/Join_App/subtask/{task.subtasks.first().id}/change/',
+        ]
+
+    def test_query_counts_do_not_grow_with_data(self):
+        seed(users=1, tasks=20, subtasks=3, contacts=10, prefix='small')
+        # Fills the content type cache
+        [self.queries(url) for url in self.pages()]
+        small = [self.queries(url) for url in self.pages()]
+        seed(users=4, tasks=300, subtasks=4, contacts=200, random_seed=7, prefix='large')
+        Task.assigned_to.through.objects.bulk_create(
+            Task.assigned_to.through(task_id=Task.objects.order_by('id').first().id, contact_id=contact_id)
+            for contact_id in Contact.objects.values_list('id', flat=True)[1:]
+        )
+        large = [self.queries(url) for url in self.pages()]
+        self.assertEqual(small, large)
+        self.assertLessEqual(max(large), 12)
+
+    def test_count_is_capped(self):
+        seed(users=1, tasks=30, subtasks=0, contacts=1)
+        with mock.patch('Join_App.admin.ADMIN_COUNT_LIMIT', 10):
+            response = self.client.get('/admin/Join_App/task/')
+        self.assertEqual(response.context['cl'].result_count, 10)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTests(TestCase):
+    """
+    Tests for the bulk user provisioning.
+    """
+
+    def setUp(self):
+        self.staff = User.objects.create_user('admin', 'admin@example.com', 'secret', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    @staticmethod
+    def rows(count, prefix='member'):
+        return [{'name': f'{prefix}{index}', 'email': f'{prefix}{index}@example.com', 'password': 'pw'}
+                for index in range(count)]
+
+    def test_creates_users_and_reports_row_errors(self):
+        rows = self.rows(2) + [
+            {'name': 'admin', 'email': 'other@example.com', 'password': 'pw'},
+            {'name': 'broken', 'email': 'not-an-email', 'password': 'pw'},
+            {'name': 'member0', 'email': 'again@example.com', 'password': 'pw'},
+        ]
+        response = self.client.post('/users/provision/', {'users': rows}, format='json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual([user['name'] for user in body['created']], ['member0', 'member1'])
+        self.assertEqual({error['index']: list(error['errors']) for error in body['errors']},
+                         {2: ['name'], 3: ['email'], 4: ['name']})
+        member = User.objects.get(username='member1')
+        self.assertTrue(member.check_password('pw'))
+        self.assertTrue(UserProfile.objects.filter(user=member).exists())
+        self.assertTrue(ExpiringToken.objects.filter(user=member).exists())
+
+    def test_query_count_does_not_grow(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.post('/users/provision/', {'users': self.rows(2, 'few')}, format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post('/users/provision/', {'users': self.rows(40, 'many')}, format='json')
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(User.objects.filter(username__startswith='many').count(), 40)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('member', 'member@example.com', 'secret'))
+        response = self.client.post('/users/provision/', {'users': self.rows(1)}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.post('/users/', self.rows(1)[0], format='json').status_code, 201)
+
+    def test_parallel_hashes(self):
+        hashes = hash_passwords(['first', 'second', 'third'], workers=2)
+        self.assertTrue(all(check_password(password, encoded)
+                            for password, encoded in zip(['first', 'second', 'third'], hashes)))
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('name,email,password\nfrom_csv,from_csv@example.com,pw\nadmin,x@example.com,pw\n')
+        out, err = StringIO(), StringIO()
+        call_command('provision_users', source.name, '--workers', '1', stdout=out, stderr=err)
+        Path(source.name).unlink()
+        self.assertIn('Created 1 users, skipped 1 rows', out.getvalue())
+        self.assertIn('Row 2', err.getvalue())
+        self.assertTrue(User.objects.filter(username='from_csv').exists())
+
+
+class ExpiringTokenTests(TestCase):
+    """
+    Tests for the expiring authentication tokens.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+
+    def get_tasks(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return self.client.get('/tasks/')
+
+    def test_every_login_issues_a_token(self):
+        keys = [self.client.post('/user_auth/login/', {'username': 'alice', 'password': 'secret'},
+                                 format='json').json()['token'] for _ in range(2)]
+        self.assertNotEqual(*keys)
+        for key in keys:
+            self.assertEqual(self.get_tasks(ExpiringToken.objects.get(key=key)).status_code, 200)
+
+    def test_expired_tokens_are_rejected(self):
+        token = issue_token(self.user)
+        ExpiringToken.objects.filter(key=token.key).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.get_tasks(token).status_code, 401)
+
+    def test_use_slides_expiry_at_most_every_touch_interval(self):
+        token = issue_token(self.user)
+        with CaptureQueriesContext(connection) as captured:
+            self.get_tasks(token)
+        self.assertFalse([query for query in captured if query['sql'].startswith('UPDATE')])
+
+        old = timezone.now() - timedelta(hours=1)
+        ExpiringToken.objects.filter(key=token.key).update(last_used=old, expires_at=old + timedelta(days=1))
+        with CaptureQueriesContext(connection) as captured:
+            self.get_tasks(token)
+        self.assertEqual(len([query for query in captured if query['sql'].startswith('UPDATE')]), 1)
+        token.refresh_from_db()
+        self.assertGreater(token.expires_at, timezone.now() + timedelta(days=13))
+
+    def test_logout_deletes_only_the_current_token(self):
+        token, other = issue_token(self.user), issue_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.post('/user_auth/logout/').status_code, 204)
+        self.assertEqual(self.get_tasks(token).status_code, 401)
+        self.assertEqual(self.get_tasks(other).status_code, 200)
+        self.client.credentials()
+        self.assertEqual(self.client.post('/user_auth/logout/').status_code, 401)
+
+    @override_settings(TOKENS={'MAX_PER_USER': 3})
+    def test_least_recently_used_tokens_beyond_the_cap_are_deleted(self):
+        tokens = [issue_token(self.user) for _ in range(3)]
+        ExpiringToken.objects.filter(key=tokens[1].key).update(last_used=timezone.now() - timedelta(days=1))
+        issue_token(User.objects.create_user('bob'))
+        newest = issue_token(self.user)
+        self.assertEqual(set(ExpiringToken.objects.filter(user=self.user).values_list('key', flat=True)),
+                         {tokens[0].key, tokens[2].key, newest.key})
+        self.assertEqual(ExpiringToken.objects.count(), 4)
+
+    def test_sweep_deletes_expired_tokens_in_batches(self):
+        valid = issue_token(self.user)
+        past = timezone.now() - timedelta(days=1)
+        for _ in range(5):
+            ExpiringToken.objects.filter(key=issue_token(self.user).key).update(expires_at=past)
+        self.assertEqual(sweep_expired(batch_size=2), 5)
+        self.assertEqual(list(ExpiringToken.objects.values_list('key', flat=True)), [valid.key])
+        plan = ExpiringToken.objects.filter(expires_at__lte=past).order_by('expires_at').explain()
+        self.assertIn('INDEX', plan)
+        out = StringIO()
+        call_command('sweep_tokens', stdout=out)
+        self.assertIn('Deleted 0 expired tokens', out.getvalue())
+
+
+class TrafficCaptureTests(TestCase):
+    """
+    Tests for the request trace capture and its replay.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'trace.jsonl'
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.contact = Contact.objects.create(user=self.user, name='Bob Builder', email='bob@example.com')
+        self.task = Task.objects.create(user=self.user, title='Secret plan', due_date='2030-01-01')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {issue_token(self.user).key}')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def capture(self, requests):
+        with override_settings(CAPTURE={'ENABLED': True, 'PATH': self.path}):
+            client = APIClient()
+            client.credentials(**self.client._credentials)
+            for method, path, body in requests:
+                getattr(client, method)(path, body, format='json')
+        return read_trace(self.path)
+
+    def test_records_are_sanitised(self):
+        records = self.capture([
+            ('patch', f'/tasks/{self.task.pk}/', {'title': 'Secret plan B', 'category': 'done',
+                                                  'dueDate': str(timezone.localdate() + timedelta(days=3)),
+                                                  'assignedTo': [{'contactID': self.contact.pk}]}),
+            ('get', '/search/?q=secret', None),
+            ('get', '/metrics/', None),
+        ])
+        self.assertEqual(len(records), 2)
+        patch, search = records
+        self.assertEqual((patch['m'], patch['r'], patch['k'], patch['s']), ('PATCH', 'task-detail', {'pk': '<id>'}, 200))
+        self.assertEqual(patch['b'], {'title': '<str:13>', 'category': 'done', 'dueDate': '<date:+3>',
+                                      'assignedTo': [{'contactID': '<id>'}]})
+        self.assertEqual(search['q'], {'q': '<str:6>'})
+        self.assertEqual(patch['u'], search['u'])
+        content = self.path.read_text()
+        self.assertNotIn('ecret', content)
+        self.assertNotIn(f'"{self.user.pk}"', content)
+
+    def test_replay_sends_the_recorded_mix(self):
+        records = self.capture([
+            ('get', '/tasks/', None),
+            ('post', '/contacts/', {'name': 'Carla', 'email': 'carla@example.com', 'phone': '+49 1'}),
+            ('delete', f'/tasks/{self.task.pk}/', None),
+            ('post', '/batch/', {'requests': [{'method': 'PATCH', 'path': f'/contacts/{self.contact.pk}/',
+                                               'body': {'phone': '+49 2'}}]}),
+        ])
+        seeded = seed(users=2, tasks=5, contacts=3, prefix='replay')
+        ctx = ReplayContext(seeded['users'], seeded['tokens'])
+        tasks = Task.objects.filter(user=seeded['users'][0]).count()
+        report = replay_trace(records, ctx)
+
+        self.assertEqual(report['requests'], 4)
+        self.assertEqual(report['routes']['GET task-list']['statuses'], {'200': 1})
+        self.assertEqual(report['routes']['POST contact-list']['statuses'], {'201': 1})
+        self.assertEqual(report['routes']['DELETE task-detail']['statuses'], {'204': 1})
+        self.assertEqual(report['routes']['POST batch']['statuses'], {'200': 1})
+        self.assertEqual(Task.objects.filter(user=seeded['users'][0]).count(), tasks)
+
+    def test_original_pacing(self):
+        records = [{'ts': 100.0, 'm': 'GET', 'r': 'hello_world'}, {'ts': 100.4, 'm': 'GET', 'r': 'hello_world'}]
+        seeded = seed(users=1, tasks=1, prefix='replay')
+        ctx = ReplayContext(seeded['users'], seeded['tokens'])
+        start = time.perf_counter()
+        report = replay_trace(records, ctx, pace='original', speed=2)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+        self.assertEqual(report['routes']['GET hello_world']['samples'], 2)
+
+
+class ContactAvatarTests(TestCase):
+    """
+    Tests for the stored initials and the content-addressed avatar images.
+    """
+
+    def setUp(self):
+        _avatars.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_contact(self, name, color='#ff7a00'):
+        response = self.client.post('/contacts/', {'name': name, 'email': 'a@example.com', 'color': color},
+                                    format='json')
+        return Contact.objects.get(pk=response.data['contactID'])
+
+    def test_list_carries_stored_initials_and_hash(self):
+        first = self.create_contact('Ada Lovelace')
+        second = self.create_contact('Alan Lee')
+        self.create_contact('Grace Hopper', color='#6e52ff')
+        contacts = {contact['contactID']: contact for contact in self.client.get('/contacts/').data}
+        self.assertEqual(contacts[first.pk]['initials'], 'AL')
+        # Same initials and colour share one avatar
+        self.assertEqual(contacts[first.pk]['avatarHash'], contacts[second.pk]['avatarHash'])
+        self.assertEqual(len({contact['avatarHash'] for contact in contacts.values()}), 2)
+
+    def test_updates_refresh_the_hash(self):
+        contact = self.create_contact('Ada Lovelace')
+        self.client.patch(f'/contacts/{contact.pk}/', {'name': 'Grace Hopper'}, format='json')
+        updated = Contact.objects.get(pk=contact.pk)
+        self.assertEqual(updated.initials, 'GH')
+        self.assertNotEqual(updated.avatar_hash, contact.avatar_hash)
+
+    def test_template_version_changes_the_hash(self):
+        digest = avatar_hash('AL', '#ff7a00')
+        with mock.patch('Join_App.avatars.TEMPLATE_VERSION', TEMPLATE_VERSION + 1):
+            self.assertNotEqual(avatar_hash('AL', '#ff7a00'), digest)
+        # The migration refreshing the stored hashes computes the same ones
+        migration = import_module('Join_App.migrations.0022_contact_avatar_template_version')
+        self.assertEqual(migration.avatar_hash('AL', '#ff7a00', TEMPLATE_VERSION), digest)
+
+    def test_avatar_is_public_immutable_and_cached(self):
+        contact = self.create_contact('<b> Lovelace', color='#ff7a00')
+        anonymous = APIClient()
+        with CaptureQueriesContext(connection) as captured:
+            response = anonymous.get(f'/avatars/{contact.avatar_hash}.svg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(b'&lt;L</text>', response.content)
+        self.assertEqual(len(captured), 1)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(anonymous.get(f'/avatars/{contact.avatar_hash}.svg').content, response.content)
+        self.assertEqual(len(captured), 0)
+        revalidated = anonymous.get(f'/avatars/{contact.avatar_hash}.svg', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(anonymous.get('/avatars/0123456789abcdef.svg').status_code, 404)
+
+    def test_cache_is_bounded(self):
+        with mock.patch.object(_avatars, 'size', 2):
+            hashes = [self.create_contact(name).avatar_hash for name in ('Ada L', 'Bob M', 'Cy N')]
+            for digest in hashes:
+                self.client.get(f'/avatars/{digest}.svg')
+            self.assertEqual(len(_avatars), 2)
+            self.assertIsNone(_avatars.get(hashes[0]))
+
+
+class RecordingSink:
+    """
+    Reminder sink keeping the batches it was sent.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def send(self, reminders):
+        self.batches.append(reminders)
+
+    @property
+    def task_ids(self):
+        return [reminder['task_id'] for batch in self.batches for reminder in batch]
+
+
+class ReminderTests(TestCase):
+    """
+    Tests for the deadline reminder scanner.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.today = timezone.localdate()
+
+    def task(self, days, category='todo'):
+        return Task.objects.create(user=self.user, title='Pay rent', category=category,
+                                   due_date=self.today + timedelta(days=days))
+
+    def test_reminds_once_of_open_tasks_within_the_horizon(self):
+        due = [self.task(0), self.task(1, 'inprogress')]
+        self.task(1, 'done')
+        self.task(2)
+        self.task(-1)
+        sink = RecordingSink()
+        self.assertEqual(send_reminders(horizon_days=1, sink=sink), 2)
+        self.assertEqual(sink.task_ids, [task.id for task in due])
+        self.assertEqual(sink.batches[0][0]['email'], 'alice@example.com')
+        self.assertEqual(send_reminders(horizon_days=1, sink=sink), 0)
+
+        # A new due date is due for a new reminder
+        Task.objects.filter(pk=due[0].pk).update(due_date=self.today + timedelta(days=1))
+        self.assertEqual(send_reminders(horizon_days=1, sink=sink), 1)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/tasks/bulk-delete/', {'ids': [due[0].id]}, format='json')
+        self.assertEqual(response.json()['deleted']['Join_App.TaskReminder'], 2)
+
+    def test_batches_continue_after_the_last_task(self):
+        due = sorted([self.task(1) for _ in range(3)] + [self.task(0) for _ in range(2)],
+                     key=lambda task: (task.due_date, task.id))
+        sink = RecordingSink()
+        self.assertEqual(send_reminders(horizon_days=1, batch_size=2, sink=sink), 5)
+        self.assertEqual([len(batch) for batch in sink.batches], [2, 2, 1])
+        self.assertEqual(sink.task_ids, [task.id for task in due])
+
+    def test_work_does_not_grow_with_tasks_outside_the_horizon(self):
+        self.task(0)
+        with CaptureQueriesContext(connection) as few:
+            send_reminders(sink=RecordingSink())
+        self.task(0)
+        Task.objects.bulk_create(Task(user=self.user, title='Later', due_date=self.today + timedelta(days=30))
+                                 for _ in range(200))
+        with CaptureQueriesContext(connection) as many:
+            send_reminders(sink=RecordingSink())
+        self.assertEqual(len(few), len(many))
+        plan = Task.objects.filter(due_date__gte=self.today, due_date__lte=self.today).exclude(
+            category='done').order_by('due_date', 'id').explain()
+        self.assertIn('task_open_due_date_idx', plan)
+
+    def test_failed_delivery_is_retried(self):
+        self.task(0)
+        failing = mock.Mock()
+        failing.send.side_effect = ConnectionError('mail server down')
+        with self.assertRaises(ConnectionError):
+            send_reminders(sink=failing)
+        self.assertEqual(TaskReminder.objects.get().sent_at, None)
+        out = StringIO()
+        call_command('send_reminders', stdout=out)
+        self.assertIn('"title": "Pay rent"', out.getvalue())
+        self.assertIn('Sent 1 reminders', out.getvalue())
+        self.assertIsNotNone(TaskReminder.objects.get().sent_at)
+
+    def test_unmarked_batches_are_sent_again(self):
+        task = self.task(0)
+        sink = RecordingSink()
+        with mock.patch('Join_App.reminders._mark_sent', side_effect=OperationalError('disk I/O error')):
+            with self.assertRaises(OperationalError):
+                send_reminders(sink=sink)
+        # Delivery is at least once: the batch was handed over but not marked
+        self.assertEqual(send_reminders(sink=sink), 1)
+        self.assertEqual(sink.task_ids, [task.id, task.id])
+        self.assertEqual(send_reminders(sink=sink), 0)
+
+
+class ReminderRetryTests(TransactionTestCase):
+    """
+    Tests for the reminder scanner on lock retries, which need real transactions.
+    """
+
+    def task(self, days):
+        user = User.objects.get_or_create(username='alice', email='alice@example.com')[0]
+        return Task.objects.create(user=user, title='Pay rent', due_date=timezone.localdate() + timedelta(days=days))
+
+    @override_settings(SQLITE={'LOCK_RETRIES': 2, 'LOCK_BACKOFF_MS': 0})
+    def test_lock_retries_do_not_send_twice(self):
+        self.task(0)
+        self.task(0)
+        calls = []
+
+        def locked_once(*args):
+            # The first attempt records the batch, then loses the lock
+            calls.append(1)
+            result = claim_batch(*args)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return result
+
+        sink = RecordingSink()
+        with mock.patch('Join_App.reminders.claim_batch', locked_once):
+            self.assertEqual(send_reminders(sink=sink), 2)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(sink.batches), 1)
+        self.assertEqual(TaskReminder.objects.filter(sent_at=None).count(), 0)
+
+
+class BoardSummaryTests(TestCase):
+    """
+    Tests for the incrementally maintained per-user board summary.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def task(self, days, category='todo', priority='medium'):
+        return Task.objects.create(user=self.user, title='Pay rent', category=category, priority=priority,
+                                   due_date=self.today + timedelta(days=days))
+
+    def assertCurrent(self):
+        summary = UserBoardSummary.objects.get(user=self.user)
+        actual = compute_summaries([self.user.id], summary.as_of)[self.user.id]
+        self.assertEqual({field: getattr(summary, field) for field in SUMMARY_FIELDS}, actual)
+        return summary
+
+    def test_task_writes_keep_the_summary_current(self):
+        first = self.task(2, priority='urgent')
+        second = self.task(-1)
+        self.task(5, 'done')
+        summary = self.assertCurrent()
+        self.assertEqual((summary.todo, summary.done, summary.urgent, summary.overdue), (2, 1, 1, 1))
+        self.assertEqual(summary.next_deadline, first.due_date)
+
+        # Moving the task holding the next deadline to done
+        response = self.client.patch(f'/tasks/{first.pk}/', {'category': 'done'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        summary = self.assertCurrent()
+        self.assertEqual((summary.done, summary.urgent, summary.next_deadline), (2, 0, None))
+
+        self.client.patch(f'/tasks/{second.pk}/', {'dueDate': str(self.today + timedelta(days=1)),
+                                                   'category': 'inprogress'}, format='json')
+        summary = self.assertCurrent()
+        self.assertEqual((summary.overdue, summary.next_deadline), (0, self.today + timedelta(days=1)))
+
+        self.client.delete(f'/tasks/{second.pk}/')
+        ids = [self.task(3).id, self.task(4, 'awaitfeedback').id]
+        self.assertEqual(self.client.post('/tasks/bulk-delete/', {'ids': ids[:1]}, format='json').status_code, 200)
+        archive_batch([first.pk])
+        summary = self.assertCurrent()
+        self.assertEqual((summary.awaitfeedback, summary.done, summary.next_deadline),
+                         (1, 1, self.today + timedelta(days=4)))
+
+    def test_unchanged_fields_cost_no_queries(self):
+        task = self.task(1)
+        with CaptureQueriesContext(connection) as captured:
+            task.title = 'Pay the rent'
+            task.save_version(['title'])
+        self.assertEqual(len(captured), 1)
+
+    def test_summary_is_read_with_one_query(self):
+        self.task(-2, priority='urgent')
+        self.task(4)
+        get_summary(self.user.id)
+        with self.assertNumQueries(1):
+            summary = get_summary(self.user.id)
+        self.assertEqual(summary.urgent, 1)
+        response = self.client.get('/tasks/summary/')
+        self.assertEqual(response.json(), {
+            'category': {'todo': 2, 'inprogress': 0, 'awaitfeedback': 0, 'done': 0}, 'total': 2,
+            'urgent': 1, 'overdue': 1, 'nextDeadline': str(self.today + timedelta(days=4)),
+            'asOf': str(self.today),
+        })
+
+    def test_summary_of_an_earlier_day_is_recomputed(self):
+        self.task(1)
+        tomorrow = self.today + timedelta(days=2)
+        summary = get_summary(self.user.id, today=tomorrow)
+        self.assertEqual((summary.overdue, summary.next_deadline, summary.as_of), (1, None, tomorrow))
+        UserBoardSummary.objects.filter(user=self.user).delete()
+        self.assertEqual(get_summary(self.user.id).todo, 1)
+
+    def test_verifier_reports_and_fixes_drift(self):
+        task = self.task(1)
+        call_command('verify_summaries', stdout=StringIO())
+        # A write bypassing the model
+        Task.objects.filter(pk=task.pk).update(category='done')
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('verify_summaries', stdout=out)
+        self.assertIn(f'user {self.user.id}: todo is 1, should be 0', out.getvalue())
+        call_command('verify_summaries', '--fix', stdout=StringIO())
+        self.assertEqual(self.assertCurrent().done, 1)
+        call_command('verify_summaries', stdout=StringIO())
 
-# Create your tests here.
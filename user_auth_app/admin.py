@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import ExpiringToken
 
-# Register your models here.
+@admin.register(ExpiringToken)
+class ExpiringTokenAdmin(admin.ModelAdmin):
+    """
+    Admin for the authentication tokens, e.g. to revoke one by deleting it.
+    """
+    list_display = ['user', 'created', 'last_used', 'expires_at']
+    list_select_related = ['user']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+    readonly_fields = ['key', 'created', 'last_used']
+    ordering = ['-created']
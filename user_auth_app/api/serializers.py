@@ -9,6 +9,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
     Provides serialization for UserProfile objects,
     including user reference and email fields.
     """
+    email = serializers.EmailField(source='user.email', read_only=True)
+
     class Meta:
         model = UserProfile
         fields = ['user', 'email']
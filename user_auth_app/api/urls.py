@@ -1,6 +1,5 @@
 from django.urls import path
-from .views import UserProfileList, UserProfileDetail, RegistrationView, CustomLoginView, GuestLoginView
-from rest_framework.authtoken.views import obtain_auth_token
+from .views import UserProfileList, UserProfileDetail, RegistrationView, CustomLoginView, GuestLoginView, LogoutView
 
 urlpatterns = [
     path('guest-login/', GuestLoginView.as_view(), name='guest-login'),
@@ -8,4 +7,5 @@ urlpatterns = [
     path('profiles/<int:pk>/', UserProfileDetail.as_view(), name='userprofile-detail'),
     path('registration/', RegistrationView.as_view(), name='registration'),
     path('login/', CustomLoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
 ]
\ No newline at end of file
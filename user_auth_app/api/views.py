@@ -1,13 +1,16 @@
 from rest_framework import generics, status
-from user_auth_app.models import UserProfile
+from user_auth_app.models import ExpiringToken, UserProfile
 from .serializers import UserProfileSerializer, RegistrationSerializer
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from rest_framework.decorators import api_view, permission_classes
+from Join_App.api.mixins import LockRetryMixin
+from Join_App.api.throttling import CredentialThrottle, IPThrottle
+from Join_App.metrics import count_auth_event
+from user_auth_app.tokens import issue_token, revoke_token
 import uuid
 import logging
 
@@ -27,34 +30,37 @@ def guest_test(request):
     """
     return Response({"message": "Guest test endpoint works!"})
 
-class UserProfileList(generics.ListCreateAPIView):
+class UserProfileList(LockRetryMixin, generics.ListCreateAPIView):
     """
     API view for listing all user profiles or creating a new one.
     
     Provides GET (list all profiles) and POST (create profile) functionality.
     """
-    queryset = UserProfile.objects.all()
+    queryset = UserProfile.objects.select_related('user')
     serializer_class = UserProfileSerializer
 
-class UserProfileDetail(generics.RetrieveUpdateDestroyAPIView):
+class UserProfileDetail(LockRetryMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API view for retrieving, updating, or deleting a specific user profile.
     
     Provides GET (retrieve), PUT/PATCH (update), and DELETE functionality
     for individual profiles identified by their primary key.
     """
-    queryset = UserProfile.objects.all()
+    queryset = UserProfile.objects.select_related('user')
     serializer_class = UserProfileSerializer
 
-class RegistrationView(APIView):
+class RegistrationView(LockRetryMixin, APIView):
     """
     API view for user registration.
     
     Handles user creation with validation for passwords and email uniqueness.
     Returns an authentication token upon successful registration.
-    Accessible to unauthenticated users.
+    Accessible to unauthenticated users, throttled per IP and email.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, CredentialThrottle]
+    throttle_scope = 'registration'
+    throttle_credential_field = 'email'
 
     def post(self, request):
         """
@@ -75,7 +81,8 @@ class RegistrationView(APIView):
         if serializer.is_valid():
             try:
                 saved_account = serializer.save()
-                token, created = Token.objects.get_or_create(user=saved_account)
+                token = issue_token(saved_account)
+                count_auth_event('registration')
                 return Response({
                     'status': 'success',
                     'token': token.key,
@@ -104,15 +111,19 @@ class CustomLoginView(ObtainAuthToken):
     Custom login view that extends Django REST framework's ObtainAuthToken.
     
     Provides token-based authentication with a simplified response structure.
-    Accessible to unauthenticated users.
+    Accessible to unauthenticated users, throttled per IP and username.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, CredentialThrottle]
+    throttle_scope = 'login'
 
     def post(self, request):
         """
         Process a login request.
         
         Validates credentials and returns user information with an auth token.
+        Every login issues a new token, so each device gets its own one
+        that expires independently.
         
         Args:
             request: The HTTP request containing login credentials.
@@ -126,25 +137,52 @@ class CustomLoginView(ObtainAuthToken):
 
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
+            count_auth_event('login_success')
             data = {
                 'token': token.key,
                 'username': user.username,
                 'email': user.email
             }
         else: 
+            count_auth_event('login_failed')
             data = serializer.errors
         return Response(data)
 
-class GuestLoginView(APIView):
+class LogoutView(LockRetryMixin, APIView):
+    """
+    API view for logging out.
+    
+    Deletes the token that authenticated the request, so it cannot be used
+    again. Other devices of the user keep their own tokens.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        """
+        Process a logout request.
+        
+        Args:
+            request: The HTTP request authenticated with the token to delete.
+            
+        Returns:
+            Response: Empty response with status 204.
+        """
+        if isinstance(request.auth, ExpiringToken):
+            revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class GuestLoginView(LockRetryMixin, APIView):
     """
     API view for guest user login.
     
     Creates a temporary user account with a unique username and random password.
     Returns an authentication token for the guest user.
-    Accessible to unauthenticated users.
+    Accessible to unauthenticated users, throttled per IP.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle]
+    throttle_scope = 'guest-login'
     
     def post(self, request):
         """
@@ -171,7 +209,8 @@ class GuestLoginView(APIView):
         profile.is_guest = True
         profile.save()
         
-        token, _ = Token.objects.get_or_create(user=guest_user)
+        token = issue_token(guest_user)
+        count_auth_event('guest_login')
         
         return Response({
             'status': 'success',
@@ -0,0 +1,43 @@
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from Join_App.metrics import count_auth_event
+from user_auth_app.models import ExpiringToken
+from user_auth_app.tokens import touch_token
+
+class MeteredTokenAuthentication(TokenAuthentication):
+    """
+    Expiring token authentication that counts its outcomes in the metrics.
+    
+    Looks keys up in ExpiringToken, rejects expired tokens and slides the
+    expiry of used ones forward. Counts valid ('token_hit'), unknown
+    ('token_invalid') and expired ('token_expired') tokens.
+    """
+    model = ExpiringToken
+
+    def authenticate_credentials(self, key):
+        """
+        Validates a token key and counts the outcome.
+        
+        Args:
+            key: The token key sent by the client
+            
+        Returns:
+            tuple: The authenticated user and the token
+            
+        Raises:
+            AuthenticationFailed: If the token is invalid or expired, or the
+            user is inactive
+        """
+        try:
+            user, token = super().authenticate_credentials(key)
+        except AuthenticationFailed:
+            count_auth_event('token_invalid')
+            raise
+        now = timezone.now()
+        if token.expires_at <= now:
+            count_auth_event('token_expired')
+            raise AuthenticationFailed('Token expired.')
+        touch_token(token, now)
+        count_auth_event('token_hit')
+        return user, token
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from user_auth_app.tokens import sweep_expired, token_settings
+
+class Command(BaseCommand):
+    """
+    Django management command deleting expired authentication tokens.
+    
+    Deletes in batches of short transactions found through the expiry
+    index, so it can run while users log in. Run it periodically, e.g.
+    hourly, to keep the token table and its lookups small.
+    """
+    help = 'Deletes expired authentication tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=token_settings()['SWEEP_BATCH_SIZE'],
+                            help='Tokens per transaction.')
+
+    def handle(self, *args, **options):
+        """
+        Execute the sweep.
+        
+        Args:
+            *args: Additional positional arguments.
+            **options: Batch size.
+            
+        Returns:
+            None: Outputs the number of deleted tokens.
+        """
+        self.stdout.write(f"Deleted {sweep_expired(options['batch_size'])} expired tokens")
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+# Copied tokens get a full lifetime from the migration on
+TTL = timedelta(days=14)
+
+
+def copy_tokens(apps, schema_editor):
+    """
+    Moves the keys of DRF's tokens into ExpiringToken, so clients stay logged in.
+    """
+    Token = apps.get_model('authtoken', 'Token')
+    ExpiringToken = apps.get_model('user_auth_app', 'ExpiringToken')
+    alias = schema_editor.connection.alias
+    now = timezone.now()
+    ExpiringToken.objects.using(alias).bulk_create([
+        ExpiringToken(key=key, user_id=user_id, created=created, last_used=now, expires_at=now + TTL)
+        for key, user_id, created in Token.objects.using(alias).values_list('key', 'user_id', 'created')
+    ], batch_size=1000)
+    Token.objects.using(alias).all().delete()
+
+
+def restore_tokens(apps, schema_editor):
+    """
+    Moves the newest token of every user back into DRF's tokens.
+    """
+    Token = apps.get_model('authtoken', 'Token')
+    ExpiringToken = apps.get_model('user_auth_app', 'ExpiringToken')
+    alias = schema_editor.connection.alias
+    newest = {}
+    for key, user_id, created in (ExpiringToken.objects.using(alias).order_by('created')
+                                  .values_list('key', 'user_id', 'created')):
+        newest[user_id] = (key, created)
+    Token.objects.using(alias).bulk_create([
+        Token(key=key, user_id=user_id, created=created) for user_id, (key, created) in newest.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth_app', '0004_expiring_tokens'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_tokens, restore_tokens),
+    ]
@@ -1,3 +1,6 @@
+import binascii
+import os
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -19,4 +22,40 @@ class UserProfile(models.Model):
         Returns:
             str: Username followed by status (Guest or User)
         """
-        return f"{self.user.username} ({'Guest' if self.is_guest else 'User'})"
\ No newline at end of file
+        return f"{self.user.username} ({'Guest' if self.is_guest else 'User'})"
+
+class ExpiringToken(models.Model):
+    """
+    Authentication token that expires after a period of inactivity.
+    
+    Every login issues its own token, so each device holds one. Using a
+    token slides its expiry forward; expired tokens are rejected and
+    deleted by the sweep_tokens command. Clients send the key like DRF's
+    tokens: "Authorization: Token <key>".
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auth_tokens')
+    created = models.DateTimeField(auto_now_add=True)
+    # Only written every TOUCH_SECONDS, not on every request
+    last_used = models.DateTimeField()
+    # Scanned by the sweep
+    expires_at = models.DateTimeField(db_index=True)
+    
+    @staticmethod
+    def generate_key():
+        """
+        Generates a random token key.
+        
+        Returns:
+            str: 40 hex characters
+        """
+        return binascii.hexlify(os.urandom(20)).decode()
+    
+    def __str__(self):
+        """
+        String representation of the ExpiringToken.
+        
+        Returns:
+            str: Username followed by the expiry
+        """
+        return f"{self.user.username} (expires {self.expires_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from Join_App.database import run_in_transaction
+from user_auth_app.models import ExpiringToken
+
+TOKEN_DEFAULTS = {
+    # Seconds of inactivity after which a token expires
+    'TTL_SECONDS': 14 * 24 * 60 * 60,
+    # Minimum seconds between two writes of last_used and the expiry
+    'TOUCH_SECONDS': 5 * 60,
+    # Tokens deleted per sweep transaction
+    'SWEEP_BATCH_SIZE': 1000,
+    # Tokens kept per user; issuing another deletes the least recently used
+    'MAX_PER_USER': 10,
+}
+
+
+def token_settings():
+    """
+    Returns the token settings merged with their defaults.
+
+    Returns:
+        dict: Effective settings
+    """
+    return {**TOKEN_DEFAULTS, **getattr(settings, 'TOKENS', {})}
+
+
+def new_token(user, now=None, key=None):
+    """
+    Builds an unsaved token for a user, e.g. for bulk_create.
+
+    Args:
+        user: The user
+        now: Issue time (default: now)
+        key: Token key (default: a random one)
+
+    Returns:
+        ExpiringToken: The token
+    """
+    now = now or timezone.now()
+    return ExpiringToken(key=key or ExpiringToken.generate_key(), user=user, created=now, last_used=now,
+                         expires_at=now + timedelta(seconds=token_settings()['TTL_SECONDS']))
+
+
+def issue_token(user):
+    """
+    Creates a new token for a user, e.g. for one login.
+
+    Beyond MAX_PER_USER tokens, the least recently used ones of the user
+    are deleted, so repeated logins cannot pile up tokens.
+
+    Args:
+        user: The user
+
+    Returns:
+        ExpiringToken: The saved token
+    """
+    token = new_token(user)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        token.save(using=DEFAULT_DB_ALIAS, force_insert=True)
+        surplus = list(ExpiringToken.objects.using(DEFAULT_DB_ALIAS).filter(user=user)
+                       .order_by('-last_used', '-created').values_list('key', flat=True)
+                       [token_settings()['MAX_PER_USER']:])
+        if surplus:
+            _delete_batch(surplus)
+    return token
+
+
+def revoke_token(token):
+    """
+    Deletes a token, e.g. on logout.
+
+    Args:
+        token: The ExpiringToken
+
+    Returns:
+        bool: True if the token existed
+    """
+    return bool(_delete_batch([token.key]))
+
+
+def touch_token(token, now=None):
+    """
+    Slides the expiry of a used token forward.
+
+    Writes at most once per TOUCH_SECONDS and token: the UPDATE only
+    matches if last_used is older, so concurrent requests write once.
+
+    Args:
+        token: The ExpiringToken that authenticated a request
+        now: Time of use (default: now)
+
+    Returns:
+        bool: True if the token was written
+    """
+    config = token_settings()
+    now = now or timezone.now()
+    if token.last_used > now - timedelta(seconds=config['TOUCH_SECONDS']):
+        return False
+    expires_at = now + timedelta(seconds=config['TTL_SECONDS'])
+    # An explicit alias keeps the write from being counted as a write of
+    # the request, which would pin the client's reads to the primary
+    touched = ExpiringToken.objects.using(DEFAULT_DB_ALIAS).filter(
+        key=token.key, last_used=token.last_used,
+    ).update(last_used=now, expires_at=expires_at)
+    token.last_used, token.expires_at = now, expires_at
+    return bool(touched)
+
+
+def _delete_batch(keys):
+    return ExpiringToken.objects.using(DEFAULT_DB_ALIAS).filter(key__in=keys).delete()[0]
+
+
+def sweep_expired(batch_size=None, now=None):
+    """
+    Deletes expired tokens in batches of short transactions.
+
+    Every batch is found through the expiry index, so the sweep reads
+    only expired rows whatever the size of the table.
+
+    Args:
+        batch_size: Tokens per transaction (default: SWEEP_BATCH_SIZE)
+        now: Reference time (default: now)
+
+    Returns:
+        int: Number of deleted tokens
+    """
+    batch_size = batch_size or token_settings()['SWEEP_BATCH_SIZE']
+    now = now or timezone.now()
+    expired = (ExpiringToken.objects.using(DEFAULT_DB_ALIAS).filter(expires_at__lte=now)
+               .order_by('expires_at').values_list('key', flat=True))
+    total = 0
+    while True:
+        keys = list(expired[:batch_size])
+        if not keys:
+            return total
+        total += run_in_transaction(_delete_batch, keys, using=DEFAULT_DB_ALIAS)